@@ -0,0 +1,116 @@
+"""Benchmark recall of a single user's episodic memories, before and after partitioning the collection by user.
+
+Fills a collection with random memories of many users on a running Qdrant, measures the latency of recall
+filtered by user, migrates the collection in place to tenant partitioning and measures it again.
+
+Usage (from the core folder):
+
+    CCAT_QDRANT_HOST=localhost python -m benchmarks.episodic_multitenancy --users 10000
+"""
+
+import time
+import uuid
+import argparse
+import statistics
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from cat.env import get_env
+from cat.memory.vector_memory_collection import VectorMemoryCollection
+
+COLLECTION_NAME = "benchmark_episodic"
+
+
+def get_collection(client, args, tenant_field=None):
+    return VectorMemoryCollection(
+        client=client,
+        collection_name=COLLECTION_NAME,
+        embedder_name="benchmark",
+        embedder_size=args.dimensions,
+        tenant_field=tenant_field,
+    )
+
+
+def wait_for_indexing(client):
+    # the HNSW index is (re)built in the background after upserts and migrations
+    time.sleep(1)
+    while client.get_collection(COLLECTION_NAME).status != "green":
+        time.sleep(1)
+
+
+def fill(collection, args, rng):
+    total = args.users * args.memories
+    for start in range(0, total, args.batch_size):
+        n = min(args.batch_size, total - start)
+        vectors = rng.standard_normal((n, args.dimensions), dtype=np.float32)
+        collection.add_points(
+            contents=[f"memory {i}" for i in range(start, start + n)],
+            vectors=vectors.tolist(),
+            metadatas=[
+                {"source": f"user_{i % args.users}", "when": time.time()}
+                for i in range(start, start + n)
+            ],
+            ids=[uuid.uuid4().hex for _ in range(n)],
+            batch_size=args.batch_size,
+        )
+
+
+def measure(collection, args, rng):
+    latencies = []
+    for _ in range(args.queries):
+        user_id = f"user_{rng.integers(args.users)}"
+        query = rng.standard_normal(args.dimensions, dtype=np.float32).tolist()
+        start = time.perf_counter()
+        collection.recall_memories_from_embedding(
+            query, metadata={"source": user_id}, k=5, with_vectors=False
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "mean": statistics.mean(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--memories", type=int, default=20, help="memories per user")
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = QdrantClient(
+        host=get_env("CCAT_QDRANT_HOST"),
+        port=int(get_env("CCAT_QDRANT_PORT")),
+        api_key=get_env("CCAT_QDRANT_API_KEY"),
+    )
+    if client.collection_exists(COLLECTION_NAME):
+        client.delete_collection(COLLECTION_NAME)
+
+    rng = np.random.default_rng(42)
+    try:
+        collection = get_collection(client, args)
+        fill(collection, args, rng)
+        wait_for_indexing(client)
+        before = measure(collection, args, rng)
+
+        # in place migration, as done at startup with CCAT_QDRANT_MULTITENANCY=true
+        collection = get_collection(client, args, tenant_field="metadata.source")
+        wait_for_indexing(client)
+        after = measure(collection, args, rng)
+    finally:
+        client.delete_collection(COLLECTION_NAME)
+
+    print(f"{args.users} users, {args.users * args.memories} memories, {args.queries} recalls")
+    print(f"{'latency (ms)':<14}{'global graph':>14}{'per user':>14}")
+    for stat in ["p50", "p95", "mean"]:
+        print(f"{stat:<14}{before[stat]:>14.2f}{after[stat]:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
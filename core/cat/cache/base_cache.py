@@ -5,6 +5,7 @@ class BaseCache(ABC):
 
     @abstractmethod
     def insert(self, cache_item):
+        """Store an item. Caches supporting versioned writes return False if the item was changed meanwhile."""
         pass
 
     @abstractmethod
@@ -19,4 +20,36 @@ class BaseCache(ABC):
     def delete(self, key):
         pass
 
+    def get_many(self, keys):
+        """Get the items stored for several keys. Returns a dict by key, missing and expired items are omitted."""
+        items = {}
+        for key in keys:
+            cache_item = self.get_item(key)
+            if cache_item:
+                items[key] = cache_item
+        return items
 
+    def set_many(self, cache_items):
+        """Store several items."""
+        for cache_item in cache_items:
+            self.insert(cache_item)
+
+    @abstractmethod
+    def scan(self, prefix=""):
+        """List the keys of the items starting with prefix, expired items are omitted."""
+        pass
+
+    def delete_prefix(self, prefix):
+        """Delete all the items whose key starts with prefix. Returns the number of deleted items."""
+        keys = self.scan(prefix)
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def evict_expired(self):
+        """Delete all the expired items in the cache. Returns the number of deleted items."""
+        return 0
+
+    def flush(self):
+        """Write pending items to the underlying storage. Returns the number of written items."""
+        return 0
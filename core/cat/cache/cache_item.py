@@ -3,11 +3,13 @@ import time
 
 class CacheItem:
     
-    def __init__(self, key, value, ttl=None):
+    def __init__(self, key, value, ttl=None, version=None):
         self.key = key
         self.value = value
         self.ttl = ttl
         self.created_at = time.time()
+        # version the item was read with, used by caches supporting versioned writes
+        self.version = version
 
     def is_expired(self):
         if self.ttl == -1 or self.ttl is None:
@@ -1,3 +1,5 @@
+import os
+
 from cat.env import get_env
 
 
@@ -7,13 +9,40 @@ class CacheManager:
     def __init__(self):
 
         self.cache_type = get_env("CCAT_CACHE_TYPE")
-        
+
         if self.cache_type == "in_memory":
-            from cat.cache.in_memory_cache import InMemoryCache
-            self.cache = InMemoryCache()
+            self.cache = self._get_in_memory_cache()
         elif self.cache_type == "file_system":
-            cache_dir = get_env("CCAT_CACHE_DIR")
-            from cat.cache.file_system_cache import FileSystemCache
-            self.cache = FileSystemCache(cache_dir)
+            self.cache = self._get_file_system_cache()
+        elif self.cache_type == "tiered":
+            from cat.cache.tiered_cache import TieredCache
+            self.cache = TieredCache(
+                self._get_in_memory_cache(), self._get_file_system_cache()
+            )
+        elif self.cache_type == "sqlite":
+            from cat.cache.sqlite_cache import SQLiteCache
+            self.cache = SQLiteCache(
+                os.path.join(get_env("CCAT_CACHE_DIR"), "cache.sqlite")
+            )
         else:
-            raise ValueError(f"Cache type {self.cache_type} not supported")
\ No newline at end of file
+            raise ValueError(f"Cache type {self.cache_type} not supported")
+
+        # coalesce writes and persist them periodically
+        self.write_behind = get_env("CCAT_CACHE_WRITE_BEHIND") == "true"
+        if self.write_behind:
+            from cat.cache.write_behind_cache import WriteBehindCache
+            self.cache = WriteBehindCache(self.cache)
+
+    def _get_in_memory_cache(self):
+        from cat.cache.in_memory_cache import InMemoryCache
+        max_bytes = get_env("CCAT_CACHE_MAX_BYTES")
+        return InMemoryCache(
+            max_items=int(get_env("CCAT_CACHE_MAX_ITEMS")),
+            max_bytes=int(max_bytes) if max_bytes else None,
+        )
+
+    def _get_file_system_cache(self):
+        from cat.cache.file_system_cache import FileSystemCache
+        return FileSystemCache(
+            get_env("CCAT_CACHE_DIR"), compression=get_env("CCAT_CACHE_COMPRESSION")
+        )
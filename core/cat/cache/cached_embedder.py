@@ -0,0 +1,228 @@
+import hashlib
+import json
+import threading
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from cat.cache.cache_item import CacheItem
+from cat.cache.in_memory_cache import InMemoryCache
+from cat.cache.sqlite_cache import SQLiteCache
+from cat.cache.tiered_cache import TieredCache
+from cat.factory.custom_embedder import EmbedderWrapper, unwrap_embedder
+from cat.factory.embedder import SYMMETRIC_EMBEDDERS
+from cat.log import log
+
+# attributes not identifying the vector space of an embedder
+SECRET_ATTRIBUTE_NAMES = ("key", "token", "secret", "password")
+
+
+def get_embedder_fingerprint(embedder) -> str:
+    """Identify the vector space of an embedder.
+
+    The fingerprint is a hash of the embedder class and of its scalar attributes (model name, size, url...),
+    credentials excluded.
+
+    Parameters
+    ----------
+    embedder : Embeddings
+        Langchain embedder.
+
+    Returns
+    -------
+    str
+        Hex digest identifying the embedder.
+
+    """
+
+    embedder = unwrap_embedder(embedder)
+    attributes = {}
+    for name, value in sorted(vars(embedder).items()):
+        if name.startswith("_") or any(s in name.lower() for s in SECRET_ATTRIBUTE_NAMES):
+            continue
+        if value is None or isinstance(value, (str, int, float, bool)):
+            attributes[name] = value
+
+    klass = type(embedder)
+    identity = json.dumps(
+        {"class": f"{klass.__module__}.{klass.__qualname__}", "attributes": attributes},
+        sort_keys=True,
+    )
+    return hashlib.sha256(identity.encode()).hexdigest()[:16]
+
+
+class CachedEmbedder(EmbedderWrapper):
+    """Embedder wrapper caching the vectors of already embedded texts.
+
+    Vectors are stored by embedder fingerprint and text hash in a memory LRU, backed by a SQLite database so
+    they survive restarts. When the embedder changes, the vectors of the previous one are deleted.
+    The database keeps at most `max_stored_items` vectors, the oldest ones are deleted by `evict_expired`.
+
+    Attributes
+    ----------
+    embedder : Embeddings
+        Wrapped embedder.
+    fingerprint : str
+        Identifier of the wrapped embedder vector space, used as key prefix.
+    symmetric : bool
+        Whether queries and documents are embedded the same way, so they can share cached vectors.
+    cache : TieredCache
+        Memory LRU over the SQLite store.
+    max_stored_items : int | None
+        Max number of vectors kept in the SQLite store, None for no limit.
+    hits : int
+        Number of texts found in the cache.
+    misses : int
+        Number of texts sent to the wrapped embedder.
+
+    """
+
+    # key storing the fingerprint of the embedder currently using the store
+    FINGERPRINT_KEY = "embedder_fingerprint"
+
+    def __init__(
+        self,
+        embedder: Embeddings,
+        db_path: str,
+        max_items: int = 10000,
+        max_stored_items: int | None = 100000,
+    ):
+        super().__init__(embedder)
+        self.fingerprint = get_embedder_fingerprint(embedder)
+        self.symmetric = isinstance(unwrap_embedder(embedder), SYMMETRIC_EMBEDDERS)
+        self.store = SQLiteCache(db_path)
+        self.cache = TieredCache(InMemoryCache(max_items=max_items), self.store)
+        self.max_stored_items = max_stored_items
+
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self._invalidate_previous_embedder()
+
+    def _invalidate_previous_embedder(self):
+        previous = self.cache.get_value(self.FINGERPRINT_KEY)
+        if previous == self.fingerprint:
+            return
+        if previous is not None:
+            deleted = self.cache.delete_prefix(f"{previous}:")
+            log.info(f"Embedder changed, {deleted} cached embeddings deleted")
+        self.cache.insert(CacheItem(self.FINGERPRINT_KEY, self.fingerprint))
+
+    def _get_key(self, text: str, kind: str) -> str:
+        if self.symmetric:
+            kind = "any"
+        text_hash = hashlib.sha256(text.encode()).hexdigest()
+        return f"{self.fingerprint}:{kind}:{text_hash}"
+
+    def _count(self, hits, misses):
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _lookup_documents(self, texts: List[str]):
+        keys = [self._get_key(text, "document") for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # embed each missing text once, even if repeated
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self._count(len(texts) - len(missing), len(missing))
+
+        vectors = {key: cache_item.value for key, cache_item in cached.items()}
+        return keys, vectors, missing
+
+    def _store_documents(self, keys, vectors, missing, embeddings) -> List[List[float]]:
+        new_items = []
+        for key, embedding in zip(missing.keys(), embeddings):
+            vectors[key] = embedding
+            new_items.append(CacheItem(key, embedding))
+        if new_items:
+            self.cache.set_many(new_items)
+        return [vectors[key] for key in keys]
+
+    def _lookup_query(self, text: str):
+        key = self._get_key(text, "query")
+        cache_item = self.cache.get_item(key)
+        if cache_item:
+            self._count(1, 0)
+        else:
+            self._count(0, 1)
+        return key, cache_item
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts, only sending to the wrapped embedder the ones not found in the cache."""
+
+        keys, vectors, missing = self._lookup_documents(texts)
+        embeddings = self.embedder.embed_documents(list(missing.values())) if missing else []
+        return self._store_documents(keys, vectors, missing, embeddings)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query text, using the cached vector if any."""
+
+        key, cache_item = self._lookup_query(text)
+        if cache_item:
+            return cache_item.value
+
+        embedding = self.embedder.embed_query(text)
+        self.cache.insert(CacheItem(key, embedding))
+        return embedding
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async version of `embed_documents`, awaiting the wrapped embedder for the missing texts."""
+
+        keys, vectors, missing = self._lookup_documents(texts)
+        embeddings = await self.embedder.aembed_documents(list(missing.values())) if missing else []
+        return self._store_documents(keys, vectors, missing, embeddings)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async version of `embed_query`."""
+
+        key, cache_item = self._lookup_query(text)
+        if cache_item:
+            return cache_item.value
+
+        embedding = await self.embedder.aembed_query(text)
+        self.cache.insert(CacheItem(key, embedding))
+        return embedding
+
+    def evict_expired(self):
+        """Delete the oldest stored vectors beyond `max_stored_items`.
+
+        Returns
+        -------
+        int
+            Number of deleted vectors.
+
+        """
+
+        if self.max_stored_items is None:
+            return 0
+        # the fingerprint key is not among the vectors
+        evicted = self.store.evict_oldest(self.max_stored_items, prefix=f"{self.fingerprint}:")
+        if evicted:
+            log.info(f"{evicted} cached embeddings deleted")
+        return evicted
+
+    def get_stats(self):
+        """Get cache usage statistics.
+
+        Returns
+        -------
+        dict
+            Hits, misses and hit ratio on embedded texts, and statistics of each cache tier
+            (see `TieredCache.get_stats`).
+
+        """
+
+        with self.lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+        stats["tiers"] = self.cache.get_stats()
+        return stats
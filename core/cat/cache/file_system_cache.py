@@ -1,29 +1,105 @@
 import os
+import re
+import json
+import time
+import zlib
 import pickle
+import hashlib
+import tempfile
+
 from cat.cache.base_cache import BaseCache
+from cat.log import log
+
+
+# only the shard directories and files written by the cache are visited, cache_dir may be shared (e.g. /tmp)
+SHARD_NAME = re.compile(r"[0-9a-f]{2}")
+CACHE_FILE_NAME = re.compile(r"[0-9a-f]{40}\.cache")
 
 
 class FileSystemCache(BaseCache):
     """Cache implementation using the file system.
 
+    Items are pickled into files sharded in subdirectories by the hash of their key.
+    Each file starts with a one line JSON header containing the key and the expiration time,
+    so expiration can be checked without deserializing the value.
+
     Attributes
     ----------
     cache_dir : str
         Directory to store the cache.
+    compression : str
+        Compression applied to pickled values, one of "none", "zlib" or "lz4".
 
     """
 
-    def __init__(self, cache_dir):
+    def __init__(self, cache_dir, compression="none"):
         self.cache_dir = cache_dir
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir)
 
+        if compression == "lz4":
+            try:
+                import lz4.frame  # noqa: F401
+            except ImportError:
+                log.warning("lz4 is not installed, falling back to zlib cache compression")
+                compression = "zlib"
+        if compression not in ["none", "zlib", "lz4"]:
+            raise ValueError(f"Cache compression {compression} not supported")
+        self.compression = compression
+
     def _get_file_path(self, key):
-        return os.path.join(self.cache_dir, f"{key}.cache")
+        key_hash = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, key_hash[:2], f"{key_hash}.cache")
+
+    def _compress(self, data):
+        if self.compression == "zlib":
+            return zlib.compress(data)
+        if self.compression == "lz4":
+            import lz4.frame
+            return lz4.frame.compress(data)
+        return data
+
+    def _decompress(self, data, compression):
+        if compression == "zlib":
+            return zlib.decompress(data)
+        if compression == "lz4":
+            import lz4.frame
+            return lz4.frame.decompress(data)
+        return data
+
+    def _read_header(self, f):
+        return json.loads(f.readline())
+
+    def _is_valid_header(self, header):
+        if not isinstance(header, dict) or not isinstance(header.get("key"), str):
+            return False
+        expires_at = header.get("expires_at")
+        if expires_at is not None and (
+            isinstance(expires_at, bool) or not isinstance(expires_at, (int, float))
+        ):
+            return False
+        return header.get("compression") in ("none", "zlib", "lz4")
+
+    def _is_expired(self, header, now=None):
+        if header["expires_at"] is None:
+            return False
+        if now is None:
+            now = time.time()
+        return header["expires_at"] < now
+
+    def _remove_file(self, file_path):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            # already removed by a concurrent request
+            pass
 
     def insert(self, cache_item):
         """Insert a key-value pair in the cache.
 
+        The file is written to a temporary path and then atomically renamed,
+        so concurrent readers never see a partially written item.
+
         Parameters
         ----------
         cache_item : CacheItem
@@ -31,8 +107,38 @@ class FileSystemCache(BaseCache):
 
         """
 
-        with open(self._get_file_path(cache_item.key), "wb") as f:
-            pickle.dump(cache_item, f)
+        if cache_item.ttl in (None, -1):
+            expires_at = None
+        else:
+            expires_at = cache_item.created_at + cache_item.ttl
+
+        header = {
+            "key": cache_item.key,
+            "expires_at": expires_at,
+            "compression": self.compression,
+        }
+        data = self._compress(
+            pickle.dumps(cache_item, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+
+        file_path = self._get_file_path(cache_item.key)
+        shard_dir = os.path.dirname(file_path)
+        os.makedirs(shard_dir, exist_ok=True)
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=shard_dir, suffix=".tmp")
+        except FileNotFoundError:
+            # the shard was empty and removed by a concurrent sweep
+            os.makedirs(shard_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=shard_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(header).encode() + b"\n")
+                f.write(data)
+            os.replace(tmp_path, file_path)
+        except Exception:
+            self._remove_file(tmp_path)
+            raise
 
     def get_item(self, key):
         """Get the value stored in the cache.
@@ -49,16 +155,22 @@ class FileSystemCache(BaseCache):
 
         """
         file_path = self._get_file_path(key)
-        if not os.path.exists(file_path):
-            return None
-
-        with open(file_path, "rb") as f:
-            cache_item = pickle.load(f)
 
-        if cache_item.is_expired():
-            os.remove(file_path)
+        try:
+            with open(file_path, "rb") as f:
+                header = self._read_header(f)
+                if self._is_expired(header):
+                    cache_item = None
+                else:
+                    cache_item = pickle.loads(
+                        self._decompress(f.read(), header["compression"])
+                    )
+        except FileNotFoundError:
             return None
 
+        if cache_item is None:
+            self._remove_file(file_path)
+
         return cache_item
 
     def get_value(self, key):
@@ -90,8 +202,113 @@ class FileSystemCache(BaseCache):
             Key to delete the value.
 
         """
-        file_path = self._get_file_path(key)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        self._remove_file(self._get_file_path(key))
+
+    def _iter_shards(self):
+        try:
+            shards = [
+                shard.path
+                for shard in os.scandir(self.cache_dir)
+                if SHARD_NAME.fullmatch(shard.name) and shard.is_dir(follow_symlinks=False)
+            ]
+        except OSError as e:
+            log.warning(f"Cannot list cache directory {self.cache_dir}: {e}")
+            return []
+        return shards
+
+    def _iter_headers(self, shard_path):
+        # yield the path and header of each cache file of a shard, without reading values
+        try:
+            entries = list(os.scandir(shard_path))
+        except OSError as e:
+            log.warning(f"Cannot list cache directory {shard_path}: {e}")
+            return
+        for entry in entries:
+            if not CACHE_FILE_NAME.fullmatch(entry.name):
+                continue
+            try:
+                with open(entry.path, "rb") as f:
+                    header = self._read_header(f)
+            except (OSError, ValueError):
+                continue
+            # skip files not written by the cache
+            if not self._is_valid_header(header):
+                continue
+            if self._get_file_path(header["key"]) != entry.path:
+                continue
+            yield entry.path, header
+
+    def _iter_all_headers(self):
+        for shard_path in self._iter_shards():
+            yield from self._iter_headers(shard_path)
+
+    def _remove_matching(self, should_remove):
+        # remove the cache files whose header matches, then the shards left empty
+        removed = 0
+        for shard_path in self._iter_shards():
+            for file_path, header in self._iter_headers(shard_path):
+                if should_remove(header):
+                    self._remove_file(file_path)
+                    removed += 1
+            try:
+                os.rmdir(shard_path)
+            except OSError:
+                # not empty
+                pass
+        return removed
+
+    def scan(self, prefix=""):
+        """List the keys starting with prefix.
 
+        Only the file headers are read, values are never deserialized.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys, all keys are returned if empty.
+
+        Returns
+        -------
+        List[str]
+            Keys of the items which are not expired.
+
+        """
+
+        now = time.time()
+        return [
+            header["key"]
+            for _, header in self._iter_all_headers()
+            if header["key"].startswith(prefix) and not self._is_expired(header, now)
+        ]
+
+    def delete_prefix(self, prefix):
+        """Delete all the items whose key starts with prefix, in a single pass over the cache files.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys to delete.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
+
+        return self._remove_matching(lambda header: header["key"].startswith(prefix))
+
+    def evict_expired(self):
+        """Delete all the expired items in the cache.
+
+        Only the file headers are read, values are never deserialized.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
 
+        now = time.time()
+        return self._remove_matching(lambda header: self._is_expired(header, now))
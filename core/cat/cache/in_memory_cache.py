@@ -1,20 +1,108 @@
+import heapq
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
 from cat.cache.base_cache import BaseCache
 from cat.cache.cache_item import CacheItem
 
 
 class InMemoryCache(BaseCache):
-    """Cache implementation using a python dictionary.
+    """Cache implementation using a python ordered dictionary, evicting the least recently used items.
 
     Attributes
     ----------
-    cache : dict
-        Dictionary to store the cache.
+    items : OrderedDict
+        Dictionary to store the cache, ordered from the least to the most recently used item.
+    max_items : int
+        Maximum number of items kept in the cache.
+    max_bytes : int | None
+        Maximum estimated size (in bytes) of the cached values. If None, size is not bounded.
+    hits : int
+        Number of lookups that found a valid item.
+    misses : int
+        Number of lookups that found no item or an expired one.
+    evictions : int
+        Number of items dropped to respect `max_items` or `max_bytes`.
 
     """
 
-    def __init__(self):
-        self.items = {}
-        self.max_items = 100
+    def __init__(self, max_items=100, max_bytes=None):
+        self.items = OrderedDict()
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+
+        # estimated size of each item, only tracked when the cache is bounded by bytes
+        self.sizes = {}
+        self.total_bytes = 0
+
+        # min-heap of (expiration time, key, created_at), lazily invalidated and compacted
+        # when stale entries (deleted, overwritten or evicted items) outnumber the live ones
+        self.expirations = []
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.lock = threading.RLock()
+
+    def _estimate_size(self, cache_item):
+        try:
+            return len(pickle.dumps(cache_item.value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            # unpicklable values are counted as empty, they can only be bounded by max_items
+            return 0
+
+    def _remove(self, key):
+        # drop an item and its size bookkeeping (expiration entries are discarded lazily)
+        del self.items[key]
+        self.total_bytes -= self.sizes.pop(key, 0)
+
+    def evict_expired(self):
+        """Delete all the expired items in the cache.
+
+        Only the expired entries of the expiration index are visited, the cache is not scanned.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
+
+        with self.lock:
+            now = time.time()
+            evicted = 0
+            while self.expirations and self.expirations[0][0] < now:
+                _, key, created_at = heapq.heappop(self.expirations)
+                item = self.items.get(key)
+                # the item may have been deleted or overwritten after the entry was pushed
+                if item and item.created_at == created_at and item.is_expired():
+                    self._remove(key)
+                    evicted += 1
+            return evicted
+
+    def _compact_expirations(self):
+        # live entries are at most one per item, so beyond twice the items most entries are stale
+        if len(self.expirations) <= 2 * len(self.items):
+            return
+        self.expirations = [
+            (item.created_at + item.ttl, key, item.created_at)
+            for key, item in self.items.items()
+            if item.ttl not in (None, -1)
+        ]
+        heapq.heapify(self.expirations)
+
+    def _evict_least_recently_used(self):
+        while len(self.items) > self.max_items or (
+            self.max_bytes is not None
+            and self.total_bytes > self.max_bytes
+            and len(self.items) > 1
+        ):
+            key = next(iter(self.items))
+            self._remove(key)
+            self.evictions += 1
 
     def insert(self, cache_item):
         """Insert a key-value pair in the cache.
@@ -26,24 +114,28 @@ class InMemoryCache(BaseCache):
 
         """
 
-        # add new item
-        self.items[cache_item.key] = cache_item
-        
-        # clean up cache if it's full
-        if len(self.items) >= self.max_items:
+        with self.lock:
+            if cache_item.key in self.items:
+                self._remove(cache_item.key)
 
-            # sort caches by creation time
-            sorted_items = sorted(
-                self.items.items(),
-                key=lambda x: x[1].created_at,
-            )
+            # add new item as the most recently used
+            self.items[cache_item.key] = cache_item
 
-            # delete 10% of the oldest items
-            # not efficient, but it's honest work
-            # TODO: index items also by creation date
-            for k, v in sorted_items[:self.max_items//10]:
-                self.delete(k)
+            if self.max_bytes is not None:
+                size = self._estimate_size(cache_item)
+                self.sizes[cache_item.key] = size
+                self.total_bytes += size
 
+            if cache_item.ttl not in (None, -1):
+                heapq.heappush(
+                    self.expirations,
+                    (cache_item.created_at + cache_item.ttl, cache_item.key, cache_item.created_at),
+                )
+
+            # clean up cache if it's full
+            self.evict_expired()
+            self._evict_least_recently_used()
+            self._compact_expirations()
 
     def get_item(self, key) -> CacheItem:
         """Get the value stored in the cache.
@@ -59,13 +151,22 @@ class InMemoryCache(BaseCache):
             Value stored in the cache.
 
         """
-        item = self.items.get(key)
 
-        if item and item.is_expired():
-            del self.items[key]
-            return None
+        with self.lock:
+            item = self.items.get(key)
+
+            if item and item.is_expired():
+                self._remove(key)
+                item = None
 
-        return item
+            if item is None:
+                self.misses += 1
+                return None
+
+            # mark as most recently used
+            self.items.move_to_end(key)
+            self.hits += 1
+            return item
 
     def get_value(self, key):
         """Get the value stored in the cache.
@@ -82,7 +183,6 @@ class InMemoryCache(BaseCache):
 
         """
 
-
         item = self.get_item(key)
         if item:
             return item.value
@@ -97,5 +197,102 @@ class InMemoryCache(BaseCache):
             Key to delete the value.
 
         """
-        if key in self.items:
-            del self.items[key]
+
+        with self.lock:
+            if key in self.items:
+                self._remove(key)
+
+    def get_many(self, keys):
+        """Get the items stored for several keys, holding the lock once.
+
+        Parameters
+        ----------
+        keys : List[str]
+            Keys to retrieve.
+
+        Returns
+        -------
+        dict
+            Cache items by key, missing and expired items are omitted.
+
+        """
+
+        with self.lock:
+            return super().get_many(keys)
+
+    def set_many(self, cache_items):
+        """Insert several items, holding the lock once.
+
+        Parameters
+        ----------
+        cache_items : List[CacheItem]
+            Cache items to store.
+
+        """
+
+        with self.lock:
+            super().set_many(cache_items)
+
+    def scan(self, prefix=""):
+        """List the keys starting with prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys, all keys are returned if empty.
+
+        Returns
+        -------
+        List[str]
+            Keys of the items which are not expired, from the least to the most recently used.
+
+        """
+
+        with self.lock:
+            return [
+                key
+                for key, item in self.items.items()
+                if key.startswith(prefix) and not item.is_expired()
+            ]
+
+    def delete_prefix(self, prefix):
+        """Delete all the items whose key starts with prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys to delete.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
+
+        with self.lock:
+            keys = [key for key in self.items if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def get_stats(self):
+        """Get cache usage statistics.
+
+        Returns
+        -------
+        dict
+            Number of items, estimated bytes, hits, misses, evictions and hit ratio.
+
+        """
+
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "items": len(self.items),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,348 @@
+import os
+import time
+import pickle
+import sqlite3
+import threading
+
+from cat.cache.base_cache import BaseCache
+
+
+class SQLiteCache(BaseCache):
+    """Cache implementation using a SQLite database, shared by all the processes on the same host.
+
+    The database runs in WAL mode, so readers do not block the writer.
+    Each item has a version increased at each write: items carrying the version they were read with
+    are written only if no other process changed them in the meantime (compare-and-swap).
+
+    Attributes
+    ----------
+    db_path : str
+        Path of the SQLite database file.
+    batch_size : int
+        Max number of keys retrieved with a single query by `get_many`.
+
+    """
+
+    def __init__(self, db_path, batch_size=500):
+        self.db_path = db_path
+        # max number of keys in a single query (sqlite limits the number of query parameters)
+        self.batch_size = batch_size
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        # sqlite connections cannot be shared between threads
+        self.local = threading.local()
+
+        with self._get_connection() as connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL,
+                    version INTEGER NOT NULL
+                )"""
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)"
+            )
+
+    def _get_connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def insert(self, cache_item):
+        """Insert a key-value pair in the cache.
+
+        Parameters
+        ----------
+        cache_item : CacheItem
+            Cache item to store. If its `version` is not None, the item is written only if the stored version
+            is the same (0 meaning the item must not exist yet or be expired).
+
+        Returns
+        -------
+        bool
+            False if the item was changed by someone else since it was read, True otherwise.
+            On success, `cache_item.version` is updated to the stored version.
+
+        """
+
+        if cache_item.ttl in (None, -1):
+            expires_at = None
+        else:
+            expires_at = cache_item.created_at + cache_item.ttl
+        expected_version = getattr(cache_item, "version", None)
+
+        value = pickle.dumps(cache_item, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._get_connection() as connection:
+            if expected_version is None:
+                # blind write
+                new_version = connection.execute(
+                    """INSERT INTO cache (key, value, expires_at, version) VALUES (?, ?, ?, 1)
+                    ON CONFLICT (key) DO UPDATE SET
+                        value = excluded.value,
+                        expires_at = excluded.expires_at,
+                        version = cache.version + 1
+                    RETURNING version""",
+                    (cache_item.key, value, expires_at),
+                ).fetchone()[0]
+            elif expected_version == 0:
+                # an expired row not swept yet counts as absent, its version keeps growing so that
+                # writers still holding it cannot succeed
+                row = connection.execute(
+                    """INSERT INTO cache (key, value, expires_at, version) VALUES (?, ?, ?, 1)
+                    ON CONFLICT (key) DO UPDATE SET
+                        value = excluded.value,
+                        expires_at = excluded.expires_at,
+                        version = cache.version + 1
+                    WHERE cache.expires_at IS NOT NULL AND cache.expires_at < ?
+                    RETURNING version""",
+                    (cache_item.key, value, expires_at, time.time()),
+                ).fetchone()
+                if row is None:
+                    return False
+                new_version = row[0]
+            else:
+                cursor = connection.execute(
+                    """UPDATE cache SET value = ?, expires_at = ?, version = version + 1
+                    WHERE key = ? AND version = ?""",
+                    (value, expires_at, cache_item.key, expected_version),
+                )
+                if cursor.rowcount == 0:
+                    return False
+                new_version = expected_version + 1
+
+        cache_item.version = new_version
+        return True
+
+    def get_item(self, key):
+        """Get the value stored in the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve the value.
+
+        Returns
+        -------
+        any
+            Value stored in the cache.
+
+        """
+
+        # expired items are filtered by the query, values are not deserialized
+        row = self._get_connection().execute(
+            """SELECT value, version FROM cache
+            WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)""",
+            (key, time.time()),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        cache_item = pickle.loads(row[0])
+        cache_item.version = row[1]
+        return cache_item
+
+    def get_value(self, key):
+        """Get the value stored in the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve the value.
+
+        Returns
+        -------
+        any
+            Value stored in the cache.
+
+        """
+
+        cache_item = self.get_item(key)
+        if cache_item:
+            return cache_item.value
+        return None
+
+    def delete(self, key):
+        """Delete a key-value pair from the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to delete the value.
+
+        """
+
+        with self._get_connection() as connection:
+            connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def get_many(self, keys):
+        """Get the items stored for several keys, with one query per batch of keys.
+
+        Parameters
+        ----------
+        keys : List[str]
+            Keys to retrieve.
+
+        Returns
+        -------
+        dict
+            Cache items by key, missing and expired items are omitted.
+
+        """
+
+        keys = list(keys)
+        connection = self._get_connection()
+        now = time.time()
+        items = {}
+        for i in range(0, len(keys), self.batch_size):
+            batch = keys[i : i + self.batch_size]
+            rows = connection.execute(
+                f"""SELECT key, value, version FROM cache
+                WHERE key IN ({", ".join("?" * len(batch))})
+                AND (expires_at IS NULL OR expires_at >= ?)""",
+                (*batch, now),
+            )
+            for key, value, version in rows:
+                cache_item = pickle.loads(value)
+                cache_item.version = version
+                items[key] = cache_item
+        return items
+
+    def set_many(self, cache_items):
+        """Insert several items in a single transaction.
+
+        Parameters
+        ----------
+        cache_items : List[CacheItem]
+            Cache items to store. Items with a version are written with `insert`, to check their version.
+
+        """
+
+        versioned_items = []
+        rows = []
+        for cache_item in cache_items:
+            if getattr(cache_item, "version", None) is not None:
+                versioned_items.append(cache_item)
+                continue
+            if cache_item.ttl in (None, -1):
+                expires_at = None
+            else:
+                expires_at = cache_item.created_at + cache_item.ttl
+            rows.append(
+                (cache_item.key, pickle.dumps(cache_item, protocol=pickle.HIGHEST_PROTOCOL), expires_at)
+            )
+
+        with self._get_connection() as connection:
+            connection.executemany(
+                """INSERT INTO cache (key, value, expires_at, version) VALUES (?, ?, ?, 1)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = excluded.value,
+                    expires_at = excluded.expires_at,
+                    version = cache.version + 1""",
+                rows,
+            )
+
+        for cache_item in versioned_items:
+            self.insert(cache_item)
+
+    def _prefix_range(self, prefix):
+        # keys starting with prefix are in [prefix, prefix + highest code point), so the primary key index is used
+        return prefix, prefix + "\U0010ffff"
+
+    def scan(self, prefix=""):
+        """List the keys starting with prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys, all keys are returned if empty.
+
+        Returns
+        -------
+        List[str]
+            Keys of the items which are not expired, in lexicographic order.
+
+        """
+
+        rows = self._get_connection().execute(
+            """SELECT key FROM cache
+            WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at >= ?)
+            ORDER BY key""",
+            (*self._prefix_range(prefix), time.time()),
+        )
+        return [row[0] for row in rows]
+
+    def delete_prefix(self, prefix):
+        """Delete all the items whose key starts with prefix with a single statement.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys to delete.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
+
+        with self._get_connection() as connection:
+            cursor = connection.execute(
+                "DELETE FROM cache WHERE key >= ? AND key < ?",
+                self._prefix_range(prefix),
+            )
+        return cursor.rowcount
+
+    def evict_oldest(self, max_items, prefix=""):
+        """Delete the oldest written items beyond max_items, among the ones whose key starts with prefix.
+
+        Parameters
+        ----------
+        max_items : int
+            Number of items to keep (the most recently inserted ones).
+        prefix : str
+            Prefix of the keys, all keys are considered if empty.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
+
+        # rows keep their rowid when updated, so it orders them by first insertion
+        with self._get_connection() as connection:
+            cursor = connection.execute(
+                """DELETE FROM cache WHERE rowid IN (
+                    SELECT rowid FROM cache WHERE key >= ? AND key < ?
+                    ORDER BY rowid DESC LIMIT -1 OFFSET ?
+                )""",
+                (*self._prefix_range(prefix), max_items),
+            )
+        return cursor.rowcount
+
+    def evict_expired(self):
+        """Delete all the expired items in the cache with a single statement.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
+
+        with self._get_connection() as connection:
+            cursor = connection.execute(
+                "DELETE FROM cache WHERE expires_at < ?", (time.time(),)
+            )
+        return cursor.rowcount
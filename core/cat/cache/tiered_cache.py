@@ -0,0 +1,220 @@
+import threading
+
+from cat.cache.base_cache import BaseCache
+from cat.cache.in_memory_cache import InMemoryCache
+from cat.cache.file_system_cache import FileSystemCache
+
+
+class TieredCache(BaseCache):
+    """Two levels cache: hot items are served from memory, all items are persisted on the file system.
+
+    Items are written to both tiers. When the memory tier is full, the least recently used items are evicted
+    from it only, and they are lazily loaded back from the file system the next time they are requested
+    (this also happens after a restart).
+
+    Attributes
+    ----------
+    l1 : InMemoryCache
+        In-process LRU cache.
+    l2 : FileSystemCache
+        File system cache.
+    l2_hits : int
+        Number of lookups missed by L1 and found in L2.
+    l2_misses : int
+        Number of lookups missed by both tiers.
+
+    """
+
+    def __init__(self, l1: InMemoryCache, l2: FileSystemCache):
+        self.l1 = l1
+        self.l2 = l2
+
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.lock = threading.Lock()
+
+    def insert(self, cache_item):
+        """Insert a key-value pair in both tiers.
+
+        Parameters
+        ----------
+        cache_item : CacheItem
+            Cache item to store.
+
+        """
+
+        self.l2.insert(cache_item)
+        self.l1.insert(cache_item)
+
+    def get_item(self, key):
+        """Get the item from memory or, if missing, from the file system.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve the value.
+
+        Returns
+        -------
+        any
+            Value stored in the cache.
+
+        """
+
+        cache_item = self.l1.get_item(key)
+        if cache_item:
+            return cache_item
+
+        cache_item = self.l2.get_item(key)
+        with self.lock:
+            if cache_item:
+                self.l2_hits += 1
+            else:
+                self.l2_misses += 1
+
+        # warm up memory tier
+        if cache_item:
+            self.l1.insert(cache_item)
+
+        return cache_item
+
+    def get_value(self, key):
+        """Get the value stored in the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve the value.
+
+        Returns
+        -------
+        any
+            Value stored in the cache.
+
+        """
+
+        cache_item = self.get_item(key)
+        if cache_item:
+            return cache_item.value
+        return None
+
+    def delete(self, key):
+        """Delete a key-value pair from both tiers.
+
+        Parameters
+        ----------
+        key : str
+            Key to delete the value.
+
+        """
+
+        self.l1.delete(key)
+        self.l2.delete(key)
+
+    def get_many(self, keys):
+        """Get several items from memory, reading only the missing ones from the file system.
+
+        Parameters
+        ----------
+        keys : List[str]
+            Keys to retrieve.
+
+        Returns
+        -------
+        dict
+            Cache items by key, missing and expired items are omitted.
+
+        """
+
+        items = self.l1.get_many(keys)
+        missing = [key for key in keys if key not in items]
+        if not missing:
+            return items
+
+        l2_items = self.l2.get_many(missing)
+        with self.lock:
+            self.l2_hits += len(l2_items)
+            self.l2_misses += len(missing) - len(l2_items)
+
+        # warm up memory tier
+        self.l1.set_many(l2_items.values())
+
+        items.update(l2_items)
+        return items
+
+    def set_many(self, cache_items):
+        """Insert several items in both tiers.
+
+        Parameters
+        ----------
+        cache_items : List[CacheItem]
+            Cache items to store.
+
+        """
+
+        cache_items = list(cache_items)
+        self.l2.set_many(cache_items)
+        self.l1.set_many(cache_items)
+
+    def scan(self, prefix=""):
+        """List the keys starting with prefix, from the file system tier which holds all the items.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys, all keys are returned if empty.
+
+        Returns
+        -------
+        List[str]
+            Keys of the items which are not expired.
+
+        """
+
+        return self.l2.scan(prefix)
+
+    def delete_prefix(self, prefix):
+        """Delete all the items whose key starts with prefix from both tiers.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys to delete.
+
+        Returns
+        -------
+        int
+            Number of items deleted from the file system tier.
+
+        """
+
+        self.l1.delete_prefix(prefix)
+        return self.l2.delete_prefix(prefix)
+
+    def evict_expired(self):
+        self.l1.evict_expired()
+        return self.l2.evict_expired()
+
+    def get_stats(self):
+        """Get cache usage statistics for each tier.
+
+        Returns
+        -------
+        dict
+            Statistics of the memory tier (see `InMemoryCache.get_stats`) and hits, misses and hit ratio of
+            the file system tier, computed on L1 misses only.
+
+        """
+
+        with self.lock:
+            lookups = self.l2_hits + self.l2_misses
+            l2_stats = {
+                "hits": self.l2_hits,
+                "misses": self.l2_misses,
+                "hit_ratio": self.l2_hits / lookups if lookups else 0.0,
+            }
+
+        return {
+            "l1": self.l1.get_stats(),
+            "l2": l2_stats,
+        }
@@ -0,0 +1,240 @@
+import threading
+
+from cat.cache.base_cache import BaseCache
+from cat.log import log
+
+
+class WriteBehindCache(BaseCache):
+    """Cache wrapper delaying writes to another cache.
+
+    Inserted items are kept in a pending buffer and written to the wrapped cache only on `flush`,
+    so several writes on the same key are coalesced into a single one.
+
+    Attributes
+    ----------
+    cache : BaseCache
+        Wrapped cache where items are persisted.
+    pending : dict
+        Items waiting to be written, by key.
+    rejected : int
+        Number of versioned items refused by the wrapped cache because they were changed by another process.
+        They are dropped from the buffer, so the next reads load the stored version.
+
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.pending = {}
+        self.rejected = 0
+        self.lock = threading.Lock()
+        # serializes flushes and deletions, so a flush cannot write back a deleted item
+        self.flush_lock = threading.Lock()
+
+    def insert(self, cache_item):
+        """Insert a key-value pair in the pending buffer.
+
+        Parameters
+        ----------
+        cache_item : CacheItem
+            Cache item to store.
+
+        """
+
+        with self.lock:
+            self.pending[cache_item.key] = cache_item
+
+    def get_item(self, key):
+        """Get the item from the pending buffer or, if missing, from the wrapped cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve the value.
+
+        Returns
+        -------
+        any
+            Value stored in the cache.
+
+        """
+
+        with self.lock:
+            cache_item = self.pending.get(key)
+
+        if cache_item:
+            if not cache_item.is_expired():
+                return cache_item
+            with self.lock:
+                if self.pending.get(key) is cache_item:
+                    del self.pending[key]
+
+        return self.cache.get_item(key)
+
+    def get_value(self, key):
+        """Get the value stored in the cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to retrieve the value.
+
+        Returns
+        -------
+        any
+            Value stored in the cache.
+
+        """
+
+        cache_item = self.get_item(key)
+        if cache_item:
+            return cache_item.value
+        return None
+
+    def delete(self, key):
+        """Delete a key-value pair from both the pending buffer and the wrapped cache.
+
+        Parameters
+        ----------
+        key : str
+            Key to delete the value.
+
+        """
+
+        with self.flush_lock:
+            with self.lock:
+                self.pending.pop(key, None)
+            self.cache.delete(key)
+
+    def get_many(self, keys):
+        """Get several items from the pending buffer, reading the missing ones from the wrapped cache at once.
+
+        Parameters
+        ----------
+        keys : List[str]
+            Keys to retrieve.
+
+        Returns
+        -------
+        dict
+            Cache items by key, missing and expired items are omitted.
+
+        """
+
+        items = {}
+        with self.lock:
+            for key in keys:
+                cache_item = self.pending.get(key)
+                if cache_item and not cache_item.is_expired():
+                    items[key] = cache_item
+
+        missing = [key for key in keys if key not in items]
+        if missing:
+            items.update(self.cache.get_many(missing))
+        return items
+
+    def set_many(self, cache_items):
+        """Insert several items in the pending buffer.
+
+        Parameters
+        ----------
+        cache_items : List[CacheItem]
+            Cache items to store.
+
+        """
+
+        with self.lock:
+            for cache_item in cache_items:
+                self.pending[cache_item.key] = cache_item
+
+    def scan(self, prefix=""):
+        """List the keys starting with prefix, both pending and already written.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys, all keys are returned if empty.
+
+        Returns
+        -------
+        List[str]
+            Keys of the items which are not expired.
+
+        """
+
+        keys = self.cache.scan(prefix)
+        with self.lock:
+            pending_keys = [
+                key
+                for key, cache_item in self.pending.items()
+                if key.startswith(prefix) and not cache_item.is_expired()
+            ]
+
+        seen = set(keys)
+        return keys + [key for key in pending_keys if key not in seen]
+
+    def delete_prefix(self, prefix):
+        """Delete all the items whose key starts with prefix from both the pending buffer and the wrapped cache.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of the keys to delete.
+
+        Returns
+        -------
+        int
+            Number of deleted items.
+
+        """
+
+        with self.flush_lock:
+            with self.lock:
+                pending_keys = [key for key in self.pending if key.startswith(prefix)]
+                for key in pending_keys:
+                    del self.pending[key]
+            deleted = self.cache.delete_prefix(prefix)
+        return max(deleted, len(pending_keys))
+
+    def evict_expired(self):
+        return self.cache.evict_expired()
+
+    def flush(self):
+        """Write all the pending items to the wrapped cache.
+
+        Versioned items rejected by the wrapped cache are not written: they are dropped from the buffer
+        and counted in `rejected`.
+
+        Returns
+        -------
+        int
+            Number of written items.
+
+        """
+
+        with self.flush_lock:
+            with self.lock:
+                pending = list(self.pending.values())
+
+            flushed = 0
+            for cache_item in pending:
+                try:
+                    written = self.cache.insert(cache_item) is not False
+                except Exception as e:
+                    log.error(f"Error flushing cache item {cache_item.key}: {e}")
+                    continue
+
+                # items are dropped from the buffer once written or rejected, and if not updated meanwhile
+                with self.lock:
+                    if self.pending.get(cache_item.key) is cache_item:
+                        del self.pending[cache_item.key]
+                    if not written:
+                        self.rejected += 1
+
+                if written:
+                    flushed += 1
+                else:
+                    log.warning(
+                        f"Cache item {cache_item.key} was changed by another process, dropped in favor of the stored one"
+                    )
+
+            return flushed
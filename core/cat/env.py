@@ -11,9 +11,13 @@ def get_supported_env_variables():
         "CCAT_DEBUG": "true",
         "CCAT_LOG_LEVEL": "INFO",
         "CCAT_CORS_ALLOWED_ORIGINS": None,
+        "CCAT_VECTOR_MEMORY_BACKEND": "qdrant",
         "CCAT_QDRANT_HOST": None,
         "CCAT_QDRANT_PORT": "6333",
         "CCAT_QDRANT_API_KEY": None,
+        "CCAT_QDRANT_PAYLOAD_INDEXES": None,
+        "CCAT_QDRANT_MULTITENANCY": "false",
+        "CCAT_RECALL_CACHE_MAX_ITEMS": "0",  # only for a single Cat process writing to the vector memory
         "CCAT_SAVE_MEMORY_SNAPSHOTS": "false",
         "CCAT_METADATA_FILE": "cat/data/metadata.json",
         "CCAT_JWT_SECRET": "secret",
@@ -24,6 +28,31 @@ def get_supported_env_variables():
         "CCAT_CORS_ENABLED": "true",
         "CCAT_CACHE_TYPE": "in_memory",
         "CCAT_CACHE_DIR": "/tmp",
+        "CCAT_CACHE_MAX_ITEMS": "100",
+        "CCAT_CACHE_MAX_BYTES": None,
+        "CCAT_CACHE_COMPRESSION": "none",
+        "CCAT_CACHE_SWEEP_INTERVAL": "300",
+        "CCAT_CACHE_WRITE_BEHIND": "false",
+        "CCAT_CACHE_FLUSH_INTERVAL": "5",
+        "CCAT_EMBEDDING_CACHE": "false",  # vectors are persisted in a SQLite database in CCAT_CACHE_DIR
+        "CCAT_EMBEDDING_CACHE_MAX_ITEMS": "10000",
+        "CCAT_EMBEDDING_CACHE_MAX_STORED_ITEMS": "100000",
+        "CCAT_EMBEDDER_BATCH_SIZE": "32",
+        "CCAT_QDRANT_BATCH_SIZE": "256",
+        "CCAT_RABBITHOLE_PARSE_WORKERS": "2",
+        "CCAT_RABBITHOLE_PARSE_PROCESSES": "0",
+        "CCAT_RABBITHOLE_EMBED_WORKERS": "2",
+        "CCAT_RABBITHOLE_STORE_WORKERS": "1",
+        "CCAT_RABBITHOLE_QUEUE_SIZE": "8",
+        "CCAT_RABBITHOLE_JOB_WORKERS": "2",
+        "CCAT_RABBITHOLE_JOBS_DIR": "cat/data/ingestion_jobs",
+        "CCAT_EMBEDDER_MICRO_BATCHING": "false",
+        "CCAT_EMBEDDER_MICRO_BATCH_SIZE": "32",
+        "CCAT_EMBEDDER_MICRO_BATCH_WAIT_MS": "5",
+        "CCAT_RATE_LIMIT_REQUESTS_PER_SECOND": None,
+        "CCAT_RATE_LIMIT_TOKENS_PER_MINUTE": None,
+        "CCAT_RATE_LIMITS": None,
+        "CCAT_RATE_LIMIT_MAX_RETRIES": "5",
     }
 
 
@@ -0,0 +1,145 @@
+import time
+import queue
+import asyncio
+import threading
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from cat.factory.custom_embedder import EmbedderWrapper, unwrap_embedder
+from cat.factory.embedder import SYMMETRIC_EMBEDDERS
+from cat.log import log
+
+
+class EmbeddingRequest:
+    """Texts to embed, waiting for their batch to be processed."""
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.done = threading.Event()
+        self.embeddings = None
+        self.error = None
+
+
+class BatchingEmbedder(EmbedderWrapper):
+    """Embedder wrapper coalescing concurrent requests into a single call to the wrapped embedder.
+
+    Requests are queued and a worker thread embeds them together: after the first request of a batch,
+    it waits at most `max_wait` seconds for other requests, up to `max_batch_size` texts.
+    Requests larger than a batch are sent directly to the wrapped embedder.
+    Queries are batched only for embedders embedding queries and documents the same way.
+    Async calls not batched are awaited on the wrapped embedder, the others wait for their batch in a thread.
+
+    Attributes
+    ----------
+    embedder : Embeddings
+        Wrapped embedder.
+    max_batch_size : int
+        Max number of texts embedded with a single call.
+    max_wait : float
+        Max seconds a request waits for other requests to join its batch.
+
+    """
+
+    # seconds of inactivity after which the worker thread stops (it is restarted by the next request)
+    IDLE_TIMEOUT = 5
+
+    def __init__(self, embedder: Embeddings, max_batch_size: int = 32, max_wait: float = 0.005):
+        super().__init__(embedder)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_queries = isinstance(unwrap_embedder(embedder), SYMMETRIC_EMBEDDERS)
+
+        self.requests = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def _submit(self, texts: List[str]) -> List[List[float]]:
+        request = EmbeddingRequest(texts)
+        with self.lock:
+            self.requests.put(request)
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._work, daemon=True)
+                self.worker.start()
+
+        request.done.wait()
+        if request.error:
+            raise request.error
+        return request.embeddings
+
+    def _work(self):
+        next_request = None
+        while True:
+            if next_request is None:
+                try:
+                    next_request = self.requests.get(timeout=self.IDLE_TIMEOUT)
+                except queue.Empty:
+                    with self.lock:
+                        # requests are submitted holding the lock, none can be missed
+                        if self.requests.empty():
+                            self.worker = None
+                            return
+                    continue
+
+            # collect requests until the batch is full or the first request waited enough
+            batch = [next_request]
+            batch_size = len(next_request.texts)
+            next_request = None
+            deadline = time.monotonic() + self.max_wait
+            while batch_size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if batch_size + len(request.texts) > self.max_batch_size:
+                    # first request of the next batch
+                    next_request = request
+                    break
+                batch.append(request)
+                batch_size += len(request.texts)
+
+            self._embed_batch(batch)
+
+    def _embed_batch(self, batch: List[EmbeddingRequest]):
+        try:
+            texts = [text for request in batch for text in request.texts]
+            embeddings = self.embedder.embed_documents(texts)
+            log.debug(f"Embedded {len(texts)} texts from {len(batch)} requests")
+
+            start = 0
+            for request in batch:
+                request.embeddings = embeddings[start : start + len(request.texts)]
+                start += len(request.texts)
+        except Exception as e:
+            for request in batch:
+                request.error = e
+        finally:
+            for request in batch:
+                request.done.set()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch_size:
+            return self.embedder.embed_documents(texts)
+        return self._submit(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        if not self.batch_queries:
+            return self.embedder.embed_query(text)
+        return self._submit([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch_size:
+            return await self.embedder.aembed_documents(texts)
+        return await asyncio.to_thread(self._submit, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if not self.batch_queries:
+            return await self.embedder.aembed_query(text)
+        return (await asyncio.to_thread(self._submit, [text]))[0]
@@ -1,10 +1,13 @@
-import re
 import os
 import string
 import json
+import asyncio
+import threading
+import weakref
 from typing import List
 from itertools import combinations
-from sklearn.feature_extraction.text import CountVectorizer
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from langchain_core.embeddings import Embeddings
 import httpx
 
@@ -17,10 +20,13 @@ class DumbEmbedder(Embeddings):
 
     Notes
     -----
-    This class relies on the `CountVectorizer`[1]_ offered by Scikit-learn.
     This embedder uses a naive approach to extract features from a text and build an embedding vector.
     Namely, it looks for pairs of characters in text starting form a vocabulary with all possible pairs of
     printable characters, digits excluded.
+    Text is split in non overlapping pairs of characters, restarting at each new line (as `re.findall("..", text)`
+    would do), and each vocabulary pair found in the text is set to 1 in the vector.
+    Whole batches are encoded at once with NumPy, the vector space is the same of the original
+    Scikit-learn `CountVectorizer` implementation.
     """
 
     def __init__(self):
@@ -31,56 +37,205 @@ class DumbEmbedder(Embeddings):
         voc = []
         for k in combinations(chars, 2):
             voc.append(f"{k[0]}{k[1]}")
-        voc = sorted(set(voc))
+        self.vocabulary = sorted(set(voc))
 
-        # Naive embedder that counts occurrences of couple of characters in text
-        self.embedder = CountVectorizer(
-            vocabulary=voc, analyzer=lambda s: re.findall("..", s), binary=True
-        )
+        # lookup table from the code points of a pair of (ascii) characters to its position in the vocabulary
+        self.pair_index = np.full((128, 128), -1, dtype=np.int32)
+        for i, pair in enumerate(self.vocabulary):
+            self.pair_index[ord(pair[0]), ord(pair[1])] = i
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed a list of text and returns the embedding vectors that are lists of floats."""
-        return self.embedder.transform(texts).astype(float).todense().tolist()
+
+        embeddings = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+        if not texts:
+            return []
+
+        # encode all texts at once, separated by a new line (which never belongs to a pair)
+        codes = np.frombuffer("\n".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        if not len(codes):
+            return embeddings.tolist()
+        lengths = np.array([len(t) for t in texts])
+        rows = np.repeat(np.arange(len(texts)), lengths + 1)[: len(codes)]
+
+        # position of each character in its line, pairs start at even positions
+        positions = np.arange(len(codes))
+        new_lines = codes == ord("\n")
+        line_starts = np.maximum.accumulate(np.where(new_lines, positions + 1, 0))
+        is_pair_start = ~new_lines & ((positions - line_starts) % 2 == 0)
+        is_pair_start[:-1] &= ~new_lines[1:]
+        is_pair_start[-1] = False
+
+        starts = np.flatnonzero(is_pair_start)
+        first, second = codes[starts], codes[starts + 1]
+        ascii_pairs = (first < 128) & (second < 128)
+        starts, first, second = starts[ascii_pairs], first[ascii_pairs], second[ascii_pairs]
+
+        columns = self.pair_index[first, second]
+        in_vocabulary = columns >= 0
+        embeddings[rows[starts[in_vocabulary]], columns[in_vocabulary]] = 1.0
+        return embeddings.tolist()
 
     def embed_query(self, text: str) -> List[float]:
         """Embed a string of text and returns the embedding vector as a list of floats."""
         return self.embed_documents([text])[0]
 
 
-class CustomOpenAIEmbeddings(Embeddings):
-    """Use LLAMA2 as embedder by calling a self-hosted lama-cpp-python instance."""
+class HTTPEmbeddings(Embeddings):
+    """Base class for embedders served through an HTTP API.
+
+    Requests go through persistent pooled clients (keep-alive, bounded timeouts), a sync and an async one.
+    Large inputs are split in batches of `BATCH_SIZE` texts, sent concurrently (at most `MAX_CONCURRENCY`
+    at a time).
+    Subclasses define the payload of a request and how to read the embeddings in its response.
+    """
+
+    BATCH_SIZE = 64
+    MAX_CONCURRENCY = 4
+    TIMEOUT = httpx.Timeout(60.0, connect=10.0)
 
     def __init__(self, url):
-        self.url = os.path.join(url, "v1/embeddings")
+        self.url = url
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _get_limits(self):
+        return httpx.Limits(
+            max_connections=self.MAX_CONCURRENCY * 2,
+            max_keepalive_connections=self.MAX_CONCURRENCY,
+        )
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        payload = json.dumps({"input": texts})
-        ret = httpx.post(self.url, data=payload, timeout=None)
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.TIMEOUT, limits=self._get_limits())
+            return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # async connections are bound to the event loop they were opened in
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(timeout=self.TIMEOUT, limits=self._get_limits())
+                self._async_clients[loop] = client
+            return client
+
+    def _build_payload(self, input):
+        raise NotImplementedError
+
+    def _parse_embeddings(self, response) -> List[List[float]]:
+        raise NotImplementedError
+
+    def _get_batches(self, texts):
+        return [texts[i : i + self.BATCH_SIZE] for i in range(0, len(texts), self.BATCH_SIZE)]
+
+    def _post(self, input):
+        ret = self.client.post(self.url, content=json.dumps(self._build_payload(input)))
         ret.raise_for_status()
-        return [e["embedding"] for e in ret.json()["data"]]
+        return self._parse_embeddings(ret.json())
 
-    def embed_query(self, text: str) -> List[float]:
-        payload = json.dumps({"input": text})
-        ret = httpx.post(self.url, data=payload, timeout=None)
+    async def _apost(self, input):
+        ret = await self.async_client.post(self.url, content=json.dumps(self._build_payload(input)))
         ret.raise_for_status()
-        return ret.json()["data"][0]["embedding"]
+        return self._parse_embeddings(ret.json())
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = self._get_batches(texts)
+        if len(batches) <= 1:
+            return self._post(texts) if texts else []
+        with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENCY) as executor:
+            results = executor.map(self._post, batches)
+            return [embedding for batch in results for embedding in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._post(text)[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+
+        async def post_batch(batch):
+            async with semaphore:
+                return await self._apost(batch)
+
+        results = await asyncio.gather(*[post_batch(b) for b in self._get_batches(texts)])
+        return [embedding for batch in results for embedding in batch]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._apost(text))[0]
+
+
+class CustomOpenAIEmbeddings(HTTPEmbeddings):
+    """Use LLAMA2 as embedder by calling a self-hosted lama-cpp-python instance."""
 
+    def __init__(self, url):
+        super().__init__(os.path.join(url, "v1/embeddings"))
+
+    def _build_payload(self, input):
+        return {"input": input}
+
+    def _parse_embeddings(self, response):
+        data = response["data"]
+        # the order of the embeddings is given by their index, if any
+        if all("index" in e for e in data):
+            data = sorted(data, key=lambda e: e["index"])
+        return [e["embedding"] for e in data]
 
-class CustomOllamaEmbeddings(Embeddings):
+
+class CustomOllamaEmbeddings(HTTPEmbeddings):
     """Use Ollama to serve embedding models."""
 
     def __init__(self, base_url, model):
-        self.url = os.path.join(base_url, "api/embed")
+        super().__init__(os.path.join(base_url, "api/embed"))
         self.model = model
 
+    def _build_payload(self, input):
+        return {"model": self.model, "input": input}
+
+    def _parse_embeddings(self, response):
+        return response["embeddings"]
+
+
+class EmbedderWrapper(Embeddings):
+    """Base class for embedders adding a behavior (caching, rate limiting...) to another embedder.
+
+    Attributes are read from the wrapped embedder, use `unwrap_embedder` to check the configured embedder class.
+    Async methods are forwarded to the wrapped embedder, so native async implementations are used when available.
+
+    Attributes
+    ----------
+    embedder : Embeddings
+        Wrapped embedder.
+
+    """
+
+    def __init__(self, embedder: Embeddings):
+        self.embedder = embedder
+
+    def __getattr__(self, name):
+        # only called for attributes not found on the wrapper
+        if name == "embedder":
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        payload = json.dumps({"model": self.model , "input": texts})
-        ret = httpx.post(self.url, data=payload, timeout=None)
-        ret.raise_for_status()
-        return ret.json()["embeddings"]
+        return self.embedder.embed_documents(texts)
 
     def embed_query(self, text: str) -> List[float]:
-        payload = json.dumps({"model": self.model , "input": text})
-        ret = httpx.post(self.url, data=payload, timeout=None)
-        ret.raise_for_status()
-        return ret.json()["embeddings"][0]
+        return self.embedder.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedder.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embedder.aembed_query(text)
+
+
+def unwrap_embedder(embedder: Embeddings) -> Embeddings:
+    """Get the embedder behind all the wrappers."""
+    while isinstance(embedder, EmbedderWrapper):
+        embedder = embedder.embedder
+    return embedder
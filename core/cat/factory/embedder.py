@@ -7,10 +7,22 @@ from langchain_openai import OpenAIEmbeddings, AzureOpenAIEmbeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from fastembed import TextEmbedding
 from cat.factory.custom_embedder import DumbEmbedder, CustomOpenAIEmbeddings, CustomOllamaEmbeddings
+from cat.factory.rate_limiter import rate_limit_embedder
 from cat.mad_hatter.mad_hatter import MadHatter
 from langchain_cohere import CohereEmbeddings
 
 
+# embedders producing the same vector for a query and for a document with the same text
+# (others, e.g. Cohere and Gemini, embed queries differently)
+SYMMETRIC_EMBEDDERS = (
+    DumbEmbedder,
+    FakeEmbeddings,
+    CustomOpenAIEmbeddings,
+    CustomOllamaEmbeddings,
+    OpenAIEmbeddings,
+)
+
+
 # Base class to manage LLM configuration.
 class EmbedderSettings(BaseModel):
     # class instantiating the embedder
@@ -27,7 +39,7 @@ class EmbedderSettings(BaseModel):
             raise Exception(
                 "Embedder configuration class has self._pyclass==None. Should be a valid Embedder class"
             )
-        return cls._pyclass.default(**config)
+        return rate_limit_embedder(cls._pyclass.default(**config), cls.__name__)
 
 
 class EmbedderFakeConfig(EmbedderSettings):
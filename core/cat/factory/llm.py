@@ -14,6 +14,7 @@ import json
 from pydantic import BaseModel, ConfigDict
 
 from cat.factory.custom_llm import LLMDefault, LLMCustom, CustomOpenAI, CustomOllama
+from cat.factory.rate_limiter import rate_limit_llm
 from cat.mad_hatter.mad_hatter import MadHatter
 
 
@@ -33,7 +34,7 @@ class LLMSettings(BaseModel):
             raise Exception(
                 "Language model configuration class has self._pyclass==None. Should be a valid LLM class"
             )
-        return cls._pyclass.default(**config)
+        return rate_limit_llm(cls._pyclass.default(**config), cls.__name__)
 
 
 class LLMDefaultConfig(LLMSettings):
@@ -66,7 +67,7 @@ class LLMCustomConfig(LLMSettings):
             else:
                 config["options"] = {}
 
-        return cls._pyclass.default(**config)
+        return rate_limit_llm(cls._pyclass.default(**config), cls.__name__)
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -0,0 +1,290 @@
+import json
+import time
+import asyncio
+import random
+import threading
+from typing import Any, Dict, List
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.callbacks import BaseCallbackHandler
+
+from cat.factory.custom_embedder import EmbedderWrapper
+from cat.env import get_env
+from cat.log import log
+
+
+def estimate_tokens(texts: List[str]) -> int:
+    """Rough number of tokens in texts (about 4 characters per token), to avoid tokenizing them."""
+    return sum(len(text) for text in texts) // 4 + len(texts)
+
+
+class TokenBucket:
+    """Token bucket refilled at a constant rate.
+
+    Reservations are always granted, possibly bringing the bucket in debt:
+    the caller is told how long to wait for the reserved amount to be available.
+
+    Attributes
+    ----------
+    rate : float
+        Tokens added per second.
+    capacity : float
+        Max number of tokens in the bucket (i.e. max burst).
+
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take amount tokens from the bucket and return the seconds to wait before using them."""
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """Limit the requests per second and the tokens per minute sent to a provider.
+
+    Attributes
+    ----------
+    requests_per_second : float | None
+        Max requests per second, unbounded if None.
+    tokens_per_minute : float | None
+        Max tokens per minute, unbounded if None.
+    max_retries : int
+        Max number of retries of a request rejected with a 429 status code.
+
+    """
+
+    def __init__(self, requests_per_second=None, tokens_per_minute=None, max_retries=5):
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+
+        self.requests = None
+        if requests_per_second:
+            self.requests = TokenBucket(requests_per_second, max(1, requests_per_second))
+        self.tokens = None
+        if tokens_per_minute:
+            self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+
+    def _reserve(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def acquire(self, tokens: int = 0):
+        """Wait until a request with the given number of tokens can be sent."""
+
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0):
+        """Async version of `acquire`, waiting without blocking the event loop."""
+
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def consume(self, tokens: int):
+        """Account for tokens already used (e.g. the completion tokens), without waiting."""
+
+        if self.tokens and tokens > 0:
+            self.tokens.reserve(tokens)
+
+    def _get_retry_delay(self, error: Exception, attempt: int) -> float:
+        delay = get_retry_after(error)
+        if delay is None:
+            # full jitter: https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+            delay = random.uniform(0, min(60, 2**attempt))
+        return delay
+
+    def call(self, func, *args, tokens: int = 0, **kwargs):
+        """Call func once the limits allow it, retrying with exponential backoff and jitter on 429 errors."""
+
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not is_rate_limit_error(e):
+                    raise
+                delay = self._get_retry_delay(e, attempt)
+                log.warning(f"Rate limited by provider, retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    async def acall(self, func, *args, tokens: int = 0, **kwargs):
+        """Async version of `call`, awaiting the coroutine function func."""
+
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(tokens)
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not is_rate_limit_error(e):
+                    raise
+                delay = self._get_retry_delay(e, attempt)
+                log.warning(f"Rate limited by provider, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code == 429
+
+
+def get_retry_after(error: Exception):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+# one rate limiter for each provider, shared by all the instances of its models
+rate_limiters: Dict[str, RateLimiter] = {}
+rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Get the rate limiter of a provider.
+
+    Limits are read from `CCAT_RATE_LIMITS`, a JSON object with `requests_per_second` and `tokens_per_minute`
+    by provider (the name of the settings class, e.g. `EmbedderOpenAIConfig`).
+    Providers not listed there use `CCAT_RATE_LIMIT_REQUESTS_PER_SECOND` and `CCAT_RATE_LIMIT_TOKENS_PER_MINUTE`.
+
+    Parameters
+    ----------
+    provider : str
+        Provider name.
+
+    Returns
+    -------
+    RateLimiter
+        Rate limiter shared by all the models of the provider.
+
+    """
+
+    with rate_limiters_lock:
+        if provider not in rate_limiters:
+            limits = json.loads(get_env("CCAT_RATE_LIMITS") or "{}").get(provider, {})
+            requests_per_second = limits.get(
+                "requests_per_second", get_env("CCAT_RATE_LIMIT_REQUESTS_PER_SECOND")
+            )
+            tokens_per_minute = limits.get(
+                "tokens_per_minute", get_env("CCAT_RATE_LIMIT_TOKENS_PER_MINUTE")
+            )
+            rate_limiters[provider] = RateLimiter(
+                requests_per_second=float(requests_per_second) if requests_per_second else None,
+                tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
+                max_retries=int(get_env("CCAT_RATE_LIMIT_MAX_RETRIES")),
+            )
+        return rate_limiters[provider]
+
+
+class RateLimitedEmbedder(EmbedderWrapper):
+    """Embedder wrapper respecting the rate limits of its provider.
+
+    Attributes
+    ----------
+    embedder : Embeddings
+        Wrapped embedder.
+    rate_limiter : RateLimiter
+        Rate limiter of the embedder provider.
+
+    """
+
+    def __init__(self, embedder: Embeddings, rate_limiter: RateLimiter):
+        super().__init__(embedder)
+        self.rate_limiter = rate_limiter
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.rate_limiter.call(
+            self.embedder.embed_documents, texts, tokens=estimate_tokens(texts)
+        )
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.rate_limiter.call(
+            self.embedder.embed_query, text, tokens=estimate_tokens([text])
+        )
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.rate_limiter.acall(
+            self.embedder.aembed_documents, texts, tokens=estimate_tokens(texts)
+        )
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.rate_limiter.acall(
+            self.embedder.aembed_query, text, tokens=estimate_tokens([text])
+        )
+
+
+class RateLimitCallbackHandler(BaseCallbackHandler):
+    """LLM callback handler waiting for the rate limits of the provider before each call."""
+
+    def __init__(self, rate_limiter: RateLimiter):
+        self.rate_limiter = rate_limiter
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any):
+        self.rate_limiter.acquire(estimate_tokens(prompts))
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any):
+        self.rate_limiter.acquire(
+            estimate_tokens([str(m.content) for message_list in messages for m in message_list])
+        )
+
+    def on_llm_end(self, response, **kwargs: Any):
+        # completion tokens are known only at the end
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        self.rate_limiter.consume(token_usage.get("completion_tokens", 0))
+
+
+def rate_limit_embedder(embedder: Embeddings, provider: str) -> Embeddings:
+    """Wrap an embedder so it respects the rate limits of its provider."""
+    return RateLimitedEmbedder(embedder, get_rate_limiter(provider))
+
+
+def rate_limit_llm(llm, provider: str):
+    """Make an LLM respect the rate limits of its provider.
+
+    LLMs are not wrapped (the Cat checks their type), a callback handler waits for the limits before each call.
+    Backoff on 429 errors is left to the provider client, raising its `max_retries` where available.
+    """
+
+    if not hasattr(llm, "callbacks"):
+        return llm
+
+    rate_limiter = get_rate_limiter(provider)
+    handler = RateLimitCallbackHandler(rate_limiter)
+
+    if llm.callbacks is None:
+        llm.callbacks = [handler]
+    elif isinstance(llm.callbacks, list):
+        llm.callbacks = llm.callbacks + [handler]
+    else:
+        llm.callbacks.add_handler(handler)
+
+    if isinstance(getattr(llm, "max_retries", None), int):
+        llm.max_retries = max(llm.max_retries, rate_limiter.max_retries)
+
+    return llm
@@ -0,0 +1,401 @@
+import os
+import json
+import time
+import uuid
+import queue
+import shutil
+import sqlite3
+import threading
+from typing import Dict, List
+
+from starlette.datastructures import UploadFile
+
+from cat.auth.permissions import AuthUserInfo
+from cat.ingestion_pipeline import IngestionCancelled, IngestionJob
+from cat.log import log
+
+
+class IngestionJobManager:
+    """Persistent queue of the ingestion jobs requested via the `/rabbithole/` endpoints.
+
+    Jobs are stored in a SQLite database, and uploaded files next to it, so that jobs queued or running
+    when the Cat stops are run again when it restarts (see `resume`): files already ingested are skipped
+    and memory uploads restart from their last stored batch.
+    Jobs are run by a pool of threads, bounding how many documents are ingested at the same time
+    (the stages of each ingestion are bounded by the ingestion pipeline, see `RabbitHole`).
+    The database also records which documents were completely ingested (see `get_stored_document`)
+    and how far interrupted memory uploads got (see `get_memory_checkpoint`).
+
+    A job is a dictionary with its `id`, `kind` (`file`, `url` or `memory`), `source` (file name or URL),
+    `status` (`queued`, `running`, `done`, `failed` or `cancelled`), `user_id`, `created_at`, `updated_at`,
+    `error` and `progress` counters (`chunks_parsed`, `chunks_to_store`, `chunks_embedded` and `chunks_stored`).
+
+    Attributes
+    ----------
+    rabbit_hole : RabbitHole
+        Runs the jobs.
+    folder : str
+        Folder of the jobs database and of the uploaded files.
+    workers : int
+        Number of jobs run at the same time.
+
+    """
+
+    STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+    # finished jobs are forgotten after a week
+    FINISHED_JOBS_TTL = 7 * 24 * 60 * 60
+
+    # seconds an interrupted memory upload can be resumed for
+    MEMORY_CHECKPOINT_TTL = 24 * 60 * 60
+
+    PROGRESS_COUNTERS = ("chunks_parsed", "chunks_to_store", "chunks_embedded", "chunks_stored")
+
+    # bytes of an uploaded file copied at a time
+    COPY_BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, rabbit_hole, folder: str, workers: int = 2):
+        self.rabbit_hole = rabbit_hole
+        self.folder = folder
+        self.workers = workers
+        os.makedirs(self.folder, exist_ok=True)
+        self.db_path = os.path.join(self.folder, "jobs.sqlite")
+
+        # sqlite connections cannot be shared between threads
+        self.local = threading.local()
+
+        with self._get_connection() as connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    file_path TEXT,
+                    options TEXT NOT NULL,
+                    user_data TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    chunks_parsed INTEGER NOT NULL DEFAULT 0,
+                    chunks_to_store INTEGER NOT NULL DEFAULT 0,
+                    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                    chunks_stored INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                )"""
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+            )
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    source TEXT PRIMARY KEY,
+                    document_hash TEXT NOT NULL,
+                    document_chunks INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS memory_checkpoints (
+                    key TEXT PRIMARY KEY,
+                    committed INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+
+        self.queue = queue.Queue()
+        self.running = {}
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def _get_connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+        return connection
+
+    def submit(
+        self,
+        cat,
+        kind: str,
+        source: str,
+        file: UploadFile | None = None,
+        options: Dict = {},
+    ) -> Dict:
+        """Queue an ingestion job, returning it.
+
+        Parameters
+        ----------
+        cat : StrayCat
+            Session requesting the ingestion, the job is run for the same user.
+        kind : str
+            `file` for a document, `url` for a web page, `memory` for a memory export.
+        source : str
+            File name or URL.
+        file : UploadFile, optional
+            Uploaded file, copied in the jobs folder a block at a time (it blocks, call it from a thread pool
+            in async code). Parsers read the copy from disk.
+        options : Dict
+            Keyword arguments of the ingestion (`chunk_size`, `chunk_overlap` and `metadata`).
+        """
+
+        job_id = str(uuid.uuid4())
+        file_path = None
+        if file is not None:
+            job_folder = os.path.join(self.folder, job_id)
+            os.makedirs(job_folder)
+            # the file name is only kept as source, it could be anything (e.g. "..")
+            file_path = os.path.join(job_folder, "upload")
+            with open(file_path, "wb") as f:
+                shutil.copyfileobj(file.file, f, self.COPY_BLOCK_SIZE)
+
+        now = time.time()
+        with self._get_connection() as connection:
+            connection.execute(
+                """INSERT INTO jobs (id, kind, source, file_path, options, user_data, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)""",
+                (
+                    job_id,
+                    kind,
+                    source,
+                    file_path,
+                    json.dumps(options),
+                    cat.user_data.model_dump_json(warnings=False),
+                    now,
+                    now,
+                ),
+            )
+
+        log.info(f"Queued ingestion job {job_id} for {source}")
+        self._enqueue(job_id)
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str, user_id: str | None = None) -> Dict | None:
+        """A job, None if missing or if requested by another user than `user_id` (if given)."""
+
+        query = "SELECT * FROM jobs WHERE id = ?"
+        params = [job_id]
+        if user_id is not None:
+            query += " AND json_extract(user_data, '$.name') = ?"
+            params.append(user_id)
+        row = self._get_connection().execute(query, params).fetchone()
+        if row is None:
+            return None
+        return self._format_job(row)
+
+    def list_jobs(
+        self, status: str | None = None, limit: int = 100, user_id: str | None = None
+    ) -> List[Dict]:
+        """Most recent jobs first, optionally only the ones with the given status or requested by `user_id`."""
+
+        conditions = []
+        params = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if user_id is not None:
+            conditions.append("json_extract(user_data, '$.name') = ?")
+            params.append(user_id)
+        query = "SELECT * FROM jobs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        rows = self._get_connection().execute(query, params).fetchall()
+        return [self._format_job(row) for row in rows]
+
+    def cancel(self, job_id: str, user_id: str | None = None) -> Dict | None:
+        """Cancel a job: a queued job is not run, a running one stops after the chunks being processed.
+        Returns None if the job is missing or was requested by another user than `user_id` (if given)."""
+
+        if self.get_job(job_id, user_id) is None:
+            return None
+
+        # a job cannot be claimed by a worker meanwhile
+        with self.lock:
+            with self._get_connection() as connection:
+                cancelled = connection.execute(
+                    "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+                    (time.time(), job_id),
+                ).rowcount
+            running_job = self.running.get(job_id)
+
+        if cancelled:
+            log.info(f"Cancelled ingestion job {job_id}")
+            shutil.rmtree(os.path.join(self.folder, job_id), ignore_errors=True)
+        elif running_job is not None:
+            log.info(f"Cancelling running ingestion job {job_id}")
+            running_job.cancel()
+        return self.get_job(job_id)
+
+    def get_stored_document(self, source: str) -> Dict | None:
+        """Hash and number of chunks of the last complete ingestion of a source, None if it is being changed."""
+
+        row = self._get_connection().execute(
+            "SELECT document_hash, document_chunks FROM documents WHERE source = ?", (source,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"document_hash": row["document_hash"], "document_chunks": row["document_chunks"]}
+
+    def set_stored_document(
+        self, source: str, document_hash: str | None = None, document_chunks: int = 0
+    ):
+        """Record that all the chunks of a source are stored, or forget it (no hash) before changing them."""
+
+        with self._get_connection() as connection:
+            if document_hash is None:
+                connection.execute("DELETE FROM documents WHERE source = ?", (source,))
+            else:
+                connection.execute(
+                    "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                    (source, document_hash, document_chunks, time.time()),
+                )
+
+    def get_memory_checkpoint(self, key: str) -> int:
+        """Number of memories of an upload already stored, 0 if it was not interrupted recently."""
+
+        row = self._get_connection().execute(
+            "SELECT committed FROM memory_checkpoints WHERE key = ? AND updated_at >= ?",
+            (key, time.time() - self.MEMORY_CHECKPOINT_TTL),
+        ).fetchone()
+        return row["committed"] if row is not None else 0
+
+    def set_memory_checkpoint(self, key: str, committed: int | None = None):
+        """Record the number of memories of an upload already stored, or forget it (None) once done."""
+
+        with self._get_connection() as connection:
+            if committed is None:
+                connection.execute("DELETE FROM memory_checkpoints WHERE key = ?", (key,))
+            else:
+                connection.execute(
+                    "INSERT OR REPLACE INTO memory_checkpoints VALUES (?, ?, ?)",
+                    (key, committed, time.time()),
+                )
+
+    def resume(self):
+        """Queue again the jobs interrupted by a restart, forget old finished jobs and memory checkpoints."""
+
+        with self._get_connection() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running'"
+            )
+            connection.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND updated_at < ?",
+                (time.time() - self.FINISHED_JOBS_TTL,),
+            )
+            connection.execute(
+                "DELETE FROM memory_checkpoints WHERE updated_at < ?",
+                (time.time() - self.MEMORY_CHECKPOINT_TTL,),
+            )
+            rows = connection.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+
+        if rows:
+            log.info(f"Resuming {len(rows)} ingestion jobs")
+        for row in rows:
+            self._enqueue(row["id"])
+
+    def _enqueue(self, job_id: str):
+        with self.lock:
+            if not self.threads:
+                self.threads = [
+                    threading.Thread(target=self._work, daemon=True)
+                    for _ in range(max(self.workers, 1))
+                ]
+                for thread in self.threads:
+                    thread.start()
+        self.queue.put(job_id)
+
+    def _work(self):
+        while True:
+            job_id = self.queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                log.error(f"Ingestion job {job_id} could not be run: {e}")
+
+    def _claim(self, job_id: str):
+        # only queued jobs are run, once
+        with self._get_connection() as connection:
+            claimed = connection.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            ).rowcount
+            if not claimed:
+                return None
+            return connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def _run(self, job_id: str):
+        # the session of the user who requested the job (it may not be around anymore after a restart),
+        # imported here as StrayCat depends on the CheshireCat owning the rabbit hole
+        from cat.looking_glass.stray_cat import StrayCat
+
+        with self.lock:
+            row = self._claim(job_id)
+            if row is None:
+                return
+            job = IngestionJob(None, row["source"], **json.loads(row["options"]))
+            self.running[job_id] = job
+
+        status, error = "done", None
+        try:
+            job.cat = StrayCat(AuthUserInfo(**json.loads(row["user_data"])))
+            if row["kind"] == "url":
+                job.file = row["source"]
+                self.rabbit_hole.ingest(job)
+            else:
+                with open(row["file_path"], "rb") as f:
+                    upload = UploadFile(file=f, filename=row["source"])
+                    if row["kind"] == "memory":
+                        self.rabbit_hole.ingest_memory(job.cat, upload, job=job)
+                    else:
+                        job.file = upload
+                        self.rabbit_hole.ingest(job)
+        except IngestionCancelled:
+            status = "cancelled"
+        except Exception as e:
+            log.error(f"Ingestion job {job_id} failed: {e}")
+            status, error = "failed", str(e)
+
+        with self._get_connection() as connection:
+            connection.execute(
+                """UPDATE jobs SET status = ?, error = ?, updated_at = ?,
+                chunks_parsed = ?, chunks_to_store = ?, chunks_embedded = ?, chunks_stored = ?
+                WHERE id = ?""",
+                (
+                    status,
+                    error,
+                    time.time(),
+                    *[getattr(job, counter) for counter in self.PROGRESS_COUNTERS],
+                    job_id,
+                ),
+            )
+        del self.running[job_id]
+        if row["file_path"]:
+            shutil.rmtree(os.path.dirname(row["file_path"]), ignore_errors=True)
+        log.info(f"Ingestion job {job_id} {status}")
+
+    def _format_job(self, row) -> Dict:
+        job = {
+            "id": row["id"],
+            "kind": row["kind"],
+            "source": row["source"],
+            "status": row["status"],
+            "user_id": json.loads(row["user_data"])["name"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "error": row["error"],
+            "progress": {counter: row[counter] for counter in self.PROGRESS_COUNTERS},
+        }
+
+        # counters of running jobs are kept in memory
+        running_job = self.running.get(row["id"])
+        if running_job is not None:
+            job["progress"] = {
+                counter: getattr(running_job, counter) for counter in self.PROGRESS_COUNTERS
+            }
+        return job
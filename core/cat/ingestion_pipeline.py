@@ -0,0 +1,248 @@
+import queue
+import pickle
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List, Tuple
+
+from cat.log import log
+
+
+# set in the threads of the pipeline stages
+_worker_state = threading.local()
+
+
+class IngestionCancelled(Exception):
+    """Raised waiting for a job cancelled before it was done."""
+
+
+class IngestionJob:
+    """A document going through the ingestion pipeline.
+
+    Stages keep their intermediate results on the job (e.g. the chunks to store, the stored points),
+    the pipeline tracks how many of its items are still queued or being processed.
+
+    Attributes
+    ----------
+    cat : StrayCat
+        Session the document is ingested for.
+    source : str
+        Source of the chunks, jobs with the same source are ingested one after the other.
+    file : str | UploadFile | None
+        File to read and parse, or None if the job starts from already split `docs`.
+    docs : List[Document] | None
+        Chunks of the document.
+    error : Exception | None
+        First error raised processing the job, the remaining items of a failed (or cancelled) job are dropped.
+    chunks_parsed, chunks_embedded, chunks_stored : int
+        Progress counters, updated by the stages.
+
+    """
+
+    def __init__(
+        self,
+        cat,
+        source: str,
+        file=None,
+        docs=None,
+        chunk_size: int | None = None,
+        chunk_overlap: int | None = None,
+        metadata: dict = {},
+        document_hash: str | None = None,
+    ):
+        self.cat = cat
+        self.source = source
+        self.file = file
+        self.docs = docs
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.metadata = metadata
+        self.document_hash = document_hash
+
+        # results of the stages
+        self.skipped = False
+        self.chunks_parsed = 0
+        self.chunks_to_store = 0
+        self.chunks_embedded = 0
+        self.chunks_stored = 0
+        self.document_chunks = 0
+        self.outdated_ids = []
+        self.stored_points = []
+        self.last_notification = None
+
+        # pipeline state
+        self.next = None
+        self.pending = 0
+        self.error = None
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def cancel(self):
+        """Stop the job: items being processed are completed, the others are dropped."""
+        with self.lock:
+            if self.error is None:
+                self.error = IngestionCancelled(f"Ingestion of {self.source} was cancelled")
+
+    def wait(self) -> "IngestionJob":
+        """Wait for the job to be done, raising its error if it failed."""
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+
+class IngestionPipeline:
+    """Stages processing ingestion jobs concurrently, each run by a pool of threads.
+
+    Each stage is a function receiving a job and an item produced for it by the previous stage
+    (None for the first stage) and returning the items for the next stage, usually as a generator
+    so that the next stage starts before the current one is done.
+    Stages are connected by bounded queues: a stage producing faster than the next one can consume
+    waits, keeping in memory at most `queue_size` items per stage (jobs waiting for the first stage are not bounded).
+    Jobs with the same source are queued one after the other, each once the previous one is done.
+    When all the items of a job have gone through all the stages, `finish` is called with the job.
+
+    CPU bound work (e.g. parsing PDFs) can be sent to a pool of processes with `run_in_process`.
+
+    Attributes
+    ----------
+    stages : List[Tuple[Callable, int]]
+        Function of each stage and number of threads running it.
+    finish : Callable
+        Called with each job once all its items are processed, unless the job failed.
+    queue_size : int
+        Max number of items waiting for each stage.
+    processes : int
+        Size of the process pool used by `run_in_process`, 0 to run in the calling thread instead.
+
+    """
+
+    def __init__(
+        self,
+        stages: List[Tuple[Callable[[IngestionJob, Any], Iterable], int]],
+        finish: Callable[[IngestionJob], None],
+        queue_size: int = 8,
+        processes: int = 0,
+    ):
+        self.stages = stages
+        self.finish = finish
+        self.queue_size = queue_size
+        self.processes = processes
+
+        self.queues = None
+        self.process_pool = None
+        self.active_sources = {}
+        self.lock = threading.Lock()
+
+    def run(self, job: IngestionJob) -> IngestionJob:
+        """Process a job and wait for it to be done, raising its error if it failed."""
+        return self.submit(job).wait()
+
+    def submit(self, job: IngestionJob) -> IngestionJob:
+        """Queue a job and return it without waiting, see `IngestionJob.wait`."""
+
+        # a hook ingesting documents from inside a stage would wait for itself, the job is processed right away
+        if getattr(_worker_state, "in_pipeline", False):
+            try:
+                self._run_inline(job, 0, None)
+                self.finish(job)
+            except Exception as e:
+                job.error = e
+            job.done.set()
+            return job
+
+        with self.lock:
+            if self.queues is None:
+                self._start()
+            # the chunks of a source are compared with the ones stored by the previous job,
+            # the job is queued once it is done (see `_release`) without holding a worker meanwhile
+            previous = self.active_sources.get(job.source)
+            self.active_sources[job.source] = job
+            if previous is not None:
+                previous.next = job
+                return job
+
+        self._put(0, job, None)
+        return job
+
+    def run_in_process(self, function: Callable, *args):
+        """Call function in the process pool, or in the calling thread if it cannot be sent to another process."""
+
+        if self.processes <= 0:
+            return function(*args)
+
+        try:
+            # functions and arguments defined by plugins may not be picklable
+            pickle.dumps((function, args))
+        except Exception as e:
+            log.debug(f"Running {function} in the current process: {e}")
+            return function(*args)
+
+        with self.lock:
+            if self.process_pool is None:
+                # forking a multithreaded process could copy locks held by other threads
+                self.process_pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+        return self.process_pool.submit(function, *args).result()
+
+    def _start(self):
+        # jobs are queued for the first stage also by workers releasing the previous job of a source,
+        # which must not wait for the first stage
+        self.queues = [
+            queue.Queue(maxsize=self.queue_size if s > 0 else 0) for s in range(len(self.stages))
+        ]
+        for s, (function, workers) in enumerate(self.stages):
+            for _ in range(max(workers, 1)):
+                threading.Thread(target=self._work, args=(s,), daemon=True).start()
+
+    def _put(self, s: int, job: IngestionJob, item):
+        with job.lock:
+            job.pending += 1
+        self.queues[s].put((job, item))
+
+    def _work(self, s: int):
+        _worker_state.in_pipeline = True
+        function = self.stages[s][0]
+        while True:
+            job, item = self.queues[s].get()
+            try:
+                if job.error is None:
+                    for next_item in function(job, item) or []:
+                        if job.error is not None:
+                            break
+                        if s + 1 < len(self.stages):
+                            self._put(s + 1, job, next_item)
+            except Exception as e:
+                log.error(f"Error ingesting {job.source}: {e}")
+                job.error = job.error or e
+            finally:
+                self._release(job)
+
+    def _release(self, job: IngestionJob):
+        with job.lock:
+            job.pending -= 1
+            if job.pending > 0:
+                return
+
+        # all the items of the job went through all the stages
+        try:
+            if job.error is None:
+                self.finish(job)
+        except Exception as e:
+            log.error(f"Error ingesting {job.source}: {e}")
+            job.error = e
+        finally:
+            with self.lock:
+                next_job = job.next
+                if self.active_sources.get(job.source) is job:
+                    del self.active_sources[job.source]
+            job.done.set()
+            if next_job is not None:
+                self._put(0, next_job, None)
+
+    def _run_inline(self, job: IngestionJob, s: int, item):
+        for next_item in self.stages[s][0](job, item) or []:
+            if s + 1 < len(self.stages):
+                self._run_inline(job, s + 1, next_item)
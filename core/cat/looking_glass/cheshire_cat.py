@@ -1,3 +1,4 @@
+import os
 import time
 from typing import List, Dict
 from typing_extensions import Protocol
@@ -22,12 +23,15 @@ from cat.factory.llm import get_llm_from_name
 from cat.agents.main_agent import MainAgent
 from cat.looking_glass.white_rabbit import WhiteRabbit
 from cat.log import log
+from cat.env import get_env
 from cat.mad_hatter.mad_hatter import MadHatter
 from cat.memory.long_term_memory import LongTermMemory
 from cat.rabbit_hole import RabbitHole
 from cat.utils import singleton
 from cat import utils
 from cat.cache.cache_manager import CacheManager
+from cat.cache.cached_embedder import CachedEmbedder
+from cat.factory.batching_embedder import BatchingEmbedder
 
 
 class Procedure(Protocol):
@@ -100,7 +104,26 @@ class CheshireCat:
         self.rabbit_hole = RabbitHole(self)  # :(
 
         # Cache for sessions / working memories et al.
-        self.cache = CacheManager().cache
+        cache_manager = CacheManager()
+        self.cache = cache_manager.cache
+
+        # Periodically reclaim expired cache items in bulk
+        self.white_rabbit.schedule_interval_job(
+            self.cache.evict_expired,
+            job_id="cache_evict_expired",
+            seconds=int(get_env("CCAT_CACHE_SWEEP_INTERVAL")),
+        )
+        self.white_rabbit.schedule_interval_job(
+            self.evict_cached_embeddings,
+            job_id="embedding_cache_evict",
+            seconds=int(get_env("CCAT_CACHE_SWEEP_INTERVAL")),
+        )
+        if cache_manager.write_behind:
+            self.white_rabbit.schedule_interval_job(
+                self.cache.flush,
+                job_id="cache_flush",
+                seconds=int(get_env("CCAT_CACHE_FLUSH_INTERVAL")),
+            )
 
         # allows plugins to do something after the cat bootstrap is complete
         self.mad_hatter.execute_hook("after_cat_bootstrap", cat=self)
@@ -124,6 +147,28 @@ class CheshireCat:
         self._llm = self.load_language_model()
         self.embedder = self.load_language_embedder()
 
+        # coalesce concurrent embedding requests of different sessions
+        if get_env("CCAT_EMBEDDER_MICRO_BATCHING") == "true":
+            self.embedder = BatchingEmbedder(
+                self.embedder,
+                max_batch_size=int(get_env("CCAT_EMBEDDER_MICRO_BATCH_SIZE")),
+                max_wait=float(get_env("CCAT_EMBEDDER_MICRO_BATCH_WAIT_MS")) / 1000,
+            )
+
+        # do not embed again already seen texts
+        if get_env("CCAT_EMBEDDING_CACHE") == "true":
+            self.embedder = CachedEmbedder(
+                self.embedder,
+                os.path.join(get_env("CCAT_CACHE_DIR"), "embeddings.sqlite"),
+                max_items=int(get_env("CCAT_EMBEDDING_CACHE_MAX_ITEMS")),
+                max_stored_items=int(get_env("CCAT_EMBEDDING_CACHE_MAX_STORED_ITEMS")),
+            )
+
+    def evict_cached_embeddings(self):
+        """Keep the embeddings cache within its size on disk (the embedder can change at runtime)."""
+        if isinstance(self.embedder, CachedEmbedder):
+            self.embedder.evict_expired()
+
     def load_language_model(self) -> BaseLanguageModel:
         """Large Language Model (LLM) selection at bootstrap time.
 
@@ -343,8 +388,10 @@ class CheshireCat:
                 endpoint.activate(self.fastapi_app)
 
     def embed_procedures(self):
-        # Retrieve from vectorDB all procedural embeddings
-        embedded_procedures, _ = self.memory.vectors.procedural.get_all_points()
+        # Retrieve from vectorDB all procedural embeddings (vectors are not needed to compare hashes)
+        embedded_procedures = list(
+            self.memory.vectors.procedural.iter_all_points(with_vectors=False)
+        )
         embedded_procedures_hashes = self.build_embedded_procedures_hashes(
             embedded_procedures
         )
@@ -374,25 +421,31 @@ class CheshireCat:
             active_procedures_hashes[p] for p in points_to_be_embedded
         ]
         
-        if active_triggers_to_be_embedded:
-            log.info("Embedding new procedural triggers:")
-        for t in active_triggers_to_be_embedded:
+        if not active_triggers_to_be_embedded:
+            return
 
+        log.info("Embedding new procedural triggers:")
 
-            metadata = {
+        # embed all the triggers at once and store them in bulk
+        triggers_contents = [t["content"] for t in active_triggers_to_be_embedded]
+        triggers_embeddings = self.embedder.embed_documents(triggers_contents)
+        triggers_metadata = [
+            {
                 "source": t["source"],
                 "type": t["type"],
                 "trigger_type": t["trigger_type"],
                 "when": time.time(),
             }
+            for t in active_triggers_to_be_embedded
+        ]
+        self.memory.vectors.procedural.add_points(
+            triggers_contents,
+            triggers_embeddings,
+            triggers_metadata,
+            batch_size=int(get_env("CCAT_QDRANT_BATCH_SIZE")),
+        )
 
-            trigger_embedding = self.embedder.embed_documents([t["content"]])
-            self.memory.vectors.procedural.add_point(
-                t["content"],
-                trigger_embedding[0],
-                metadata,
-            )
-
+        for t in active_triggers_to_be_embedded:
             log.info(
                 f" {t['source']}.{t['trigger_type']}.{t['content']}"
             )
@@ -15,7 +15,7 @@ from langchain_core.output_parsers.string import StrOutputParser
 from cat.auth.permissions import AuthUserInfo
 from cat.looking_glass.cheshire_cat import CheshireCat
 from cat.looking_glass.callbacks import NewTokenHandler, ModelInteractionHandler
-from cat.memory.working_memory import WorkingMemory
+from cat.memory.working_memory import WorkingMemory, MAX_WORKING_HISTORY_LENGTH
 from cat.convo.messages import CatMessage, UserMessage, MessageWhy, EmbedderModelInteraction
 from cat.agents import AgentOutput
 from cat.cache.cache_item import CacheItem
@@ -58,6 +58,9 @@ class StrayCat:
     "Rome"
     """
 
+    # attempts to save the working memory while other processes of the same user keep changing it
+    MAX_WORKING_MEMORY_WRITE_ATTEMPTS = 5
+
     def __init__(
         self,
         user_data: AuthUserInfo
@@ -119,17 +122,63 @@ class StrayCat:
 
         return why
     
+    def __get_working_memory_version(self):
+        # the working memory object may also be replaced altogether
+        return id(self.working_memory), self.working_memory.version
+
     def load_working_memory_from_cache(self):
         """Load the working memory from the cache."""
         
-        self.working_memory = \
-            self.cache.get_value(f"{self.user_id}_working_memory") or WorkingMemory()
+        cache_item = self.cache.get_item(f"{self.user_id}_working_memory")
+        self.working_memory = cache_item.value if cache_item else WorkingMemory()
+        # remember the loaded version, unchanged working memories are not written back
+        self.__working_memory_version = self.__get_working_memory_version()
+        # caches supporting versioned writes will refuse to overwrite changes made by other processes
+        self.__cache_version = getattr(cache_item, "version", None) if cache_item else 0
+        # messages added afterwards are merged into the history changed by other processes
+        self.__loaded_history = list(self.working_memory.history)
+
+    def __merge_working_memory_from_cache(self):
+        # reload the working memory changed by another process, keeping this session turn
+        new_messages = [
+            m for m in self.working_memory.history
+            if not any(m is loaded for loaded in self.__loaded_history)
+        ]
+        cache_item = self.cache.get_item(f"{self.user_id}_working_memory")
+        history = cache_item.value.history if cache_item else []
+        self.working_memory.history = (history + new_messages)[-MAX_WORKING_HISTORY_LENGTH:]
+        self.__cache_version = getattr(cache_item, "version", None) if cache_item else 0
+        self.__loaded_history = list(history)
 
     def update_working_memory_cache(self):
-        """Update the working memory in the cache."""
+        """Update the working memory in the cache, only if it changed since it was loaded.
 
-        updated_cache_item = CacheItem(f"{self.user_id}_working_memory", self.working_memory, -1)
-        self.cache.insert(updated_cache_item)
+        If another process changed the cached working memory meanwhile, the messages added by this session
+        are appended to its history and the write is retried.
+
+        Raises
+        ------
+        Exception
+            If the working memory keeps being changed by other processes.
+        """
+
+        if self.__get_working_memory_version() == self.__working_memory_version:
+            return
+
+        for _ in range(self.MAX_WORKING_MEMORY_WRITE_ATTEMPTS):
+            updated_cache_item = CacheItem(
+                f"{self.user_id}_working_memory", self.working_memory, -1, version=self.__cache_version
+            )
+            if self.cache.insert(updated_cache_item) is not False:
+                break
+            log.warning(f"Working memory of user {self.user_id} was changed by another process, merging it")
+            self.__merge_working_memory_from_cache()
+        else:
+            raise Exception(f"Could not save the working memory of user {self.user_id}, too many concurrent changes")
+
+        self.__working_memory_version = self.__get_working_memory_version()
+        self.__cache_version = updated_cache_item.version
+        self.__loaded_history = list(self.working_memory.history)
 
     def send_ws_message(self, content: str | dict, msg_type: MSG_TYPES = "notification"):
         """Send a message via websocket.
@@ -316,12 +365,14 @@ class StrayCat:
         self.mad_hatter.execute_hook("before_cat_recalls_memories", cat=self)
 
         # Setting default recall configs for each memory
+        # (vectors are not needed by the agents, they are not retrieved)
         # TODO: can these data structures become instances of a RecallSettings class?
         default_episodic_recall_config = {
             "embedding": recall_query_embedding,
             "k": 3,
             "threshold": 0.7,
             "metadata": {"source": self.user_id},
+            "with_vectors": False,
         }
 
         default_declarative_recall_config = {
@@ -329,6 +380,7 @@ class StrayCat:
             "k": 3,
             "threshold": 0.7,
             "metadata": {},
+            "with_vectors": False,
         }
 
         default_procedural_recall_config = {
@@ -336,36 +388,45 @@ class StrayCat:
             "k": 3,
             "threshold": 0.7,
             "metadata": {},
+            "with_vectors": False,
         }
 
         # hooks to change recall configs for each memory
-        recall_configs = [
-            self.mad_hatter.execute_hook(
+        recall_configs = {
+            "episodic": self.mad_hatter.execute_hook(
                 "before_cat_recalls_episodic_memories",
                 default_episodic_recall_config,
                 cat=self,
             ),
-            self.mad_hatter.execute_hook(
+            "declarative": self.mad_hatter.execute_hook(
                 "before_cat_recalls_declarative_memories",
                 default_declarative_recall_config,
                 cat=self,
             ),
-            self.mad_hatter.execute_hook(
+            "procedural": self.mad_hatter.execute_hook(
                 "before_cat_recalls_procedural_memories",
                 default_procedural_recall_config,
                 cat=self,
             ),
-        ]
-
-        memory_types = self.memory.vectors.collections.keys()
+        }
 
-        for config, memory_type in zip(recall_configs, memory_types):
+        # collections added by plugins are recalled with default configs
+        for memory_type in self.memory.vectors.collections.keys():
+            if memory_type not in recall_configs:
+                recall_configs[memory_type] = {
+                    "embedding": recall_query_embedding,
+                    "k": 3,
+                    "threshold": 0.7,
+                    "metadata": {},
+                    "with_vectors": False,
+                }
+
+        # search all the collections concurrently
+        recalled_memories = self.memory.vectors.recall_memories_from_embeddings(
+            recall_configs
+        )
+        for memory_type, memories in recalled_memories.items():
             memory_key = f"{memory_type}_memories"
-
-            # recall relevant memories for collection
-            vector_memory = getattr(self.memory.vectors, memory_type)
-            memories = vector_memory.recall_memories_from_embedding(**config)
-
             setattr(
                 self.working_memory, memory_key, memories
             )  # self.working_memory.procedural_memories = ...
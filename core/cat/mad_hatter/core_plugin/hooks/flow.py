@@ -165,6 +165,8 @@ def before_cat_recalls_episodic_memories(episodic_recall_config: dict, cat) -> d
     The hook return the values for maximum number (k) of items to retrieve from memory and the score threshold applied
     to the query in the vector memory (items with score under threshold are not retrieved).
     It also returns the embedded query (embedding) and the conditions on recall (metadata).
+    Memories vectors are not retrieved unless `with_vectors` is True, and `payload_keys` can restrict the
+    retrieved metadata to a list of keys.
 
     Parameters
     ----------
@@ -196,6 +198,8 @@ def before_cat_recalls_declarative_memories(
     The hook return the values for maximum number (k) of items to retrieve from memory and the score threshold applied
     to the query in the vector memory (items with score under threshold are not retrieved)
     It also returns the embedded query (embedding) and the conditions on recall (metadata).
+    Memories vectors are not retrieved unless `with_vectors` is True, and `payload_keys` can restrict the
+    retrieved metadata to a list of keys.
 
     Parameters
     ----------
@@ -225,6 +229,8 @@ def before_cat_recalls_procedural_memories(procedural_recall_config: dict, cat)
     The hook return the values for maximum number (k) of items to retrieve from memory and the score threshold applied
     to the query in the vector memory (items with score under threshold are not retrieved)
     It also returns the embedded query (embedding) and the conditions on recall (metadata).
+    Memories vectors are not retrieved unless `with_vectors` is True, and `payload_keys` can restrict the
+    retrieved metadata to a list of keys.
 
     Parameters
     ----------
@@ -0,0 +1,164 @@
+import re
+import json
+import gzip
+import codecs
+from typing import BinaryIO, Dict, Iterator
+
+# whitespace allowed between JSON tokens
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class MemoryExportReader:
+    """Read a memory export one point at a time, with memory bounded by the size of a single point.
+
+    Two formats are supported (both optionally gzip compressed):
+
+    - JSON, as exported by the admin: `{"embedder": "...", "collections": {"declarative": [point, ...]}}`,
+      the embedder must come before the collections;
+    - NDJSON, a `{"embedder": "..."}` line followed by one point per line
+      (e.g. the output of `/memory/collections/declarative/points/export`).
+
+    Points are either `{"id", "page_content", "metadata", "vector"}` or `{"id", "payload", "vector"}`
+    and are yielded in the first form. Only the points of the declarative collection are read.
+
+    Attributes
+    ----------
+    embedder : str | None
+        Name of the embedder that produced the vectors, known before the first point (files without it are invalid).
+
+    """
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        ndjson: bool = False,
+        compressed: bool = False,
+        chunk_size: int = 1 << 20,
+    ):
+        self.file = gzip.GzipFile(fileobj=file, mode="rb") if compressed else file
+        self.ndjson = ndjson
+        self.chunk_size = chunk_size
+        self.embedder = None
+
+        # JSON parsing state: decoded text not parsed yet, starting at pos
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    @classmethod
+    def from_file_name(cls, file: BinaryIO, file_name: str, **kwargs) -> "MemoryExportReader":
+        """Reader for a file, guessing its format from its name (.json, .ndjson, .jsonl, .gz)."""
+
+        file_name = file_name.lower()
+        compressed = file_name.endswith(".gz")
+        if compressed:
+            file_name = file_name[: -len(".gz")]
+        ndjson = file_name.endswith((".ndjson", ".jsonl"))
+        return cls(file, ndjson=ndjson, compressed=compressed, **kwargs)
+
+    def __iter__(self) -> Iterator[Dict]:
+        points = self._read_ndjson() if self.ndjson else self._read_json()
+        for point in points:
+            if "payload" in point:
+                payload = point["payload"] or {}
+                point = {
+                    "id": point["id"],
+                    "page_content": payload.get("page_content"),
+                    "metadata": payload.get("metadata") or {},
+                    "vector": point["vector"],
+                }
+            yield point
+
+    def _read_ndjson(self):
+        # binary lines, json accepts utf-8 bytes
+        for n, line in enumerate(self.file):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "vector" not in item:
+                if n == 0 and "embedder" in item:
+                    self.embedder = item["embedder"]
+                    continue
+                raise ValueError(f"Line {n + 1} is not a memory point")
+            # vectors can only be checked against the embedder they were produced with
+            if self.embedder is None:
+                raise ValueError("The embedder must be declared on the first line")
+            yield item
+
+    def _read_json(self):
+        self._expect("{")
+        while self._next_member("}"):
+            key = self._read_value()
+            self._expect(":")
+            if key == "collections":
+                yield from self._read_collections()
+            else:
+                value = self._read_value()
+                if key == "embedder":
+                    self.embedder = value
+
+    def _read_collections(self):
+        self._expect("{")
+        while self._next_member("}"):
+            collection_name = self._read_value()
+            self._expect(":")
+            if collection_name == "declarative" and self.embedder is None:
+                raise ValueError("The embedder must be declared before the collections")
+
+            self._expect("[")
+            while self._next_member("]"):
+                point = self._read_value()
+                if collection_name == "declarative":
+                    yield point
+
+    def _fill(self):
+        chunk = self.file.read(self.chunk_size)
+        self.text = self.text[self.pos :]
+        self.pos = 0
+        if chunk:
+            self.text += self.decoder.decode(chunk)
+        else:
+            self.text += self.decoder.decode(b"", final=True)
+            self.eof = True
+
+    def _peek(self) -> str:
+        # next non whitespace character, empty at the end of the file
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or self.eof:
+                return self.text[self.pos : self.pos + 1]
+            self._fill()
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f'Invalid memory file: expected "{char}", found "{found}"')
+        self.pos += 1
+
+    def _next_member(self, closing: str) -> bool:
+        """Whether a container has another member, consuming the separating comma or the closing character."""
+
+        char = self._peek()
+        if char == closing:
+            self.pos += 1
+            return False
+        if char == ",":
+            self.pos += 1
+            self._peek()
+        return True
+
+    def _read_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.text, self.pos)
+                # a number at the end of the text may continue in the next chunk
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
@@ -0,0 +1,120 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from qdrant_client.http.models import PointStruct, Record, ScoredPoint
+
+
+class BaseVectorBackend(ABC):
+    """Storage and search of the points of the vector memory collections.
+
+    Points are exchanged as Qdrant models (`PointStruct` to write them, `ScoredPoint` and `Record` to read them),
+    filters are dictionaries of metadata values, as accepted by `VectorMemoryCollection`:
+    `{"source": "user"}` matches the points with `metadata.source == "user"`,
+    nested dictionaries match nested keys and lists match all their values.
+    """
+
+    def is_remote(self) -> bool:
+        """Whether the points are stored by a server, so that the backend can serve concurrent requests."""
+        return False
+
+    @abstractmethod
+    def get_collection_names(self) -> List[str]:
+        pass
+
+    @abstractmethod
+    def create_collection(
+        self, collection_name: str, vector_size: int, tenant_field: Optional[str] = None
+    ):
+        """Create a collection, deleting it first if it already exists.
+
+        Backends partitioning points by tenant use `tenant_field`, the others ignore it.
+        """
+        pass
+
+    @abstractmethod
+    def delete_collection(self, collection_name: str) -> bool:
+        pass
+
+    def configure_collection(self, collection_name: str, tenant_field: Optional[str] = None):
+        """Update indexes and settings of an existing collection, migrating it in place if needed."""
+        pass
+
+    @abstractmethod
+    def get_vector_size(self, collection_name: str) -> int:
+        pass
+
+    @abstractmethod
+    def get_aliases(self, collection_name: str) -> List[str]:
+        pass
+
+    @abstractmethod
+    def create_alias(self, collection_name: str, alias: str):
+        pass
+
+    @abstractmethod
+    def count_points(self, collection_name: str) -> int:
+        pass
+
+    def get_collection_info(self, collection_name: str) -> Any:
+        """Describe a collection (the content depends on the backend)."""
+        return {
+            "vector_size": self.get_vector_size(collection_name),
+            "aliases": self.get_aliases(collection_name),
+            "points_count": self.count_points(collection_name),
+        }
+
+    @abstractmethod
+    def upsert(self, collection_name: str, points: List[PointStruct], **kwargs) -> bool:
+        """Add points to a collection, replacing the ones with the same id. Returns False if the write failed.
+
+        Extra keyword arguments are backend specific options (e.g. `wait` for Qdrant).
+        """
+        pass
+
+    @abstractmethod
+    def search(
+        self,
+        collection_name: str,
+        vector: List[float],
+        filter: Optional[Dict] = None,
+        k: int = 5,
+        threshold: Optional[float] = None,
+        with_vectors: bool = True,
+        with_payload: bool | List[str] = True,
+    ) -> List[ScoredPoint]:
+        """Find the k points most similar to vector (cosine similarity), optionally above a threshold.
+
+        `with_payload` can be a list of payload keys (dot separated for nested keys) to retrieve only those.
+        """
+        pass
+
+    @abstractmethod
+    def retrieve(
+        self, collection_name: str, ids: Iterable, with_vectors: bool = True
+    ) -> List[Record]:
+        """Get points by id, missing ones are omitted."""
+        pass
+
+    @abstractmethod
+    def scroll(
+        self,
+        collection_name: str,
+        limit: int,
+        offset: Any = None,
+        with_vectors: bool = True,
+        filter: Optional[Dict] = None,
+    ) -> Tuple[List[Record], Any]:
+        """Get a page of points, optionally matching a filter, and the offset of the next one (None on the last page)."""
+        pass
+
+    @abstractmethod
+    def delete_points(self, collection_name: str, ids: Iterable) -> Any:
+        pass
+
+    @abstractmethod
+    def delete_points_by_filter(self, collection_name: str, filter: Dict) -> Any:
+        pass
+
+    def save_dump(self, collection_name: str, folder: str):
+        """Save a snapshot of a collection in folder, for backends supporting it."""
+        pass
@@ -0,0 +1,532 @@
+import os
+import copy
+import json
+import uuid
+import bisect
+import shutil
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from qdrant_client.http.models import PointStruct, Record, ScoredPoint
+
+from cat.memory.vector_backends.base_vector_backend import BaseVectorBackend
+from cat.log import log
+
+
+def normalize_point_id(point_id):
+    """Point ids are unsigned integers or UUIDs (stored in their canonical form, like the Qdrant server does)."""
+
+    if isinstance(point_id, int) and not isinstance(point_id, bool) and point_id >= 0:
+        return point_id
+    try:
+        return str(uuid.UUID(str(point_id)))
+    except ValueError:
+        raise ValueError(f"Point id {point_id} is neither an unsigned integer nor a UUID")
+
+
+def get_id_sort_key(point_id):
+    # points are scrolled in the order of their ids, integers before UUIDs (as in Qdrant)
+    return (isinstance(point_id, str), point_id)
+
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    # unit vectors, so that cosine similarity is a dot product
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def get_filter_conditions(filter: dict, path=()) -> List[tuple]:
+    """Flatten a metadata filter into (path, value) conditions, all of them must match."""
+
+    conditions = []
+    for key, value in filter.items():
+        if isinstance(value, dict):
+            conditions.extend(get_filter_conditions(value, path + (key,)))
+        elif isinstance(value, list):
+            for _value in value:
+                if isinstance(_value, dict):
+                    conditions.extend(get_filter_conditions(_value, path + (key,)))
+                else:
+                    conditions.append((path + (key,), _value))
+        else:
+            conditions.append((path + (key,), value))
+    return conditions
+
+
+def get_values(obj, path) -> list:
+    """Values found at path in obj, looking into all the elements of the lists met along the way."""
+
+    if isinstance(obj, list):
+        return [value for element in obj for value in get_values(element, path)]
+    if not path:
+        return [obj]
+    if not isinstance(obj, dict) or path[0] not in obj:
+        return []
+    return get_values(obj[path[0]], path[1:])
+
+
+def get_index_keys(payload):
+    """Index keys of the top level metadata values of a payload (strings, integers and booleans)."""
+
+    for key, value in ((payload or {}).get("metadata") or {}).items():
+        for element in value if isinstance(value, list) else [value]:
+            if isinstance(element, (str, int, bool)):
+                yield key, get_index_key(element)
+
+
+def get_index_key(value):
+    # True == 1 in python, but they are different payload values
+    return (type(value).__name__, value)
+
+
+def project_payload(payload: dict, with_payload: bool | List[str]):
+    if with_payload is True:
+        return copy.deepcopy(payload)
+    if not with_payload:
+        return None
+
+    projected = {}
+    for key in with_payload:
+        source, target = payload, projected
+        parts = key.split(".")
+        for part in parts[:-1]:
+            if not isinstance(source, dict) or not isinstance(source.get(part), dict):
+                break
+            source = source[part]
+            target = target.setdefault(part, {})
+        else:
+            if isinstance(source, dict) and parts[-1] in source:
+                target[parts[-1]] = copy.deepcopy(source[parts[-1]])
+    return projected
+
+
+class NumpyCollection:
+    """Points of a collection of the NumPy vector backend.
+
+    Unit vectors are stored in a float32 matrix, memory mapped from a file, one row for each point.
+    Ids and payloads are stored in a SQLite table with the row of their vector, and kept in memory together with
+    an inverted index of the top level metadata values, used to filter points.
+
+    Attributes
+    ----------
+    folder : str | None
+        Folder of the collection files, None to keep the collection in memory.
+    vector_size : int
+        Size of the vectors.
+    aliases : List[str]
+        Aliases of the collection.
+    size : int
+        Number of rows in use, including the free ones (deleted points), reused by the next points.
+
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, folder: Optional[str], vector_size: Optional[int] = None):
+        self.folder = folder
+        self.lock = threading.RLock()
+
+        if folder is None:
+            self.vector_size = vector_size
+            self.aliases = []
+            self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        else:
+            if vector_size is not None:
+                os.makedirs(folder, exist_ok=True)
+                self.vector_size = vector_size
+                self.aliases = []
+                self._save_config()
+            else:
+                with open(os.path.join(folder, "config.json")) as f:
+                    config = json.load(f)
+                self.vector_size = config["vector_size"]
+                self.aliases = config["aliases"]
+            self.connection = sqlite3.connect(
+                os.path.join(folder, "points.sqlite"), check_same_thread=False
+            )
+            self.connection.execute("PRAGMA journal_mode=WAL")
+
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS points (row INTEGER PRIMARY KEY, id TEXT NOT NULL, payload TEXT)"
+        )
+
+        self.vectors = None
+        self._resize(self.INITIAL_CAPACITY)
+        self._load_points()
+
+    def _save_config(self):
+        if self.folder is None:
+            return
+        with open(os.path.join(self.folder, "config.json"), "w") as f:
+            json.dump({"vector_size": self.vector_size, "aliases": self.aliases}, f)
+
+    def _resize(self, capacity: int):
+        old_vectors = self.vectors
+        if self.folder is None:
+            self.vectors = np.zeros((capacity, self.vector_size), dtype=np.float32)
+            if old_vectors is not None:
+                self.vectors[: len(old_vectors)] = old_vectors
+        else:
+            # grow the file and map it again (the file keeps the vectors already written)
+            path = os.path.join(self.folder, "vectors.f32")
+            row_bytes = self.vector_size * np.dtype(np.float32).itemsize
+            file_size = os.path.getsize(path) if os.path.exists(path) else 0
+            capacity = max(capacity, file_size // row_bytes)
+            with open(path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+            self.vectors = np.memmap(
+                path, dtype=np.float32, mode="r+", shape=(capacity, self.vector_size)
+            )
+
+        capacity = len(self.vectors)
+        if old_vectors is None:
+            self.ids = [None] * capacity
+            self.payloads = [None] * capacity
+            self.alive = np.zeros(capacity, dtype=bool)
+        else:
+            grown = capacity - len(self.ids)
+            self.ids.extend([None] * grown)
+            self.payloads.extend([None] * grown)
+            self.alive = np.concatenate([self.alive, np.zeros(grown, dtype=bool)])
+
+    def _load_points(self):
+        self.rows = {}
+        self.index = {}
+        self.size = 0
+        self.scroll_order = None
+        for row, point_id, payload in self.connection.execute(
+            "SELECT row, id, payload FROM points ORDER BY row"
+        ):
+            if row >= len(self.ids):
+                self._resize(row + 1)
+            self._set_point(row, json.loads(point_id), json.loads(payload))
+            self.size = row + 1
+        self.free_rows = [row for row in range(self.size) if not self.alive[row]]
+        log.debug(f"Loaded {len(self.rows)} points from {self.folder}")
+
+    def _set_point(self, row, point_id, payload):
+        self.scroll_order = None
+        self.ids[row] = point_id
+        self.payloads[row] = payload
+        self.alive[row] = True
+        self.rows[point_id] = row
+        for key, index_key in get_index_keys(payload):
+            self.index.setdefault(key, {}).setdefault(index_key, set()).add(row)
+
+    def _unset_point(self, row):
+        for key, index_key in get_index_keys(self.payloads[row]):
+            rows = self.index[key].get(index_key)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del self.index[key][index_key]
+        self.scroll_order = None
+        del self.rows[self.ids[row]]
+        self.ids[row] = None
+        self.payloads[row] = None
+        self.alive[row] = False
+
+    def _allocate_row(self):
+        if self.free_rows:
+            return self.free_rows.pop()
+        if self.size == len(self.ids):
+            self._resize(2 * len(self.ids))
+        self.size += 1
+        return self.size - 1
+
+    def find_row(self, point_id) -> Optional[int]:
+        """Row of a point, None if missing (or if the id is not valid)."""
+        try:
+            return self.rows.get(normalize_point_id(point_id))
+        except ValueError:
+            return None
+
+    def count(self) -> int:
+        return len(self.rows)
+
+    def upsert(self, points: List[PointStruct]):
+        # the last point wins when ids are repeated
+        points = {normalize_point_id(p.id): p for p in points}
+        if not points:
+            return
+
+        vectors = normalize_vectors(
+            np.asarray([p.vector for p in points.values()], dtype=np.float32)
+        )
+        with self.lock:
+            rows = []
+            for point_id in points:
+                row = self.rows.get(point_id)
+                if row is None:
+                    row = self._allocate_row()
+                rows.append(row)
+
+            # vectors are written before their rows, a point is never stored without its vector
+            self.vectors[rows] = vectors
+            if isinstance(self.vectors, np.memmap):
+                self.vectors.flush()
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO points (row, id, payload) VALUES (?, ?, ?)",
+                    [
+                        (row, json.dumps(point_id), json.dumps(point.payload))
+                        for row, (point_id, point) in zip(rows, points.items())
+                    ],
+                )
+
+            for row, (point_id, point) in zip(rows, points.items()):
+                if self.ids[row] is not None:
+                    self._unset_point(row)
+                self._set_point(row, point_id, copy.deepcopy(point.payload))
+
+    def delete_rows(self, rows: Iterable[int]):
+        rows = list(rows)
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    "DELETE FROM points WHERE row = ?", [(row,) for row in rows]
+                )
+            for row in rows:
+                self._unset_point(row)
+                self.free_rows.append(row)
+        return len(rows)
+
+    def delete(self, ids: Iterable):
+        with self.lock:
+            rows = {self.find_row(i) for i in ids} - {None}
+            return self.delete_rows(rows)
+
+    def filter_rows(self, filter: Optional[dict]) -> np.ndarray:
+        """Rows of the points matching a metadata filter, in ascending order."""
+
+        conditions = get_filter_conditions(filter or {})
+        indexed = [c for c in conditions if len(c[0]) == 1 and isinstance(c[1], (str, int, bool))]
+        others = [c for c in conditions if c not in indexed]
+
+        if indexed:
+            candidates = None
+            for (key,), value in indexed:
+                rows = self.index.get(key, {}).get(get_index_key(value), set())
+                candidates = rows if candidates is None else candidates & rows
+            candidates = sorted(candidates)
+        else:
+            candidates = np.flatnonzero(self.alive[: self.size]).tolist()
+
+        if others:
+            candidates = [
+                row
+                for row in candidates
+                if all(
+                    value in get_values(self.payloads[row].get("metadata"), path)
+                    for path, value in others
+                )
+            ]
+        return np.asarray(candidates, dtype=np.int64)
+
+    def get_record(self, row, with_vectors=True, with_payload=True) -> Record:
+        return Record(
+            id=self.ids[row],
+            payload=project_payload(self.payloads[row], with_payload),
+            vector=self.vectors[row].tolist() if with_vectors else None,
+        )
+
+    def search(self, vector, filter, k, threshold, with_vectors, with_payload) -> List[ScoredPoint]:
+        query = normalize_vectors(np.asarray(vector, dtype=np.float32))
+        with self.lock:
+            if filter:
+                rows = self.filter_rows(filter)
+                scores = self.vectors[rows] @ query
+            else:
+                # scoring all the rows (deleted included) avoids copying the matrix
+                rows = np.flatnonzero(self.alive[: self.size])
+                scores = (self.vectors[: self.size] @ query)[rows]
+
+            if threshold is not None:
+                above = scores >= threshold
+                rows, scores = rows[above], scores[above]
+            if len(rows) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                rows, scores = rows[top], scores[top]
+            order = np.argsort(-scores, kind="stable")
+
+            return [
+                ScoredPoint(
+                    id=self.ids[row],
+                    version=0,
+                    score=float(score),
+                    payload=project_payload(self.payloads[row], with_payload),
+                    vector=self.vectors[row].tolist() if with_vectors else None,
+                )
+                for row, score in zip(rows[order].tolist(), scores[order].tolist())
+            ]
+
+    def retrieve(self, ids, with_vectors) -> List[Record]:
+        with self.lock:
+            rows = [self.find_row(i) for i in ids]
+            return [self.get_record(row, with_vectors) for row in rows if row is not None]
+
+    def _get_scroll_order(self):
+        """Rows sorted by point id, their ids sort keys and the position of each row, rebuilt after writes."""
+
+        if self.scroll_order is None:
+            rows = np.flatnonzero(self.alive[: self.size])
+            keys = [get_id_sort_key(self.ids[row]) for row in rows.tolist()]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            sorted_rows = rows[order]
+            positions = np.full(self.size, -1, dtype=np.int64)
+            positions[sorted_rows] = np.arange(len(sorted_rows))
+            self.scroll_order = (sorted_rows, [keys[i] for i in order], positions)
+        return self.scroll_order
+
+    def scroll(self, limit, offset, filter, with_vectors):
+        with self.lock:
+            sorted_rows, sorted_keys, positions = self._get_scroll_order()
+
+            # the page starts from the offset point, or from the next one if it was deleted meanwhile
+            start = 0
+            if offset is not None:
+                try:
+                    offset_key = get_id_sort_key(normalize_point_id(offset))
+                except ValueError:
+                    return [], None
+                start = bisect.bisect_left(sorted_keys, offset_key)
+
+            if filter:
+                page = positions[self.filter_rows(filter)]
+                page = np.sort(page[page >= start])[: limit + 1]
+            else:
+                page = np.arange(start, min(start + limit + 1, len(sorted_rows)))
+            rows = sorted_rows[page].tolist()
+            records = [self.get_record(row, with_vectors) for row in rows[:limit]]
+            next_offset = self.ids[rows[limit]] if len(rows) > limit else None
+            return records, next_offset
+
+    def close(self):
+        self.connection.close()
+        self.vectors = None
+
+
+class NumpyVectorBackend(BaseVectorBackend):
+    """In process vector backend, with exact search by cosine similarity.
+
+    Each collection keeps its vectors in a memory mapped file and its payloads in a SQLite database
+    (see `NumpyCollection`), in a folder named after the collection.
+    Search compares the query with all the vectors (or all the vectors matching the filter), so results are exact
+    and it is fast enough for small memories; big memories should use Qdrant.
+
+    Attributes
+    ----------
+    path : str | None
+        Folder containing the collections, None to keep them in memory (e.g. for tests).
+    collections : Dict[str, NumpyCollection]
+        Loaded collections by name.
+
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.collections: Dict[str, NumpyCollection] = {}
+        self.lock = threading.Lock()
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            for collection_name in sorted(os.listdir(path)):
+                if os.path.exists(os.path.join(path, collection_name, "config.json")):
+                    self.collections[collection_name] = NumpyCollection(
+                        os.path.join(path, collection_name)
+                    )
+
+    def _get_collection(self, collection_name: str) -> NumpyCollection:
+        try:
+            return self.collections[collection_name]
+        except KeyError:
+            raise ValueError(f"Collection {collection_name} not found")
+
+    def get_collection_names(self) -> List[str]:
+        return list(self.collections.keys())
+
+    def create_collection(
+        self, collection_name: str, vector_size: int, tenant_field: Optional[str] = None
+    ):
+        with self.lock:
+            self.delete_collection(collection_name)
+            folder = None
+            if self.path is not None:
+                folder = os.path.join(self.path, collection_name)
+                # leftovers of a collection that could not be loaded
+                shutil.rmtree(folder, ignore_errors=True)
+            self.collections[collection_name] = NumpyCollection(folder, vector_size)
+
+    def delete_collection(self, collection_name: str) -> bool:
+        collection = self.collections.pop(collection_name, None)
+        if collection is None:
+            return False
+        collection.close()
+        if collection.folder is not None:
+            shutil.rmtree(collection.folder)
+        return True
+
+    def get_vector_size(self, collection_name: str) -> int:
+        return self._get_collection(collection_name).vector_size
+
+    def get_aliases(self, collection_name: str) -> List[str]:
+        return list(self._get_collection(collection_name).aliases)
+
+    def create_alias(self, collection_name: str, alias: str):
+        collection = self._get_collection(collection_name)
+        with collection.lock:
+            if alias not in collection.aliases:
+                collection.aliases.append(alias)
+                collection._save_config()
+
+    def count_points(self, collection_name: str) -> int:
+        return self._get_collection(collection_name).count()
+
+    def upsert(self, collection_name: str, points: List[PointStruct], **kwargs) -> bool:
+        # writes are synchronous, options like Qdrant `wait` are not needed
+        self._get_collection(collection_name).upsert(points)
+        return True
+
+    def search(
+        self,
+        collection_name: str,
+        vector: List[float],
+        filter: Optional[Dict] = None,
+        k: int = 5,
+        threshold: Optional[float] = None,
+        with_vectors: bool = True,
+        with_payload: bool | List[str] = True,
+    ) -> List[ScoredPoint]:
+        return self._get_collection(collection_name).search(
+            vector, filter, k, threshold, with_vectors, with_payload
+        )
+
+    def retrieve(self, collection_name: str, ids: Iterable, with_vectors: bool = True) -> List[Record]:
+        return self._get_collection(collection_name).retrieve(ids, with_vectors)
+
+    def scroll(
+        self,
+        collection_name: str,
+        limit: int,
+        offset: Any = None,
+        with_vectors: bool = True,
+        filter: Optional[Dict] = None,
+    ):
+        """Get a page of points ordered by id, integer ids before UUIDs (as in Qdrant), not by insertion.
+
+        The offset is the id of the first point of the page, if it was deleted meanwhile the page starts from the next id.
+        """
+        return self._get_collection(collection_name).scroll(limit, offset, filter, with_vectors)
+
+    def delete_points(self, collection_name: str, ids: Iterable) -> int:
+        return self._get_collection(collection_name).delete(ids)
+
+    def delete_points_by_filter(self, collection_name: str, filter: Dict) -> int:
+        if not filter:
+            # as in Qdrant, a filter is required (an empty one would delete all the points)
+            raise ValueError("A filter is required to delete points")
+        collection = self._get_collection(collection_name)
+        with collection.lock:
+            return collection.delete_rows(collection.filter_rows(filter).tolist())
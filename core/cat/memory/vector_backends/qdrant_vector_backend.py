@@ -0,0 +1,343 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional
+import requests
+
+from qdrant_client import QdrantClient
+from qdrant_client.qdrant_remote import QdrantRemote
+from qdrant_client.http.models import (
+    PointStruct,
+    Distance,
+    VectorParams,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    SearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    QuantizationSearchParams,
+    CreateAliasOperation,
+    CreateAlias,
+    OptimizersConfigDiff,
+    PayloadSchemaType,
+    KeywordIndexParams,
+    KeywordIndexType,
+    HnswConfigDiff,
+)
+
+from cat.memory.vector_backends.base_vector_backend import BaseVectorBackend
+from cat.log import log
+from cat.env import get_env
+
+
+# payload fields indexed in every collection (used to filter by user and by time)
+PAYLOAD_INDEXES = {
+    "metadata.source": PayloadSchemaType.KEYWORD,
+    "metadata.when": PayloadSchemaType.FLOAT,
+}
+
+# HNSW graphs built for each tenant instead of a global one,
+# see https://qdrant.tech/documentation/guides/multiple-partitions/
+TENANT_HNSW_CONFIG = HnswConfigDiff(payload_m=16, m=0)
+# Qdrant default, restored when a collection is no longer partitioned
+DEFAULT_HNSW_CONFIG = HnswConfigDiff(m=16)
+
+
+class QdrantVectorBackend(BaseVectorBackend):
+    """Vector backend storing the collections in Qdrant, either remote or local (embedded).
+
+    Attributes
+    ----------
+    client : QdrantClient
+        Qdrant client.
+
+    """
+
+    def __init__(self, client: QdrantClient):
+        self.client = client
+
+    def is_remote(self) -> bool:
+        return isinstance(self.client._client, QdrantRemote)
+
+    def get_collection_names(self) -> List[str]:
+        return [c.name for c in self.client.get_collections().collections]
+
+    def create_collection(
+        self, collection_name: str, vector_size: int, tenant_field: Optional[str] = None
+    ):
+        self.client.recreate_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+            # hybrid mode: original vector on Disk, quantized vector in RAM
+            optimizers_config=OptimizersConfigDiff(memmap_threshold=20000),
+            hnsw_config=TENANT_HNSW_CONFIG if tenant_field else None,
+            quantization_config=ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8, quantile=0.95, always_ram=True
+                )
+            ),
+            # shard_number=3,
+        )
+
+    def delete_collection(self, collection_name: str) -> bool:
+        return self.client.delete_collection(collection_name)
+
+    def configure_collection(self, collection_name: str, tenant_field: Optional[str] = None):
+        # Build HNSW graphs per tenant if partitioned (migrating already existing collections in place)
+        self.update_hnsw_config(collection_name, tenant_field)
+
+        # Index the payload fields used in filters (also on already existing collections)
+        self.create_payload_indexes(collection_name, tenant_field)
+
+    def get_vector_size(self, collection_name: str) -> int:
+        return self.client.get_collection(collection_name).config.params.vectors.size
+
+    def get_aliases(self, collection_name: str) -> List[str]:
+        return [
+            a.alias_name
+            for a in self.client.get_collection_aliases(collection_name).aliases
+        ]
+
+    def create_alias(self, collection_name: str, alias: str):
+        self.client.update_collection_aliases(
+            change_aliases_operations=[
+                CreateAliasOperation(
+                    create_alias=CreateAlias(
+                        collection_name=collection_name,
+                        alias_name=alias,
+                    )
+                )
+            ]
+        )
+
+    def count_points(self, collection_name: str) -> int:
+        return self.client.get_collection(collection_name).points_count
+
+    def get_collection_info(self, collection_name: str):
+        return self.client.get_collection(collection_name)
+
+    def get_payload_indexes(self, tenant_field: Optional[str] = None):
+        """Payload fields to index, the core ones and the metadata keys listed in `CCAT_QDRANT_PAYLOAD_INDEXES`.
+
+        `CCAT_QDRANT_PAYLOAD_INDEXES` is a comma separated list of metadata keys, each optionally followed by
+        its Qdrant payload schema type (keyword by default), e.g. `title,page:integer`.
+        """
+
+        payload_indexes = dict(PAYLOAD_INDEXES)
+        extra_keys = get_env("CCAT_QDRANT_PAYLOAD_INDEXES") or ""
+        for extra_key in extra_keys.split(","):
+            extra_key = extra_key.strip()
+            if not extra_key:
+                continue
+            key, _, schema = extra_key.partition(":")
+            payload_indexes[f"metadata.{key.strip()}"] = PayloadSchemaType(
+                schema.strip() or "keyword"
+            )
+
+        # the tenant field is stored so that the points of a tenant are close to each other
+        if tenant_field:
+            payload_indexes[tenant_field] = KeywordIndexParams(
+                type=KeywordIndexType.KEYWORD, is_tenant=True
+            )
+        return payload_indexes
+
+    def create_payload_indexes(self, collection_name: str, tenant_field: Optional[str] = None):
+        # the local Qdrant has no payload indexes
+        if not self.is_remote():
+            return
+
+        indexed_fields = self.client.get_collection(collection_name).payload_schema
+        for field_name, field_schema in self.get_payload_indexes(tenant_field).items():
+            index = indexed_fields.get(field_name)
+            if index is not None:
+                if self._is_same_index(index, field_schema):
+                    continue
+                # e.g. tenant partitioning turned on or off, the index is rebuilt in place
+                log.info(f'Recreating payload index "{field_name}" on collection "{collection_name}"')
+                self.client.delete_payload_index(
+                    collection_name=collection_name, field_name=field_name
+                )
+            log.info(f'Creating payload index "{field_name}" on collection "{collection_name}"')
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+
+    def _is_same_index(self, index, field_schema) -> bool:
+        schema_type = getattr(field_schema, "type", field_schema)
+        is_tenant = getattr(field_schema, "is_tenant", None) or False
+        return (
+            index.data_type.value == schema_type.value
+            and (getattr(index.params, "is_tenant", None) or False) == is_tenant
+        )
+
+    def update_hnsw_config(self, collection_name: str, tenant_field: Optional[str] = None):
+        """Switch the HNSW index between a graph per tenant and a global graph, according to `tenant_field`.
+
+        Existing collections are migrated in place: Qdrant rebuilds the index in the background,
+        the collection can be searched meanwhile.
+        """
+
+        # the local Qdrant has no HNSW index
+        if not self.is_remote():
+            return
+
+        hnsw_config = self.client.get_collection(collection_name).config.hnsw_config
+        is_partitioned = hnsw_config.m == 0 and bool(hnsw_config.payload_m)
+        if bool(tenant_field) == is_partitioned:
+            return
+
+        if tenant_field:
+            log.warning(f'Partitioning collection "{collection_name}" by "{tenant_field}"')
+            new_config = TENANT_HNSW_CONFIG
+        else:
+            log.warning(f'Collection "{collection_name}" is no longer partitioned')
+            new_config = DEFAULT_HNSW_CONFIG
+        self.client.update_collection(
+            collection_name=collection_name, hnsw_config=new_config
+        )
+
+    # adapted from https://github.com/langchain-ai/langchain/blob/bfc12a4a7644cfc4d832cc4023086a7a5374f46a/libs/langchain/langchain/vectorstores/qdrant.py#L1965
+    def _qdrant_filter_from_dict(self, filter: dict) -> Filter:
+        if not filter or len(filter)<1:
+            return None
+
+        return Filter(
+            must=[
+                condition
+                for key, value in filter.items()
+                for condition in self._build_condition(key, value)
+            ]
+        )
+
+    # adapted from https://github.com/langchain-ai/langchain/blob/bfc12a4a7644cfc4d832cc4023086a7a5374f46a/libs/langchain/langchain/vectorstores/qdrant.py#L1941
+    def _build_condition(self, key: str, value: Any) -> List[FieldCondition]:
+        out = []
+
+        if isinstance(value, dict):
+            for _key, value in value.items():
+                out.extend(self._build_condition(f"{key}.{_key}", value))
+        elif isinstance(value, list):
+            for _value in value:
+                if isinstance(_value, dict):
+                    out.extend(self._build_condition(f"{key}[]", _value))
+                else:
+                    out.extend(self._build_condition(f"{key}", _value))
+        else:
+            out.append(
+                FieldCondition(
+                    key=f"metadata.{key}",
+                    match=MatchValue(value=value),
+                )
+            )
+
+        return out
+
+    def upsert(self, collection_name: str, points: List[PointStruct], **kwargs) -> bool:
+        update_status = self.client.upsert(
+            collection_name=collection_name, points=points, **kwargs
+        )
+        return update_status.status == "completed"
+
+    def search(
+        self,
+        collection_name: str,
+        vector: List[float],
+        filter: Optional[Dict] = None,
+        k: int = 5,
+        threshold: Optional[float] = None,
+        with_vectors: bool = True,
+        with_payload: bool | List[str] = True,
+    ):
+        return self.client.search(
+            collection_name=collection_name,
+            query_vector=vector,
+            query_filter=self._qdrant_filter_from_dict(filter),
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+            limit=k,
+            score_threshold=threshold,
+            search_params=SearchParams(
+                quantization=QuantizationSearchParams(
+                    ignore=False,
+                    rescore=True,
+                    oversampling=2.0,  # Available as of v1.3.0
+                )
+            ),
+        )
+
+    def retrieve(self, collection_name: str, ids: Iterable, with_vectors: bool = True):
+        return self.client.retrieve(
+            collection_name=collection_name,
+            ids=ids,
+            with_vectors=with_vectors,
+        )
+
+    def scroll(
+        self,
+        collection_name: str,
+        limit: int,
+        offset: Any = None,
+        with_vectors: bool = True,
+        filter: Optional[Dict] = None,
+    ):
+        return self.client.scroll(
+            collection_name=collection_name,
+            scroll_filter=self._qdrant_filter_from_dict(filter),
+            with_vectors=with_vectors,
+            offset=offset,  # Start from the given offset, or the beginning if None.
+            limit=limit # Limit the number of points retrieved to the specified limit.
+        )
+
+    def delete_points(self, collection_name: str, ids: Iterable):
+        return self.client.delete(
+            collection_name=collection_name,
+            points_selector=ids,
+        )
+
+    def delete_points_by_filter(self, collection_name: str, filter: Dict):
+        return self.client.delete(
+            collection_name=collection_name,
+            points_selector=self._qdrant_filter_from_dict(filter),
+        )
+
+    # dump collection on disk before deleting
+    def save_dump(self, collection_name: str, folder: str):
+        # only do snapshotting if using remote Qdrant
+        if not self.is_remote():
+            return
+
+        host = self.client._client._host
+        port = self.client._client._port
+
+        if os.path.isdir(folder):
+            log.debug("Directory dormouse exists")
+        else:
+            log.info("Directory dormouse does NOT exists, creating it.")
+            os.mkdir(folder)
+
+        snapshot_info = self.client.create_snapshot(collection_name=collection_name)
+        snapshot_url_in = (
+            "http://"
+            + str(host)
+            + ":"
+            + str(port)
+            + "/collections/"
+            + collection_name
+            + "/snapshots/"
+            + snapshot_info.name
+        )
+        snapshot_url_out = folder + snapshot_info.name
+        # rename snapshots for a easyer restore in the future
+        alias = self.get_aliases(collection_name)[0]
+        response = requests.get(snapshot_url_in)
+        open(snapshot_url_out, "wb").write(response.content)
+        new_name = folder + alias.replace("/", "-") + ".snapshot"
+        os.rename(snapshot_url_out, new_name)
+        for s in self.client.list_snapshots(collection_name):
+            self.client.delete_snapshot(
+                collection_name=collection_name, snapshot_name=s.name
+            )
+        log.warning(f'Dump "{new_name}" completed')
+        return snapshot_info
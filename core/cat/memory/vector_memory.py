@@ -1,10 +1,14 @@
 import sys
 import socket
+from concurrent.futures import ThreadPoolExecutor
 from cat.utils import extract_domain_from_url, is_https
 
 from qdrant_client import QdrantClient
 
 from cat.memory.vector_memory_collection import VectorMemoryCollection
+from cat.memory.vector_backends.base_vector_backend import BaseVectorBackend
+from cat.memory.vector_backends.qdrant_vector_backend import QdrantVectorBackend
+from cat.memory.vector_backends.numpy_vector_backend import NumpyVectorBackend
 from cat.log import log
 from cat.env import get_env
 # from cat.utils import singleton
@@ -14,13 +18,21 @@ from cat.env import get_env
 class VectorMemory:
     local_vector_db = None
 
+    # threads searching collections concurrently, shared by all sessions
+    recall_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="recall")
+
     def __init__(
         self,
         embedder_name=None,
         embedder_size=None,
     ) -> None:
-        # connects to Qdrant and creates self.vector_db attribute
+        # connects to Qdrant (or loads the local NumPy vector memory) and creates self.vector_db attribute
         self.connect_to_vector_memory()
+        self.backend = (
+            self.vector_db
+            if isinstance(self.vector_db, BaseVectorBackend)
+            else QdrantVectorBackend(self.vector_db)
+        )
 
         # Create vector collections
         # - Episodic memory will contain user and eventually cat utterances
@@ -28,12 +40,19 @@ class VectorMemory:
         # - Procedural memory will contain tools and knowledge on how to do things
         self.collections = {}
         for collection_name in ["episodic", "declarative", "procedural"]:
+            # In multitenancy mode episodic memories are partitioned by user,
+            # so recalling the memories of a user only searches its partition
+            tenant_field = None
+            if collection_name == "episodic" and get_env("CCAT_QDRANT_MULTITENANCY") == "true":
+                tenant_field = "metadata.source"
+
             # Instantiate collection
             collection = VectorMemoryCollection(
-                client=self.vector_db,
+                client=self.backend,
                 collection_name=collection_name,
                 embedder_name=embedder_name,
                 embedder_size=embedder_size,
+                tenant_field=tenant_field,
             )
 
             # Update dictionary containing all collections
@@ -48,12 +67,22 @@ class VectorMemory:
         db_path = "cat/data/local_vector_memory/"
         qdrant_host = get_env("CCAT_QDRANT_HOST")
 
-        if not qdrant_host:
+        if get_env("CCAT_VECTOR_MEMORY_BACKEND") == "numpy":
+            # in process vector memory, for small installs
+            numpy_db_path = "cat/data/numpy_vector_memory/"
+            log.debug(f"NumPy vector memory path: {numpy_db_path}")
+
+            # load only if it's the first boot and not a reload
+            if not isinstance(VectorMemory.local_vector_db, NumpyVectorBackend):
+                VectorMemory.local_vector_db = NumpyVectorBackend(numpy_db_path)
+
+            self.vector_db = VectorMemory.local_vector_db
+        elif not qdrant_host:
             log.debug(f"Qdrant path: {db_path}")
             # Qdrant local vector DB client
 
             # reconnect only if it's the first boot and not a reload
-            if VectorMemory.local_vector_db is None:
+            if not isinstance(VectorMemory.local_vector_db, QdrantClient):
                 VectorMemory.local_vector_db = QdrantClient(
                     path=db_path, force_disable_check_same_thread=True
                 )
@@ -83,12 +112,44 @@ class VectorMemory:
                 api_key=qdrant_api_key,
             )
 
+    def recall_memories_from_embeddings(self, recall_configs):
+        """Search several collections at once.
+
+        With a remote Qdrant the searches are sent concurrently, so recall takes a single round trip.
+        The local Qdrant is searched sequentially, as it is not meant to be used from several threads.
+
+        Parameters
+        ----------
+        recall_configs : Dict[str, dict]
+            Recall config (arguments of `VectorMemoryCollection.recall_memories_from_embedding`) by collection name.
+
+        Returns
+        -------
+        Dict[str, list]
+            Recalled memories by collection name.
+
+        """
+
+        collections = [self.collections[name] for name in recall_configs]
+        if len(collections) > 1 and collections[0].db_is_remote():
+            results = self.recall_executor.map(
+                lambda c: c.recall_memories_from_embedding(**recall_configs[c.collection_name]),
+                collections,
+            )
+        else:
+            results = [
+                c.recall_memories_from_embedding(**recall_configs[c.collection_name])
+                for c in collections
+            ]
+
+        return dict(zip(recall_configs.keys(), results))
+
     def delete_collection(self, collection_name: str):
         """Delete specific vector collection"""
         
-        return self.vector_db.delete_collection(collection_name)
+        return self.backend.delete_collection(collection_name)
     
     def get_collection(self, collection_name: str):
-        """Get collection info"""
+        """Get collection info (a Qdrant `CollectionInfo` with the Qdrant backend)"""
         
-        return self.vector_db.get_collection(collection_name)
+        return self.backend.get_collection_info(collection_name)
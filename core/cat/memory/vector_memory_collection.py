@@ -1,45 +1,51 @@
-import os
+import json
 import uuid
+import hashlib
+import threading
 from typing import Any, List, Iterable, Optional
-import requests
-
-from qdrant_client.qdrant_remote import QdrantRemote
-from qdrant_client.http.models import (
-    PointStruct,
-    Distance,
-    VectorParams,
-    Filter,
-    FieldCondition,
-    MatchValue,
-    SearchParams,
-    ScalarQuantization,
-    ScalarQuantizationConfig,
-    ScalarType,
-    QuantizationSearchParams,
-    CreateAliasOperation,
-    CreateAlias,
-    OptimizersConfigDiff,
-)
+import numpy as np
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PointStruct
 
 from langchain.docstore.document import Document
 
 from cat.log import log
 from cat.env import get_env
+from cat.cache.cache_item import CacheItem
+from cat.cache.in_memory_cache import InMemoryCache
+from cat.memory.vector_backends.base_vector_backend import BaseVectorBackend
+from cat.memory.vector_backends.qdrant_vector_backend import QdrantVectorBackend
 
 
 class VectorMemoryCollection:
     def __init__(
         self,
-        client: Any,
+        client: BaseVectorBackend | QdrantClient,
         collection_name: str,
         embedder_name: str,
         embedder_size: int,
+        tenant_field: Optional[str] = None,
     ):
         # Set attributes (metadata on the embedder are useful because it may change at runtime)
         self.client = client
+        # Qdrant clients are wrapped in their backend, so plugins can keep passing them
+        self.backend = client if isinstance(client, BaseVectorBackend) else QdrantVectorBackend(client)
         self.collection_name = collection_name
         self.embedder_name = embedder_name
         self.embedder_size = embedder_size
+        # payload field partitioning the collection (e.g. by user), None if not partitioned
+        self.tenant_field = tenant_field
+
+        # results of recent searches, keyed by the collection write version so that writes invalidate them.
+        # Only writes of this process are seen: the cache is off by default and must not be turned on
+        # when other processes (uvicorn workers, other Cats, plugins using `client` directly) write to the collection
+        self.write_version = 0
+        self.write_version_lock = threading.Lock()
+        recall_cache_max_items = int(get_env("CCAT_RECALL_CACHE_MAX_ITEMS"))
+        self.recall_cache = (
+            InMemoryCache(max_items=recall_cache_max_items) if recall_cache_max_items > 0 else None
+        )
 
         # Check if memory collection exists also in vectorDB, otherwise create it
         self.create_db_collection_if_not_exists()
@@ -47,25 +53,21 @@ class VectorMemoryCollection:
         # Check db collection vector size is same as embedder size
         self.check_embedding_size()
 
+        # Update indexes and settings of the collection (e.g. tenant partitioning)
+        self.backend.configure_collection(self.collection_name, self.tenant_field)
+
         # log collection info
         log.debug(f"Collection {self.collection_name}:")
-        log.debug(self.client.get_collection(self.collection_name))
+        log.debug(self.backend.get_collection_info(self.collection_name))
 
     def check_embedding_size(self):
         # having the same size does not necessarily imply being the same embedder
         # having vectors with the same size but from diffent embedder in the same vector space is wrong
         same_size = (
-            self.client.get_collection(self.collection_name).config.params.vectors.size
-            == self.embedder_size
+            self.backend.get_vector_size(self.collection_name) == self.embedder_size
         )
         alias = self.embedder_name + "_" + self.collection_name
-        if (
-            alias
-            == self.client.get_collection_aliases(self.collection_name)
-            .aliases[0]
-            .alias_name
-            and same_size
-        ):
+        if alias in self.backend.get_aliases(self.collection_name) and same_size:
             log.debug(f'Collection "{self.collection_name}" has the same embedder')
         else:
             log.warning(f'Collection "{self.collection_name}" has a different embedder')
@@ -75,88 +77,31 @@ class VectorMemoryCollection:
                 # dump collection on disk before deleting
                 self.save_dump()
 
-            self.client.delete_collection(self.collection_name)
+            self.backend.delete_collection(self.collection_name)
             log.warning(f'Collection "{self.collection_name}" deleted')
             self.create_collection()
 
     def create_db_collection_if_not_exists(self):
         # is collection present in DB?
-        collections_response = self.client.get_collections()
-        for c in collections_response.collections:
-            if c.name == self.collection_name:
-                # collection exists. Do nothing
-                log.debug(
-                    f'Collection "{self.collection_name}" already present in vector store'
-                )
-                return
+        if self.collection_name in self.backend.get_collection_names():
+            # collection exists. Do nothing
+            log.debug(
+                f'Collection "{self.collection_name}" already present in vector store'
+            )
+            return
 
         self.create_collection()
 
     # create collection
     def create_collection(self):
         log.warning(f'Creating collection "{self.collection_name}" ...')
-        self.client.recreate_collection(
-            collection_name=self.collection_name,
-            vectors_config=VectorParams(
-                size=self.embedder_size, distance=Distance.COSINE
-            ),
-            # hybrid mode: original vector on Disk, quantized vector in RAM
-            optimizers_config=OptimizersConfigDiff(memmap_threshold=20000),
-            quantization_config=ScalarQuantization(
-                scalar=ScalarQuantizationConfig(
-                    type=ScalarType.INT8, quantile=0.95, always_ram=True
-                )
-            ),
-            # shard_number=3,
-        )
-
-        self.client.update_collection_aliases(
-            change_aliases_operations=[
-                CreateAliasOperation(
-                    create_alias=CreateAlias(
-                        collection_name=self.collection_name,
-                        alias_name=self.embedder_name + "_" + self.collection_name,
-                    )
-                )
-            ]
+        self.backend.create_collection(
+            self.collection_name, self.embedder_size, tenant_field=self.tenant_field
         )
-
-    # adapted from https://github.com/langchain-ai/langchain/blob/bfc12a4a7644cfc4d832cc4023086a7a5374f46a/libs/langchain/langchain/vectorstores/qdrant.py#L1965
-    def _qdrant_filter_from_dict(self, filter: dict) -> Filter:
-        if not filter or len(filter)<1:
-            return None
-
-        return Filter(
-            must=[
-                condition
-                for key, value in filter.items()
-                for condition in self._build_condition(key, value)
-            ]
+        self.backend.create_alias(
+            self.collection_name, self.embedder_name + "_" + self.collection_name
         )
 
-    # adapted from https://github.com/langchain-ai/langchain/blob/bfc12a4a7644cfc4d832cc4023086a7a5374f46a/libs/langchain/langchain/vectorstores/qdrant.py#L1941
-    def _build_condition(self, key: str, value: Any) -> List[FieldCondition]:
-        out = []
-
-        if isinstance(value, dict):
-            for _key, value in value.items():
-                out.extend(self._build_condition(f"{key}.{_key}", value))
-        elif isinstance(value, list):
-            for _value in value:
-                if isinstance(_value, dict):
-                    out.extend(self._build_condition(f"{key}[]", _value))
-                else:
-                    out.extend(self._build_condition(f"{key}", _value))
-        else:
-            out.append(
-                FieldCondition(
-                    key=f"metadata.{key}",
-                    match=MatchValue(value=value),
-                )
-            )
-
-        return out
-
     def add_point(
         self,
         content: str,
@@ -178,8 +123,6 @@ class VectorMemoryCollection:
             Point id as saved into the vectorstore.
         """
 
-        # TODO: may be adapted to upload batches of points as langchain does.
-        # Not necessary now as the bottleneck is the embedder
         point = PointStruct(
             id=id or uuid.uuid4().hex,
             payload={
@@ -189,51 +132,127 @@ class VectorMemoryCollection:
             vector=vector,
         )
 
-        update_status = self.client.upsert(
-            collection_name=self.collection_name, points=[point], **kwargs
-        )
+        stored = self.backend.upsert(self.collection_name, [point], **kwargs)
+        self.bump_write_version()
 
-        if update_status.status == "completed":
+        if stored:
             # returnign stored point
             return point # TODOV2 return internal MemoryPoint
         else:
             return None
 
+    def add_points(
+        self,
+        contents: List[str],
+        vectors: List[Iterable],
+        metadatas: List[dict] = None,
+        ids: List[str] = None,
+        batch_size: int = 256,
+        **kwargs: Any,
+    ) -> List[PointStruct]:
+        """Add several points (and their metadata) to the vectorstore, upserting them in batches.
+
+        Args:
+            contents: original texts.
+            vectors: Embedding vectors, one for each text.
+            metadatas: Optional metadata dicts associated with the texts.
+            ids:
+                Optional ids to associate with the points. Ids have to be uuid-like strings.
+            batch_size: Max number of points sent with a single upsert.
+
+        Returns:
+            Points saved into the vectorstore (points of failed batches are omitted).
+        """
+
+        metadatas = metadatas or [None] * len(contents)
+        ids = ids or [None] * len(contents)
+
+        points = [
+            PointStruct(
+                id=id or uuid.uuid4().hex,
+                payload={
+                    "page_content": content,
+                    "metadata": metadata,
+                },
+                vector=vector,
+            )
+            for content, vector, metadata, id in zip(contents, vectors, metadatas, ids)
+        ]
+
+        stored_points = []
+        for i in range(0, len(points), batch_size):
+            batch = points[i : i + batch_size]
+            stored = self.backend.upsert(self.collection_name, batch, **kwargs)
+            self.bump_write_version()
+            if stored:
+                stored_points.extend(batch)
+            else:
+                log.error(f"Upsert of {len(batch)} points in {self.collection_name} failed")
+
+        return stored_points
+
     def delete_points_by_metadata_filter(self, metadata=None):
-        res = self.client.delete(
-            collection_name=self.collection_name,
-            points_selector=self._qdrant_filter_from_dict(metadata),
-        )
+        res = self.backend.delete_points_by_filter(self.collection_name, metadata)
+        self.bump_write_version()
         return res
 
     def delete_points(self, points_ids):
         """Delete point in collection"""
-        res = self.client.delete(
-            collection_name=self.collection_name,
-            points_selector=points_ids,
-        )
+        res = self.backend.delete_points(self.collection_name, points_ids)
+        self.bump_write_version()
         return res
 
+    def bump_write_version(self):
+        """Invalidate the cached search results, to be called after each write to the collection."""
+        with self.write_version_lock:
+            self.write_version += 1
+
+    def _get_recall_key(self, embedding, **search_args) -> str:
+        embedding_hash = hashlib.sha256(np.asarray(embedding, dtype=np.float64).tobytes()).hexdigest()
+        search_args_hash = hashlib.sha256(
+            json.dumps(search_args, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"{self.write_version}:{embedding_hash}:{search_args_hash}"
+
     def recall_memories_from_embedding(
-        self, embedding, metadata=None, k=5, threshold=None
+        self, embedding, metadata=None, k=5, threshold=None, with_vectors=True, payload_keys=None
     ):
-        """Retrieve similar memories from embedding"""
-
-        memories = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=embedding,
-            query_filter=self._qdrant_filter_from_dict(metadata),
-            with_payload=True,
-            with_vectors=True,
-            limit=k,
-            score_threshold=threshold,
-            search_params=SearchParams(
-                quantization=QuantizationSearchParams(
-                    ignore=False,
-                    rescore=True,
-                    oversampling=2.0,  # Available as of v1.3.0
-                )
-            ),
+        """Retrieve similar memories from embedding.
+
+        Vectors are retrieved only if `with_vectors` is True (otherwise memories have a None vector),
+        and only the metadata keys in `payload_keys` are retrieved, if given.
+        If `CCAT_RECALL_CACHE_MAX_ITEMS` is set, results are cached until the next write to the collection
+        from this process, repeated searches do not reach the vector backend.
+        """
+
+        recall_key = None
+        if self.recall_cache is not None:
+            # the version is read before searching: results of a search concurrent to a write are stored
+            # with the previous version, and never used
+            recall_key = self._get_recall_key(
+                embedding,
+                metadata=metadata,
+                k=k,
+                threshold=threshold,
+                with_vectors=with_vectors,
+                payload_keys=payload_keys,
+            )
+            memories = self.recall_cache.get_value(recall_key)
+            if memories is not None:
+                return list(memories)
+
+        with_payload = True
+        if payload_keys is not None:
+            with_payload = ["page_content"] + [f"metadata.{key}" for key in payload_keys]
+
+        memories = self.backend.search(
+            self.collection_name,
+            embedding,
+            filter=metadata,
+            k=k,
+            threshold=threshold,
+            with_vectors=with_vectors,
+            with_payload=with_payload,
         )
 
         # convert Qdrant points to langchain.Document
@@ -255,77 +274,58 @@ class VectorMemoryCollection:
         # for doc, score, vector in langchain_documents_from_points:
         #    doc.lc_kwargs = None
 
-        return langchain_documents_from_points
+        if recall_key is not None:
+            self.recall_cache.insert(CacheItem(recall_key, langchain_documents_from_points))
+
+        return list(langchain_documents_from_points)
     
     def get_points(self, ids: List[str]):
         """Get points by their ids."""
-        return self.client.retrieve(
-            collection_name=self.collection_name,
-            ids=ids,
-            with_vectors=True,
-        )
+        return self.backend.retrieve(self.collection_name, ids, with_vectors=True)
 
     def get_all_points(
             self,
             limit: int = 10000,
-            offset: str | None = None
+            offset: str | None = None,
+            with_vectors: bool = True,
+            metadata: dict | None = None,
         ):
-        """Retrieve all the points in the collection with an optional offset and limit."""
+        """Retrieve all the points in the collection with an optional offset and limit,
+        only the ones matching the metadata filter if given."""
         
         # retrieving the points
-        all_points, next_page_offset = self.client.scroll(
-            collection_name=self.collection_name,
-            with_vectors=True,
+        all_points, next_page_offset = self.backend.scroll(
+            self.collection_name,
+            limit=limit, # Limit the number of points retrieved to the specified limit.
             offset=offset,  # Start from the given offset, or the beginning if None.
-            limit=limit # Limit the number of points retrieved to the specified limit.
+            with_vectors=with_vectors,
+            filter=metadata,
         )
 
         return all_points, next_page_offset
 
-    def db_is_remote(self):
-        return isinstance(self.client._client, QdrantRemote)
+    def iter_all_points(
+        self, page_size: int = 1000, with_vectors: bool = False, metadata: dict | None = None
+    ):
+        """Iterate over all the points in the collection (or the ones matching the metadata filter),
+        retrieving them one page at a time."""
 
-    # dump collection on disk before deleting
-    def save_dump(self, folder="dormouse/"):
-        # only do snapshotting if using remote Qdrant
-        if not self.db_is_remote():
-            return
+        offset = None
+        while True:
+            points, offset = self.get_all_points(
+                limit=page_size, offset=offset, with_vectors=with_vectors, metadata=metadata
+            )
+            yield from points
+            if offset is None:
+                return
 
-        host = self.client._client._host
-        port = self.client._client._port
+    def count_points(self) -> int:
+        """Number of points in the collection."""
+        return self.backend.count_points(self.collection_name)
 
-        if os.path.isdir(folder):
-            log.debug("Directory dormouse exists")
-        else:
-            log.info("Directory dormouse does NOT exists, creating it.")
-            os.mkdir(folder)
+    def db_is_remote(self):
+        return self.backend.is_remote()
 
-        self.snapshot_info = self.client.create_snapshot(
-            collection_name=self.collection_name
-        )
-        snapshot_url_in = (
-            "http://"
-            + str(host)
-            + ":"
-            + str(port)
-            + "/collections/"
-            + self.collection_name
-            + "/snapshots/"
-            + self.snapshot_info.name
-        )
-        snapshot_url_out = folder + self.snapshot_info.name
-        # rename snapshots for a easyer restore in the future
-        alias = (
-            self.client.get_collection_aliases(self.collection_name)
-            .aliases[0]
-            .alias_name
-        )
-        response = requests.get(snapshot_url_in)
-        open(snapshot_url_out, "wb").write(response.content)
-        new_name = folder + alias.replace("/", "-") + ".snapshot"
-        os.rename(snapshot_url_out, new_name)
-        for s in self.client.list_snapshots(self.collection_name):
-            self.client.delete_snapshot(
-                collection_name=self.collection_name, snapshot_name=s.name
-            )
-        log.warning(f'Dump "{new_name}" completed')
+    # dump collection on disk before deleting
+    def save_dump(self, folder="dormouse/"):
+        self.snapshot_info = self.backend.save_dump(self.collection_name, folder)
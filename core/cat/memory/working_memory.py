@@ -30,6 +30,12 @@ class WorkingMemory(BaseModelDict):
         A list for storing procedural memories.
     model_interactions : List[ModelInteraction]
         A list of interactions with models.
+
+    Notes
+    -----
+    Each attribute assignment increases the working memory `version`, so unchanged working memories are not written
+    back to the cache. If you mutate an attribute in place (e.g. `append` to a list) outside a conversation turn,
+    call `mark_dirty` to make sure the change is saved.
     """
 
     history: List[ConversationMessage] = []
@@ -45,6 +51,27 @@ class WorkingMemory(BaseModelDict):
     
     model_interactions: List[ModelInteraction] = []
 
+    _version: int = 0
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self.mark_dirty()
+
+    def __delattr__(self, name):
+        super().__delattr__(name)
+        self.mark_dirty()
+
+    @property
+    def version(self) -> int:
+        """Counter increased at each change of the working memory."""
+        # working memories cached by older versions may miss the private attribute
+        return getattr(self, "_version", 0)
+
+    def mark_dirty(self):
+        """Flag the working memory as changed, so it will be saved in the cache."""
+        self._version = self.version + 1
+
     def update_conversation_history(self, message: str, who: str, why = {}):
         """
         This method is deprecated. Use `update_history` instead.
@@ -1,15 +1,16 @@
 import os
 import time
 import json
+import copy
+import hashlib
 import mimetypes
 import httpx
-from typing import List, Union
+from typing import Dict, List, Union
 from urllib.parse import urlparse
 from urllib.error import HTTPError
 
 from starlette.datastructures import UploadFile
 from langchain.docstore.document import Document
-from qdrant_client.http import models
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders.parsers.pdf import PDFMinerParser
@@ -20,15 +21,44 @@ from langchain.document_loaders.blob_loaders.schema import Blob
 
 from cat.utils import singleton
 from cat.log import log
+from cat.env import get_env
+from cat.memory.memory_export_reader import MemoryExportReader
+from cat.ingestion_pipeline import IngestionJob, IngestionPipeline
+from cat.ingestion_jobs import IngestionJobManager
+from cat.factory.custom_embedder import unwrap_embedder
 
 
 @singleton
 class RabbitHole:
     """Manages content ingestion. I'm late... I'm late!"""
 
+    # bytes identifying an uploaded memory file, together with its name and size
+    MEMORY_CHECKPOINT_HEAD_SIZE = 64 * 1024
+    # bytes of a document read at a time to hash it
+    HASH_BLOCK_SIZE = 1024 * 1024
+
     def __init__(self, cat) -> None:
         self.__cat = cat
 
+        # files are read and parsed, chunks embedded and then stored, by concurrent stages
+        self.__pipeline = IngestionPipeline(
+            stages=[
+                (self.__read_documents, int(get_env("CCAT_RABBITHOLE_PARSE_WORKERS"))),
+                (self.__embed_documents, int(get_env("CCAT_RABBITHOLE_EMBED_WORKERS"))),
+                (self.__store_embedded_documents, int(get_env("CCAT_RABBITHOLE_STORE_WORKERS"))),
+            ],
+            finish=self.__finish_ingestion,
+            queue_size=int(get_env("CCAT_RABBITHOLE_QUEUE_SIZE")),
+            processes=int(get_env("CCAT_RABBITHOLE_PARSE_PROCESSES")),
+        )
+
+        # uploads requested via endpoints, persisted until ingested
+        self.__jobs = IngestionJobManager(
+            self,
+            get_env("CCAT_RABBITHOLE_JOBS_DIR"),
+            workers=int(get_env("CCAT_RABBITHOLE_JOB_WORKERS")),
+        )
+
     # each time we access the file handlers, plugins can intervene
     def __reload_file_handlers(self):
         # default file handlers
@@ -63,14 +93,18 @@ class RabbitHole:
     def ingest_memory(
             self,
             cat,
-            file: UploadFile
+            file: UploadFile,
+            job: IngestionJob | None = None
         ):
-        """Upload memories to the declarative memory from a JSON file.
+        """Upload memories to the declarative memory from a JSON or NDJSON file.
 
         Parameters
         ----------
         file : UploadFile
             File object sent via `rabbithole/memory` hook.
+        job : IngestionJob, optional
+            Job tracking the upload: its counters are updated (memories are already embedded, only the
+            parsed and stored ones are counted) and the upload stops between batches if it is cancelled.
 
         Notes
         -----
@@ -79,50 +113,100 @@ class RabbitHole:
         when uploading.
         The method also performs a check on the dimensionality of the embeddings (i.e. length of each vector).
 
-        """
-
-        # Get file bytes
-        file_bytes = file.file.read()
+        The file is read incrementally (see `MemoryExportReader` for the supported formats) and memories are
+        stored in batches of `CCAT_QDRANT_BATCH_SIZE`, so files of any size can be uploaded.
+        The number of stored memories is saved in the ingestion jobs database after each batch: if the upload
+        fails or the Cat restarts, uploading the same file again (or resuming its job) continues from the last
+        stored batch.
 
-        # Load fyle byte in a dict
-        memories = json.loads(file_bytes.decode("utf-8"))
-
-        # Check the embedder used for the uploaded memories is the same the Cat is using now
-        upload_embedder = memories["embedder"]
-        cat_embedder = str(cat.embedder.__class__.__name__)
-
-        if upload_embedder != cat_embedder:
-            message = f"Embedder mismatch: file embedder {upload_embedder} is different from {cat_embedder}"
-            raise Exception(message)
-
-        # Get Declarative memories in file
-        declarative_memories = memories["collections"]["declarative"]
-
-        # Store data to upload the memories in batch
-        ids = [i["id"] for i in declarative_memories]
-        payloads = [
-            {"page_content": p["page_content"], "metadata": p["metadata"]}
-            for p in declarative_memories
-        ]
-        vectors = [v["vector"] for v in declarative_memories]
-
-        log.info(f"Preparing to load {len(vectors)} vector memories")
+        """
 
-        # Check embedding size is correct
+        reader = MemoryExportReader.from_file_name(file.file, file.filename or "")
+        cat_embedder = str(unwrap_embedder(cat.embedder).__class__.__name__)
         embedder_size = cat.memory.vectors.declarative.embedder_size
-        len_mismatch = [len(v) == embedder_size for v in vectors]
+        batch_size = int(get_env("CCAT_QDRANT_BATCH_SIZE"))
 
-        if not any(len_mismatch):
-            message = (
-                f"Embedding size mismatch: vectors length should be {embedder_size}"
-            )
-            raise Exception(message)
+        # memories already stored by a previous upload of the same file
+        checkpoint_key = self.__get_memory_checkpoint_key(file)
+        committed = self.__jobs.get_memory_checkpoint(checkpoint_key)
+        if committed:
+            log.info(f"Resuming upload of {file.filename} after {committed} memories")
 
-        # Upsert memories in batch mode # TODO REFACTOR: use VectorMemoryCollection.add_point
-        cat.memory.vectors.vector_db.upsert(
-            collection_name="declarative",
-            points=models.Batch(ids=ids, payloads=payloads, vectors=vectors),
+        time_last_notification = time.time()
+        time_interval = 10  # a notification every 10 secs
+        batch = []
+        n_memories = 0
+        for memory in reader:
+            if n_memories == 0:
+                # Check the embedder used for the uploaded memories is the same the Cat is using now
+                upload_embedder = reader.embedder
+                if upload_embedder != cat_embedder:
+                    message = f"Embedder mismatch: file embedder {upload_embedder} is different from {cat_embedder}"
+                    raise Exception(message)
+
+            # Check embedding size is correct
+            if len(memory["vector"]) != embedder_size:
+                message = (
+                    f"Embedding size mismatch: vectors length should be {embedder_size}"
+                )
+                raise Exception(message)
+
+            n_memories += 1
+            if job is not None:
+                job.chunks_parsed = n_memories
+            if n_memories <= committed:
+                continue
+            batch.append(memory)
+
+            if len(batch) == batch_size:
+                self.__store_memory_batch(cat, batch, job)
+                batch = []
+                committed = n_memories
+                self.__jobs.set_memory_checkpoint(checkpoint_key, committed)
+
+                if time.time() - time_last_notification > time_interval:
+                    time_last_notification = time.time()
+                    read_message = f"Stored {committed} memories of {file.filename}"
+                    cat.send_ws_message(read_message)
+                    log.info(read_message)
+
+        if batch:
+            self.__store_memory_batch(cat, batch, job)
+        self.__jobs.set_memory_checkpoint(checkpoint_key)
+
+        log.info(f"Loaded {n_memories} vector memories")
+        cat.send_ws_message(f"Finished uploading {n_memories} memories of {file.filename}")
+
+    def __store_memory_batch(self, cat, batch, job=None):
+        # a cancelled upload can be resumed from the last stored batch
+        if job is not None and job.error is not None:
+            raise job.error
+
+        stored_points = cat.memory.vectors.declarative.add_points(
+            [m["page_content"] for m in batch],
+            [m["vector"] for m in batch],
+            metadatas=[m["metadata"] for m in batch],
+            ids=[m["id"] for m in batch],
+            batch_size=len(batch),
         )
+        # the checkpoint must not move past a failed batch
+        if len(stored_points) != len(batch):
+            raise Exception(f"Failed to store {len(batch) - len(stored_points)} memories")
+        if job is not None:
+            job.chunks_stored += len(stored_points)
+
+    def __get_memory_checkpoint_key(self, file: UploadFile):
+        # identify the file by name, size and first bytes, without reading it all
+        head = file.file.read(self.MEMORY_CHECKPOINT_HEAD_SIZE)
+        file.file.seek(0)
+        size = file.size
+        if size is None:
+            size = file.file.seek(0, os.SEEK_END)
+            file.file.seek(0)
+        fingerprint = hashlib.sha256(
+            f"{file.filename}:{size}:".encode() + head
+        ).hexdigest()
+        return f"ingest_memory_{fingerprint}"
 
     def ingest_file(
         self,
@@ -159,21 +243,132 @@ class RabbitHole:
         before_rabbithole_stores_documents
         """
 
-        # split file into a list of docs
-        docs = self.file_to_docs(
-            cat=cat,
-            file=file,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
-
         # store in memory
         if isinstance(file, str):
             filename = file
         else:
             filename = file.filename
 
-        self.store_documents(cat=cat, docs=docs, source=filename, metadata=metadata)
+        job = IngestionJob(
+            cat,
+            filename,
+            file=file,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            metadata=metadata,
+        )
+        self.ingest(job)
+
+    def ingest(self, job: IngestionJob, wait: bool = True) -> IngestionJob:
+        """Run an ingestion job (a file to read or documents to store) through the ingestion pipeline.
+
+        Parameters
+        ----------
+        job : IngestionJob
+            The job, its counters are updated while it goes through the pipeline.
+        wait : bool
+            Whether to wait for the job to be done, raising its error if it failed.
+            Otherwise see `IngestionJob.wait`.
+
+        Returns
+        -------
+        job : IngestionJob
+            The same job.
+        """
+
+        if wait:
+            return self.__pipeline.run(job)
+        return self.__pipeline.submit(job)
+
+    def ingest_files(
+        self,
+        cat,
+        files: List[Union[str, UploadFile]],
+        chunk_size: int | None = None,
+        chunk_overlap: int | None = None,
+        metadata: Dict[str, dict] = {}
+    ):
+        """Load several files in the Cat's declarative memory, concurrently.
+
+        Files are parsed, embedded and stored as with `ingest_file`, the stages of different files overlap.
+        A file that cannot be ingested is logged and does not stop the others.
+
+        Parameters
+        ----------
+        files : List[str | UploadFile]
+            Paths, URLs or `UploadFile` objects.
+        chunk_size : int
+            Number of tokens in each document chunk.
+        chunk_overlap : int
+            Number of overlapping tokens between consecutive chunks.
+        metadata : Dict[str, dict]
+            Metadata to be stored with the chunks of each file, by file name (or path or URL).
+        """
+
+        jobs = []
+        for file in files:
+            filename = file if isinstance(file, str) else file.filename
+            job = IngestionJob(
+                cat,
+                filename,
+                file=file,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                metadata=metadata.get(filename, {}),
+            )
+            jobs.append(self.ingest(job, wait=False))
+
+        for job in jobs:
+            try:
+                job.wait()
+            except Exception as e:
+                log.error(f"Could not ingest {job.source}: {e}")
+
+    def __get_document_hash(self, blob: Blob, chunk_size, chunk_overlap, metadata) -> str:
+        """Hash of a document content and of the settings its chunks depend on."""
+
+        # files are hashed a block at a time
+        document_hash = hashlib.sha256()
+        with blob.as_bytes_io() as f:
+            for block in iter(lambda: f.read(self.HASH_BLOCK_SIZE), b""):
+                document_hash.update(block)
+        settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "metadata": metadata}
+        document_hash.update(json.dumps(settings, sort_keys=True, default=str).encode())
+        return document_hash.hexdigest()
+
+    def __get_chunk_hash(self, doc: Document, metadata: dict) -> str:
+        """Hash of a chunk content and of the custom metadata stored with it."""
+
+        chunk_hash = hashlib.sha256(doc.page_content.encode())
+        chunk_hash.update(json.dumps(metadata, sort_keys=True, default=str).encode())
+        return chunk_hash.hexdigest()
+
+    def __is_document_stored(self, cat, source: str, document_hash: str) -> bool:
+        """Whether all the chunks of a document, as last ingested with this hash, are in memory."""
+
+        # recorded once an ingestion is complete, forgotten as soon as another one starts changing the source
+        stored_document = self.__jobs.get_stored_document(source)
+        if stored_document is None or stored_document["document_hash"] != document_hash:
+            return False
+
+        # chunks could have been deleted since, e.g. via the memory endpoints
+        declarative = cat.memory.vectors.declarative
+        stored_chunks = sum(1 for _ in declarative.iter_all_points(metadata={"source": source}))
+        return stored_chunks == stored_document["document_chunks"]
+
+    def __get_stored_chunks(self, cat, source: str):
+        """Ids of the chunks of a source already in memory, by chunk hash, and ids of the redundant ones
+        (duplicated chunks and chunks stored before hashes were introduced)."""
+
+        stored_chunks = {}
+        redundant_ids = []
+        for point in cat.memory.vectors.declarative.iter_all_points(metadata={"source": source}):
+            chunk_hash = point.payload["metadata"].get("chunk_hash")
+            if chunk_hash is None or chunk_hash in stored_chunks:
+                redundant_ids.append(point.id)
+            else:
+                stored_chunks[chunk_hash] = point.id
+        return stored_chunks, redundant_ids
 
     def file_to_docs(
         self,
@@ -185,7 +380,7 @@ class RabbitHole:
         """Load and convert files to Langchain `Document`.
 
         This method takes a file either from a Python script, from the `/rabbithole/` or `/rabbithole/web` endpoints.
-        Hence, it loads it in memory and splits it in overlapped chunks of text.
+        Hence, it parses it (reading files from disk as a stream) and splits it in overlapped chunks of text.
 
         Parameters
         ----------
@@ -209,12 +404,32 @@ class RabbitHole:
 
         """
 
+        blob = self.__get_blob(file)
+        return self.__blob_to_docs(
+            cat=cat,
+            blob=blob,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+
+    def __get_blob(self, file: Union[str, UploadFile]) -> Blob:
+        """Blob of a file path, URL or `UploadFile`.
+
+        Files on disk (paths, and uploads kept in a file as done by the ingestion jobs) are referenced by path
+        and read by the parsers as a stream, only the content of URLs and in-memory uploads is loaded.
+        """
+
         # Check type of incoming file.
         if isinstance(file, UploadFile):
             # Get mime type and source of UploadFile
             content_type = mimetypes.guess_type(file.filename)[0]
             source = file.filename
 
+            # an unnamed temporary file has a file descriptor as name
+            path = getattr(file.file, "name", None)
+            if isinstance(path, str) and os.path.isfile(path):
+                return Blob.from_path(path, mime_type=content_type, metadata={"source": source})
+
             # Get file bytes
             file_bytes = file.file.read()
         elif isinstance(file, str):
@@ -239,19 +454,11 @@ class RabbitHole:
                 # Get mime type from file extension and source
                 content_type = mimetypes.guess_type(file)[0]
                 source = os.path.basename(file)
-
-                # Get file bytes
-                with open(file, "rb") as f:
-                    file_bytes = f.read()
+                return Blob.from_path(file, mime_type=content_type, metadata={"source": source})
         else:
             raise ValueError(f"{type(file)} is not a valid type.")
-        return self.string_to_docs(
-            cat=cat,
-            file_bytes=file_bytes,
-            source=source,
-            content_type=content_type,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
+        return Blob.from_data(
+            data=file_bytes, mime_type=content_type, path=source
         )
 
     def string_to_docs(
@@ -291,14 +498,30 @@ class RabbitHole:
         blob = Blob(data=file_bytes, mimetype=content_type, source=source).from_data(
             data=file_bytes, mime_type=content_type, path=source
         )
+        return self.__blob_to_docs(
+            cat=cat,
+            blob=blob,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+
+    def __blob_to_docs(
+        self,
+        cat,
+        blob: Blob,
+        chunk_size: int | None = None,
+        chunk_overlap: int | None = None
+    ) -> List[Document]:
+        """Parse a blob with the file handler of its mime type and split it in chunks."""
+
         # Parser based on the mime type
         parser = MimeTypeBasedParser(handlers=self.file_handlers)
 
-        # Parse the text
+        # Parse the text (a blob referencing a file is sent to the parsing process by path)
         cat.send_ws_message(
             "I'm parsing the content. Big content could require some minutes..."
         )
-        super_docs = parser.parse(blob)
+        super_docs = self.__pipeline.run_in_process(parser.parse, blob)
 
         # Split
         cat.send_ws_message("Parsing completed. Now let's go with reading process...")
@@ -315,12 +538,15 @@ class RabbitHole:
             cat,
             docs: List[Document],
             source: str, # TODOV2: is this necessary?
-            metadata: dict = {}
+            metadata: dict = {},
+            document_hash: str | None = None,
         ) -> None:
         """Add documents to the Cat's declarative memory.
 
-        This method loops a list of Langchain `Document` and adds some metadata. Namely, the source filename and the
-        timestamp of insertion. Once done, the method notifies the client via Websocket connection.
+        This method loops a list of Langchain `Document` and adds some metadata. Namely, the source filename, the
+        timestamp of insertion and a hash of the chunk content. Chunks of the same source already in memory with the
+        same hash are not embedded again, the others are embedded and stored in batches of `CCAT_EMBEDDER_BATCH_SIZE`.
+        Once done, the method notifies the client via Websocket connection.
 
         Parameters
         ----------
@@ -330,6 +556,9 @@ class RabbitHole:
             Source name to be added as a metadata. It can be a file name or an URL.
         metadata : dict
             Metadata to be stored with each chunk.
+        document_hash : str, optional
+            Hash of the whole document, when `docs` are all the chunks of the source. The chunks of the source
+            in memory that are not in `docs` anymore are then deleted.
 
         Notes
         -------
@@ -341,60 +570,175 @@ class RabbitHole:
         before_rabbithole_insert_memory
         """
 
-        log.info(f"Preparing to memorize {len(docs)} vectors")
+        job = IngestionJob(
+            cat, source, docs=docs, metadata=metadata, document_hash=document_hash
+        )
+        self.ingest(job)
+
+    def __read_documents(self, job: IngestionJob, _):
+        """First stage of the ingestion pipeline: parse and split the file (if any),
+        yield the chunks to embed in batches of `CCAT_EMBEDDER_BATCH_SIZE`."""
+
+        cat = job.cat
+        if job.docs is None:
+            blob = self.__get_blob(job.file)
+
+            # a document already in memory, with the same settings, is not parsed nor embedded again
+            job.document_hash = self.__get_document_hash(
+                blob, job.chunk_size, job.chunk_overlap, job.metadata
+            )
+            if self.__is_document_stored(cat, job.source, job.document_hash):
+                already_stored_message = f"I already know {job.source}, nothing changed since I read it."
+                cat.send_ws_message(already_stored_message)
+                log.info(already_stored_message)
+                job.skipped = True
+                return
+
+            # split file into a list of docs
+            job.docs = self.__blob_to_docs(
+                cat=cat,
+                blob=blob,
+                chunk_size=job.chunk_size,
+                chunk_overlap=job.chunk_overlap
+            )
+
+        # the source is not complete until the job is done (an interrupted job is not skipped when run again)
+        self.__jobs.set_stored_document(job.source)
+
+        job.chunks_parsed = len(job.docs)
+        new_docs = self.__prepare_documents(job)
+
+        batch_size = int(get_env("CCAT_EMBEDDER_BATCH_SIZE"))
+        job.chunks_to_store = len(new_docs)
+        job.last_notification = time.time()
+        for b in range(0, len(new_docs), batch_size):
+            yield new_docs[b : b + batch_size]
+
+    def __prepare_documents(self, job: IngestionJob) -> List[Document]:
+        """Add metadata to the chunks of a job, return the ones to be stored and record the outdated ones."""
+
+        cat = job.cat
+        source = job.source
+        document_hash = job.document_hash
+
+        log.info(f"Preparing to memorize {len(job.docs)} vectors")
 
         # hook the docs before they are stored in the vector memory
-        docs = cat.mad_hatter.execute_hook(
-            "before_rabbithole_stores_documents", docs, cat=cat
+        job.docs = cat.mad_hatter.execute_hook(
+            "before_rabbithole_stores_documents", job.docs, cat=cat
         )
+        docs = job.docs
 
-        # classic embed
-        time_last_notification = time.time()
-        time_interval = 10  # a notification every 10 secs
-        stored_points = []
+        # chunks already in memory are kept as they are
+        stored_chunks, redundant_ids = self.__get_stored_chunks(cat, source)
+        chunk_hashes = set()
+        new_docs = []
         for d, doc in enumerate(docs):
-            if time.time() - time_last_notification > time_interval:
-                time_last_notification = time.time()
-                perc_read = int(d / len(docs) * 100)
-                read_message = f"Read {perc_read}% of {source}"
-                cat.send_ws_message(read_message)
-                log.info(read_message)
-
             # add default metadata
             doc.metadata["source"] = source
             doc.metadata["when"] = time.time()
             # add custom metadata (sent via endpoint)
-            for k,v in metadata.items():
+            for k,v in job.metadata.items():
                 doc.metadata[k] = v
 
             doc = cat.mad_hatter.execute_hook(
                 "before_rabbithole_insert_memory", doc, cat=cat
             )
             inserting_info = f"{d + 1}/{len(docs)}):    {doc.page_content}"
-            if doc.page_content != "":
-                doc_embedding = cat.embedder.embed_documents([doc.page_content])
-                stored_point = cat.memory.vectors.declarative.add_point(
-                    doc.page_content,
-                    doc_embedding[0],
-                    doc.metadata,
-                )
-                stored_points.append(stored_point)
-
-                log.info(f"Inserted into memory ({inserting_info})")
-            else:
+            if doc.page_content == "":
                 log.info(f"Skipped memory insertion of empty doc ({inserting_info})")
+                continue
+
+            chunk_hash = self.__get_chunk_hash(doc, job.metadata)
+            if chunk_hash in chunk_hashes or chunk_hash in stored_chunks:
+                chunk_hashes.add(chunk_hash)
+                log.info(f"Skipped memory insertion of already stored doc ({inserting_info})")
+                continue
+            chunk_hashes.add(chunk_hash)
+
+            doc.metadata["chunk_hash"] = chunk_hash
+            new_docs.append(doc)
+            log.info(f"Inserting into memory ({inserting_info})")
+
+        if document_hash is not None:
+            for doc in new_docs:
+                doc.metadata["document_hash"] = document_hash
+            job.document_chunks = len(chunk_hashes)
+
+            # chunks no longer in the document are forgotten once the new ones are stored
+            job.outdated_ids = redundant_ids + [
+                point_id
+                for chunk_hash, point_id in stored_chunks.items()
+                if chunk_hash not in chunk_hashes
+            ]
+
+        log.info(
+            f"{len(new_docs)} new chunks of {source}, {len(chunk_hashes) - len(new_docs)} already in memory"
+        )
+        return new_docs
+
+    def __embed_documents(self, job: IngestionJob, docs: List[Document]):
+        """Second stage of the ingestion pipeline: embed a batch of chunks."""
+
+        docs_embeddings = job.cat.embedder.embed_documents(
+            [doc.page_content for doc in docs]
+        )
+        with job.lock:
+            job.chunks_embedded += len(docs)
+        yield docs, docs_embeddings
+
+    def __store_embedded_documents(self, job: IngestionJob, embedded_docs):
+        """Last stage of the ingestion pipeline: store a batch of embedded chunks."""
+
+        docs, docs_embeddings = embedded_docs
+        stored_points = job.cat.memory.vectors.declarative.add_points(
+            [doc.page_content for doc in docs],
+            docs_embeddings,
+            [doc.metadata for doc in docs],
+            batch_size=int(get_env("CCAT_QDRANT_BATCH_SIZE")),
+        )
+
+        with job.lock:
+            job.stored_points.extend(stored_points)
+            job.chunks_stored += len(stored_points)
+            stored_count = job.chunks_stored
+            # a notification every 10 secs
+            notify = time.time() - job.last_notification > 10
+            if notify:
+                job.last_notification = time.time()
 
-            # wait a little to avoid APIs rate limit errors
-            time.sleep(0.05)
+        if notify:
+            perc_read = int(stored_count / job.chunks_to_store * 100)
+            read_message = f"Read {perc_read}% of {job.source}"
+            job.cat.send_ws_message(read_message)
+            log.info(read_message)
+
+    def __finish_ingestion(self, job: IngestionJob):
+        """Called once all the chunks of a job are stored."""
+
+        if job.skipped:
+            return
+
+        cat = job.cat
+        source = job.source
+
+        # chunks no longer in the document are forgotten, in a single delete
+        if job.outdated_ids:
+            log.info(f"Deleting {len(job.outdated_ids)} outdated chunks of {source}")
+            cat.memory.vectors.declarative.delete_points(job.outdated_ids)
+
+        # the whole document is in memory, it is skipped if ingested again unchanged
+        if job.document_hash is not None:
+            self.__jobs.set_stored_document(source, job.document_hash, job.document_chunks)
 
         # hook the points after they are stored in the vector memory
         cat.mad_hatter.execute_hook(
-            "after_rabbithole_stored_documents", source, stored_points, cat=cat
+            "after_rabbithole_stored_documents", source, job.stored_points, cat=cat
         )
 
         # notify client
         finished_reading_message = (
-            f"Finished reading {source}, I made {len(docs)} thoughts on it."
+            f"Finished reading {source}, I made {len(job.docs)} thoughts on it."
         )
 
         cat.send_ws_message(finished_reading_message)
@@ -439,7 +783,8 @@ class RabbitHole:
         )
 
         # hooks decide the test splitter (see @property .text_splitter)
-        text_splitter = self.text_splitter
+        # copied, as documents are split concurrently with different settings
+        text_splitter = copy.copy(self.text_splitter)
 
         # override chunk_size and chunk_overlap only if the request has those info
         if chunk_size:
@@ -461,6 +806,10 @@ class RabbitHole:
 
         return docs
 
+    @property
+    def jobs(self) -> IngestionJobManager:
+        return self.__jobs
+
     # each time we access the file handlers, plugins can intervene
     @property
     def file_handlers(self):
@@ -21,10 +21,9 @@ async def get_collections(
     
     collections_metadata = []
     for c in collections:
-        coll_meta = vector_memory.get_collection(c)
         collections_metadata.append({
             "name": c,
-            "vectors_count": coll_meta.points_count
+            "vectors_count": vector_memory.collections[c].count_points()
         })
 
     return {"collections": collections_metadata}
@@ -1,10 +1,14 @@
 from typing import Dict, List
 from pydantic import BaseModel
 from fastapi import Query, Body, Request, APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 import time
+import json
+import zlib
 
 from cat.auth.permissions import AuthPermission, AuthResource, check_permissions
 from cat.memory.vector_memory import VectorMemory
+from cat.factory.custom_embedder import unwrap_embedder
 from cat.looking_glass.stray_cat import StrayCat
 from cat.log import log
 
@@ -70,7 +74,7 @@ async def recall_memory_points_from_text(
         "query": query,
         "vectors": {
             "embedder": str(
-                cat.embedder.__class__.__name__
+                unwrap_embedder(cat.embedder).__class__.__name__
             ),  # TODO: should be the config class name
             "collections": recalled,
         },
@@ -156,7 +160,7 @@ async def recall_memory_points(
         "query": query,
         "vectors": {
             "embedder": str(
-                cat.embedder.__class__.__name__
+                unwrap_embedder(cat.embedder).__class__.__name__
             ),  # TODO: should be the config class name
             "collections": recalled,
         },
@@ -356,6 +360,126 @@ async def get_points_in_collection(
 
 
 
+def stream_points_ndjson(memory_collection, embedder, page_size, offset, with_vectors, compress):
+    """Yield the points of a collection as NDJSON, one page at a time (optionally gzip compressed)."""
+
+    # gzip container (wbits + 16), so the output can be saved as .ndjson.gz
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS + 16) if compress else None
+
+    # the embedder is checked when the export is uploaded, a resumed export is appended to the first part
+    if offset is None:
+        header = (json.dumps({"embedder": embedder}) + "\n").encode()
+        yield compressor.compress(header) if compressor else header
+
+    while True:
+        points, offset = memory_collection.get_all_points(
+            limit=page_size, offset=offset, with_vectors=with_vectors
+        )
+        lines = []
+        for point in points:
+            line = {"id": point.id, "payload": point.payload}
+            if with_vectors:
+                line["vector"] = point.vector
+            lines.append(json.dumps(line) + "\n")
+        chunk = "".join(lines).encode()
+
+        if compressor:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+        if offset is None:
+            break
+
+    if compressor:
+        yield compressor.flush()
+
+
+# EXPORT all the points from a single collection, streaming them
+@router.get("/collections/{collection_id}/points/export")
+async def export_points_in_collection(
+    request: Request,
+    collection_id: str,
+    with_vectors: bool = Query(
+        default=True,
+        description="Whether to export the vectors of the points"
+    ),
+    compress: bool = Query(
+        default=False,
+        description="Whether to gzip compress the export"
+    ),
+    offset: str = Query(
+        default=None,
+        description="If provided (or not empty string) - start from the point with this id, to resume an interrupted export"
+    ),
+    page_size: int = Query(
+        default=1000,
+        ge=1,
+        le=10000,
+        description="How many points are read from the vector memory at once"
+    ),
+    cat: StrayCat = check_permissions(AuthResource.MEMORY, AuthPermission.READ),
+) -> StreamingResponse:
+    """Export all the points of a single collection as NDJSON (one JSON point per line)
+
+    The first line declares the embedder of the vectors (`{"embedder": "..."}`), as required to upload the export
+    to `/rabbithole/memory`.
+    Points are streamed one page at a time, so exports of any size use bounded memory.
+    To resume an interrupted export pass the id of the last point received as `offset`:
+    the export restarts from that point (included), without the embedder line.
+
+    Example
+    ----------
+    ```
+    collection = "declarative"
+    with requests.get(
+        f"http://localhost:1865/memory/collections/{collection}/points/export?compress=true",
+        stream=True,
+    ) as res:
+        with open(f"{collection}.ndjson.gz", "wb") as f:
+            for chunk in res.iter_content(chunk_size=None):
+                f.write(chunk)
+    ```
+    """
+
+    # do not allow procedural memory reads via network
+    if collection_id == "procedural":
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "Procedural memory is not readable via API"
+            }
+        )
+
+    # check if collection exists
+    collections = list(cat.memory.vectors.collections.keys())
+    if collection_id not in collections:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "Collection does not exist."
+            }
+        )
+
+    # if offset is empty string set to null
+    if offset == "":
+        offset = None
+
+    memory_collection = cat.memory.vectors.collections[collection_id]
+    file_name = f"{collection_id}.ndjson" + (".gz" if compress else "")
+    return StreamingResponse(
+        stream_points_ndjson(
+            memory_collection,
+            str(unwrap_embedder(cat.embedder).__class__.__name__),
+            page_size,
+            offset,
+            with_vectors,
+            compress,
+        ),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
 # EDIT a point in memory
 @router.put("/collections/{collection_id}/points/{point_id}", response_model=MemoryPoint)
 async def edit_memory_point(
@@ -1,21 +1,21 @@
 import mimetypes
 import httpx
-import io
 import json
 from typing import Dict, List
-from copy import deepcopy
 
 from pydantic import BaseModel, Field, ConfigDict
 
 from fastapi import (
     Form,
+    Query,
     Request,
     APIRouter,
     UploadFile,
-    BackgroundTasks,
     HTTPException,
 )
 
+from fastapi.concurrency import run_in_threadpool
+
 from cat.auth.permissions import AuthPermission, AuthResource, check_permissions
 from cat.log import log
 
@@ -29,18 +29,11 @@ from cat.log import log
 router = APIRouter()
 
 
-def format_upload_file(upload_file: UploadFile) -> UploadFile:
-    file_content = upload_file.file.read()
-    return UploadFile(filename=upload_file.filename, file=io.BytesIO(file_content))
-
-
-
 # receive files via http endpoint
 @router.post("/")
 async def upload_file(
     request: Request,
     file: UploadFile,
-    background_tasks: BackgroundTasks,
     chunk_size: int | None = Form(
         default=None,
         description="Maximum length of each chunk after the document is split (in tokens)"
@@ -110,15 +103,18 @@ async def upload_file(
         )
 
     # upload file to long term memory, in the background
-    background_tasks.add_task(
-        # we deepcopy the file because FastAPI does not keep the file in memory after the response returns to the client
-        # https://github.com/tiangolo/fastapi/discussions/10936
-        cat.rabbit_hole.ingest_file,
+    # (the upload is spooled to disk by the multipart parser and copied in the jobs folder, never loaded in memory)
+    job = await run_in_threadpool(
+        cat.rabbit_hole.jobs.submit,
         cat,
-        deepcopy(format_upload_file(file)),
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        metadata=json.loads(metadata)
+        "file",
+        file.filename,
+        file=file,
+        options={
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "metadata": json.loads(metadata),
+        },
     )
 
     # reply to client
@@ -126,6 +122,7 @@ async def upload_file(
         "filename": file.filename,
         "content_type": file.content_type,
         "info": "File is being ingested asynchronously",
+        "job_id": job["id"],
     }
 
 
@@ -134,7 +131,6 @@ async def upload_file(
 async def upload_files(
     request: Request,
     files: List[UploadFile],
-    background_tasks: BackgroundTasks,
     chunk_size: int | None = Form(
         default=None,
         description="Maximum length of each chunk after the document is split (in tokens)"
@@ -220,17 +216,20 @@ async def upload_files(
                 },
             )
 
-        # upload file to long term memory, in the background
-        background_tasks.add_task(
-            # we deepcopy the file because FastAPI does not keep the file in memory after the response returns to the client
-            # https://github.com/tiangolo/fastapi/discussions/10936
-            cat.rabbit_hole.ingest_file,
+    for file in files:
+        # upload file to long term memory, in the background (files are ingested concurrently)
+        job = await run_in_threadpool(
+            cat.rabbit_hole.jobs.submit,
             cat,
-            deepcopy(format_upload_file(file)),
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            # if file.filename in dictionary pass the metadata otherwise pass empty dictionary 
-            metadata=metadata_dict[file.filename] if file.filename in metadata_dict else {}
+            "file",
+            file.filename,
+            file=file,
+            options={
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                # if file.filename in dictionary pass the metadata otherwise pass empty dictionary
+                "metadata": metadata_dict.get(file.filename, {}),
+            },
         )
 
         # reply to client
@@ -238,6 +237,7 @@ async def upload_files(
             "filename": file.filename,
             "content_type": file.content_type,
             "info": "File is being ingested asynchronously",
+            "job_id": job["id"],
         }
 
     return response
@@ -264,7 +264,6 @@ class UploadURLConfig(BaseModel):
 
 @router.post("/web")
 async def upload_url(
-    background_tasks: BackgroundTasks,
     upload_config: UploadURLConfig,
     cat=check_permissions(AuthResource.UPLOAD, AuthPermission.WRITE),
 ):
@@ -283,13 +282,18 @@ async def upload_url(
 
         if response.status_code == 200:
             # upload file to long term memory, in the background
-            background_tasks.add_task(
-                cat.rabbit_hole.ingest_file,
+            job = await run_in_threadpool(
+                cat.rabbit_hole.jobs.submit,
                 cat,
+                "url",
                 upload_config.url,
-                **upload_config.model_dump(exclude={"url"})
+                options=upload_config.model_dump(exclude={"url"}),
             )
-            return {"url": upload_config.url, "info": "URL is being ingested asynchronously"}
+            return {
+                "url": upload_config.url,
+                "info": "URL is being ingested asynchronously",
+                "job_id": job["id"],
+            }
         else:
             raise HTTPException(
                 status_code=400,
@@ -307,27 +311,25 @@ async def upload_url(
 async def upload_memory(
     request: Request,
     file: UploadFile,
-    background_tasks: BackgroundTasks,
     cat=check_permissions(AuthResource.MEMORY, AuthPermission.WRITE),
 ) -> Dict:
-    """Upload a memory json file to the cat memory"""
+    """Upload a memory json (or ndjson) file to the cat memory, optionally gzip compressed"""
 
     # Get file mime type
     content_type = mimetypes.guess_type(file.filename)[0]
     log.info(f"Uploading {content_type} down the rabbit hole")
-    if content_type != "application/json":
+    is_ndjson = file.filename.lower().removesuffix(".gz").endswith((".ndjson", ".jsonl"))
+    if content_type != "application/json" and not is_ndjson:
         raise HTTPException(
             status_code=400,
             detail={
-                "error": f"MIME type {content_type} not supported. Admitted types: 'application/json'"
+                "error": f"MIME type {content_type} not supported. Admitted types: 'application/json', 'application/x-ndjson'"
             },
         )
 
     # Ingest memories in background and notify client
-    background_tasks.add_task(
-        cat.rabbit_hole.ingest_memory,
-        cat,
-        deepcopy(file)
+    job = await run_in_threadpool(
+        cat.rabbit_hole.jobs.submit, cat, "memory", file.filename, file=file
     )
 
     # reply to client
@@ -335,9 +337,73 @@ async def upload_memory(
         "filename": file.filename,
         "content_type": file.content_type,
         "info": "Memory is being ingested asynchronously",
+        "job_id": job["id"],
     }
 
 
+def get_jobs_user_id(cat) -> str | None:
+    """Users see and cancel their own ingestion jobs, admins (who can list users) the jobs of everybody."""
+
+    if AuthPermission.LIST in cat.user_data.permissions.get(AuthResource.USERS, []):
+        return None
+    return cat.user_id
+
+
+@router.get("/jobs")
+async def get_ingestion_jobs(
+    request: Request,
+    status: str | None = Query(
+        default=None,
+        description="Only the jobs with this status (queued, running, done, failed or cancelled).",
+    ),
+    limit: int = Query(default=100, ge=1, le=1000, description="Max number of jobs to return."),
+    cat=check_permissions(AuthResource.UPLOAD, AuthPermission.READ),
+) -> Dict:
+    """List the ingestion jobs of the user (of all users for admins), most recent first, with their status and progress"""
+
+    jobs = cat.rabbit_hole.jobs
+    if status is not None and status not in jobs.STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": f"Invalid status {status}. Admitted statuses: {' - '.join(jobs.STATUSES)}"},
+        )
+
+    return {"jobs": jobs.list_jobs(status=status, limit=limit, user_id=get_jobs_user_id(cat))}
+
+
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(
+    request: Request,
+    job_id: str,
+    cat=check_permissions(AuthResource.UPLOAD, AuthPermission.READ),
+) -> Dict:
+    """Get the status and progress of an ingestion job"""
+
+    job = cat.rabbit_hole.jobs.get_job(job_id, user_id=get_jobs_user_id(cat))
+    if job is None:
+        raise HTTPException(
+            status_code=404, detail={"error": f"Job {job_id} not found"}
+        )
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_ingestion_job(
+    request: Request,
+    job_id: str,
+    cat=check_permissions(AuthResource.UPLOAD, AuthPermission.WRITE),
+) -> Dict:
+    """Cancel an ingestion job. A running job stops after the chunks being processed,
+    chunks already stored are kept (uploading the same file again completes it)"""
+
+    job = cat.rabbit_hole.jobs.cancel(job_id, user_id=get_jobs_user_id(cat))
+    if job is None:
+        raise HTTPException(
+            status_code=404, detail={"error": f"Job {job_id} not found"}
+        )
+    return job
+
+
 @router.get("/allowed-mimetypes")
 async def get_allowed_mimetypes(
     request: Request,
@@ -47,11 +47,17 @@ async def lifespan(app: FastAPI):
     # keep track of websocket connections
     app.state.websocket_manager = WebsocketManager()
 
+    # run again the uploads interrupted by the last shutdown
+    app.state.ccat.rabbit_hole.jobs.resume()
+
     # startup message with admin, public and swagger addresses
     log.welcome()
 
     yield
 
+    # persist working memories still waiting in the cache write buffer
+    app.state.ccat.cache.flush()
+
 
 def custom_generate_unique_id(route: APIRoute):
     return f"{route.name}"
@@ -3,6 +3,8 @@ import os
 from cat.cache.cache_manager import CacheManager
 from cat.cache.in_memory_cache import InMemoryCache
 from cat.cache.file_system_cache import FileSystemCache
+from cat.cache.tiered_cache import TieredCache
+from cat.cache.sqlite_cache import SQLiteCache
 
 
 def test_cache_type():
@@ -10,6 +12,8 @@ def test_cache_type():
     chaches = [
         ("file_system", FileSystemCache),
         ("in_memory", InMemoryCache),
+        ("tiered", TieredCache),
+        ("sqlite", SQLiteCache),
     ]
 
     for cache_type, cache_class in chaches:
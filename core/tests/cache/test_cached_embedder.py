@@ -0,0 +1,88 @@
+import asyncio
+
+from langchain_community.embeddings import FakeEmbeddings
+
+from cat.cache.cached_embedder import CachedEmbedder
+from cat.factory.custom_embedder import DumbEmbedder, unwrap_embedder
+from cat.factory.embedder import EmbedderFakeConfig
+
+
+DB_PATH = "/tmp_test/embeddings.sqlite"
+
+
+def test_cached_embedder_is_transparent(client):
+
+    embedder = CachedEmbedder(DumbEmbedder(), DB_PATH)
+
+    assert isinstance(unwrap_embedder(embedder), DumbEmbedder)
+    assert embedder.vocabulary == DumbEmbedder().vocabulary
+    assert embedder.embed_query("meow") == DumbEmbedder().embed_query("meow")
+    assert embedder.embed_documents(["meow", "purr"]) == DumbEmbedder().embed_documents(["meow", "purr"])
+
+
+def test_cached_embedder_shares_vectors_of_factory_embedders(client):
+
+    # factory embedders are wrapped by the rate limiter, fake embeddings are random
+    embedder = CachedEmbedder(EmbedderFakeConfig.get_embedder_from_config({"size": 8}), DB_PATH)
+    assert embedder.symmetric
+
+    vector = embedder.embed_documents(["meow"])[0]
+    assert embedder.embed_query("meow") == vector
+    assert embedder.get_stats()["misses"] == 1
+
+
+def test_cached_embedder_hits(client):
+
+    # fake embeddings are random, a text gets the same vector only if cached
+    embedder = CachedEmbedder(FakeEmbeddings(size=8), DB_PATH)
+
+    vectors = embedder.embed_documents(["a", "b", "a"])
+    assert vectors[0] == vectors[2]
+    assert embedder.embed_query("b") == vectors[1]
+    assert embedder.embed_documents(["b", "c"])[0] == vectors[1]
+
+    stats = embedder.get_stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 3
+    assert stats["hit_ratio"] == 0.5
+
+    # async calls share the cache
+    assert asyncio.run(embedder.aembed_query("b")) == vectors[1]
+    assert asyncio.run(embedder.aembed_documents(["a", "d"]))[0] == vectors[0]
+    assert embedder.get_stats()["hits"] == 5
+
+    # vectors are persisted
+    embedder = CachedEmbedder(FakeEmbeddings(size=8), DB_PATH)
+    assert embedder.embed_query("a") == vectors[0]
+    assert embedder.get_stats()["hits"] == 1
+
+
+def test_cached_embedder_invalidation(client):
+
+    embedder = CachedEmbedder(FakeEmbeddings(size=8), DB_PATH)
+    vector = embedder.embed_query("a")
+
+    # a different embedder does not see, and drops, previous vectors
+    other_embedder = CachedEmbedder(FakeEmbeddings(size=4), DB_PATH)
+    assert other_embedder.fingerprint != embedder.fingerprint
+    assert len(other_embedder.embed_query("a")) == 4
+    assert other_embedder.cache.scan(f"{embedder.fingerprint}:") == []
+
+    embedder = CachedEmbedder(FakeEmbeddings(size=8), DB_PATH)
+    assert embedder.embed_query("a") != vector
+
+
+def test_cached_embedder_max_stored_items(client):
+
+    embedder = CachedEmbedder(FakeEmbeddings(size=8), DB_PATH, max_items=1, max_stored_items=2)
+    vectors = embedder.embed_documents(["a", "b", "c"])
+    assert len(embedder.store.scan(f"{embedder.fingerprint}:")) == 3
+
+    # the oldest vectors are deleted from the store, the embedder fingerprint is kept
+    assert embedder.evict_expired() == 1
+    assert len(embedder.store.scan(f"{embedder.fingerprint}:")) == 2
+    assert embedder.store.get_value(CachedEmbedder.FINGERPRINT_KEY) == embedder.fingerprint
+
+    embedder = CachedEmbedder(FakeEmbeddings(size=8), DB_PATH)
+    assert embedder.embed_documents(["b", "c"]) == vectors[1:]
+    assert embedder.embed_query("a") != vectors[0]
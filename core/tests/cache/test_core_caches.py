@@ -1,9 +1,13 @@
 import os
+import time
 import pytest
 
 from cat.cache.cache_item import CacheItem
 from cat.cache.in_memory_cache import InMemoryCache
 from cat.cache.file_system_cache import FileSystemCache
+from cat.cache.write_behind_cache import WriteBehindCache
+from cat.cache.tiered_cache import TieredCache
+from cat.cache.sqlite_cache import SQLiteCache
 
 
 # utility to create cache instances
@@ -12,6 +16,8 @@ def create_cache(cache_type):
         return InMemoryCache()
     elif cache_type == "file_system":
         return FileSystemCache("/tmp_cache")
+    elif cache_type == "sqlite":
+        return SQLiteCache("/tmp_cache_sqlite/cache.sqlite")
     else:
         assert False
 
@@ -30,7 +36,7 @@ def test_cache_creation(cache_type):
         assert os.listdir("/tmp_cache") == []
 
 
-@pytest.mark.parametrize("cache_type", ["in_memory", "file_system"])
+@pytest.mark.parametrize("cache_type", ["in_memory", "file_system", "sqlite"])
 def test_cache_get_insert(cache_type):
 
     cache = create_cache(cache_type)
@@ -57,7 +63,7 @@ def test_cache_get_insert(cache_type):
     assert cache.get_value("b") == {}
 
 
-@pytest.mark.parametrize("cache_type", ["in_memory", "file_system"])
+@pytest.mark.parametrize("cache_type", ["in_memory", "file_system", "sqlite"])
 def test_cache_delete(cache_type):
 
     cache = create_cache(cache_type)
@@ -69,6 +75,37 @@ def test_cache_delete(cache_type):
     assert cache.get_item("a") is None
 
 
+@pytest.mark.parametrize("cache_type", ["in_memory", "file_system", "sqlite"])
+def test_cache_bulk_and_prefix_operations(cache_type):
+
+    cache = create_cache(cache_type)
+    cache.delete_prefix("bulk:")
+
+    cache.set_many([
+        CacheItem("bulk:user_1:a", 1),
+        CacheItem("bulk:user_1:b", 2),
+        CacheItem("bulk:user_2:a", 3),
+        CacheItem("bulk:user_1:expired", 4, ttl=0.01),
+    ])
+    time.sleep(0.02)
+
+    items = cache.get_many(["bulk:user_1:a", "bulk:user_2:a", "bulk:missing", "bulk:user_1:expired"])
+    assert {key: item.value for key, item in items.items()} == {
+        "bulk:user_1:a": 1,
+        "bulk:user_2:a": 3,
+    }
+
+    assert sorted(cache.scan("bulk:user_1:")) == ["bulk:user_1:a", "bulk:user_1:b"]
+    assert sorted(cache.scan("bulk:")) == ["bulk:user_1:a", "bulk:user_1:b", "bulk:user_2:a"]
+
+    cache.delete_prefix("bulk:user_1:")
+    assert cache.scan("bulk:user_1:") == []
+    assert cache.get_value("bulk:user_2:a") == 3
+
+    cache.delete_prefix("bulk:")
+    assert cache.scan("bulk:") == []
+
+
 # only in_memory cache
 def test_cache_max_items():
 
@@ -78,10 +115,331 @@ def test_cache_max_items():
         cache.insert(CacheItem(str(i), i))
         assert len(cache.items) <= cache.max_items
 
-    assert len(cache.items) == cache.max_items // 10 * 9 + 2
+    # least recently used items are evicted one by one
+    assert len(cache.items) == cache.max_items
     cached_values = [c.value for c in cache.items.values()]
-    assert cached_values == list(range(10, cache.max_items + 2))
+    assert cached_values == list(range(2, cache.max_items + 2))
+    assert cache.evictions == 2
+
+
+# only in_memory cache
+def test_cache_lru_eviction():
+
+    cache = InMemoryCache(max_items=3)
+
+    for k in ["a", "b", "c"]:
+        cache.insert(CacheItem(k, k))
+
+    # "a" is the oldest, but it was just accessed
+    assert cache.get_value("a") == "a"
+    cache.insert(CacheItem("d", "d"))
+
+    assert cache.get_item("b") is None
+    assert list(cache.items.keys()) == ["c", "a", "d"]
+
+
+# only in_memory cache
+def test_cache_max_bytes():
+
+    cache = InMemoryCache(max_bytes=1000)
+
+    for i in range(10):
+        cache.insert(CacheItem(str(i), "x" * 300))
+        assert cache.total_bytes <= cache.max_bytes
+
+    assert len(cache.items) == 3
+    assert list(cache.items.keys()) == ["7", "8", "9"]
+
+    cache.delete("9")
+    assert cache.total_bytes == sum(cache.sizes.values())
+
+
+# only in_memory cache
+def test_cache_ttl_expiration():
+
+    cache = InMemoryCache()
+
+    cache.insert(CacheItem("a", 0, ttl=0.1))
+    cache.insert(CacheItem("b", 1, ttl=-1))
+    assert len(cache.expirations) == 1
+
+    time.sleep(0.2)
+    cache.insert(CacheItem("c", 2))
+
+    # expired item is swept on insert
+    assert "a" not in cache.items
+    assert cache.expirations == []
+    assert cache.get_value("b") == 1
+
+
+# only in_memory cache
+def test_cache_ttl_entries_are_compacted():
+
+    cache = InMemoryCache(max_items=10)
+
+    # overwriting the same keys must not grow the expiration heap
+    for i in range(1000):
+        cache.insert(CacheItem(str(i % 3), i, ttl=60))
+    assert len(cache.items) == 3
+    assert len(cache.expirations) <= 6
+
+    # entries of the items evicted by LRU are compacted too
+    for i in range(1000):
+        cache.insert(CacheItem(f"lru_{i}", i, ttl=60))
+    assert len(cache.items) == 10
+    assert len(cache.expirations) <= 20
+
+    # live items still expire
+    cache.insert(CacheItem("short", 0, ttl=0.1))
+    time.sleep(0.2)
+    cache.evict_expired()
+    assert "short" not in cache.items
+
+
+# only in_memory cache
+def test_cache_stats():
+
+    cache = InMemoryCache(max_items=1)
+
+    cache.insert(CacheItem("a", 0))
+    cache.get_item("a")
+    cache.get_item("b")
+    cache.insert(CacheItem("b", 1))
+
+    stats = cache.get_stats()
+    assert stats["items"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+# only file_system cache
+@pytest.mark.parametrize("compression", ["none", "zlib"])
+def test_file_system_cache_sharding_and_compression(compression):
+
+    cache = FileSystemCache("/tmp_cache", compression=compression)
+
+    cache.insert(CacheItem("user_working_memory", {"history": ["meow"] * 100}))
+
+    file_path = cache._get_file_path("user_working_memory")
+    assert os.path.exists(file_path)
+    assert os.path.dirname(os.path.dirname(file_path)) == "/tmp_cache"
+    # no temporary files are left behind
+    assert os.listdir(os.path.dirname(file_path)) == [os.path.basename(file_path)]
+
+    assert cache.get_value("user_working_memory") == {"history": ["meow"] * 100}
+
+    cache.delete("user_working_memory")
+    assert not os.path.exists(file_path)
+
+
+# only file_system cache
+def test_file_system_cache_evict_expired():
+
+    cache = FileSystemCache("/tmp_cache")
 
+    cache.insert(CacheItem("a", 0, ttl=0.1))
+    cache.insert(CacheItem("b", 1, ttl=-1))
+    time.sleep(0.2)
 
+    assert cache.evict_expired() == 1
+    assert not os.path.exists(cache._get_file_path("a"))
+    assert cache.get_value("b") == 1
 
+    cache.delete("b")
+
+
+# only file_system cache
+def test_file_system_cache_ignores_foreign_files(tmp_path):
+
+    cache = FileSystemCache(str(tmp_path))
+    cache.insert(CacheItem("a", 0, ttl=0.1))
+
+    # files of other programs sharing the cache directory
+    foreign_dir = tmp_path / "other_program"
+    foreign_dir.mkdir()
+    (foreign_dir / "data.cache").write_text('{"key": "b", "expires_at": 0}\n')
+    foreign_shard = tmp_path / "ab"
+    foreign_shard.mkdir()
+    (foreign_shard / f"{'0' * 40}.cache").write_text('{"expires_at": "never"}\n')
+    (foreign_shard / "notes.txt").write_text("meow")
+    time.sleep(0.2)
+
+    assert cache.scan() == []
+    assert cache.evict_expired() == 1
+    assert cache.delete_prefix("") == 0
+    assert (foreign_dir / "data.cache").exists()
+    assert (foreign_shard / f"{'0' * 40}.cache").exists()
+
+    # the shard of the evicted item is removed once empty
+    assert not os.path.exists(os.path.dirname(cache._get_file_path("a")))
+    cache.insert(CacheItem("a", 1))
+    assert cache.get_value("a") == 1
+
+
+def test_write_behind_cache():
+
+    cache = WriteBehindCache(InMemoryCache())
+
+    cache.insert(CacheItem("a", 0))
+    cache.insert(CacheItem("a", 1))
+    cache.insert(CacheItem("b", 2))
+
+    # writes are buffered, but visible
+    assert cache.cache.get_item("a") is None
+    assert cache.get_value("a") == 1
+
+    # several writes on the same key are coalesced
+    assert cache.flush() == 2
+    assert cache.pending == {}
+    assert cache.cache.get_value("a") == 1
+    assert cache.cache.get_value("b") == 2
+
+    cache.insert(CacheItem("b", 3))
+    cache.delete("b")
+    assert cache.flush() == 0
+    assert cache.get_item("b") is None
+
+    # bulk operations see both pending and written items
+    cache.set_many([CacheItem("b", 4), CacheItem("c", 5)])
+    assert sorted(cache.scan()) == ["a", "b", "c"]
+    assert {key: item.value for key, item in cache.get_many(["a", "c"]).items()} == {"a": 1, "c": 5}
+    cache.delete_prefix("")
+    assert cache.flush() == 0
+    assert cache.scan() == []
+
+
+# only write behind cache
+def test_write_behind_cache_rejected_writes():
+
+    sqlite_cache = SQLiteCache("/tmp_cache_sqlite/cache.sqlite")
+    sqlite_cache.delete_prefix("")
+    cache = WriteBehindCache(sqlite_cache)
+
+    # another process writes the item before the buffered one is flushed
+    cache.insert(CacheItem("a", 0, version=0))
+    cache.insert(CacheItem("b", 1, version=0))
+    sqlite_cache.insert(CacheItem("a", 2))
+
+    # the rejected item is not counted as written, and the stored one is read again
+    assert cache.flush() == 1
+    assert cache.rejected == 1
+    assert cache.pending == {}
+    assert cache.get_value("a") == 2
+    assert cache.get_value("b") == 1
+
+    sqlite_cache.delete_prefix("")
+
+
+def test_tiered_cache():
+
+    cache = TieredCache(InMemoryCache(max_items=1), FileSystemCache("/tmp_cache"))
+
+    cache.insert(CacheItem("a", 0))
+    cache.insert(CacheItem("b", 1))
+
+    # "a" was evicted from memory, but it is still on the file system
+    assert "a" not in cache.l1.items
+    assert cache.get_value("b") == 1
+    assert cache.get_value("a") == 0
+
+    # "a" was loaded back in memory
+    assert "a" in cache.l1.items
+    assert cache.get_value("a") == 0
+
+    stats = cache.get_stats()
+    assert stats["l1"]["hits"] == 2
+    assert stats["l1"]["misses"] == 1
+    assert stats["l2"]["hits"] == 1
+    assert stats["l2"]["misses"] == 0
+
+    cache.delete("a")
+    cache.delete("b")
+    assert cache.get_item("a") is None
+    assert cache.get_stats()["l2"]["misses"] == 1
+
+    # bulk reads warm up the memory tier too
+    cache.set_many([CacheItem("tiered:a", 0), CacheItem("tiered:b", 1)])
+    assert "tiered:a" not in cache.l1.items
+    assert {key: item.value for key, item in cache.get_many(["tiered:a", "tiered:b"]).items()} == {
+        "tiered:a": 0,
+        "tiered:b": 1,
+    }
+    assert sorted(cache.scan("tiered:")) == ["tiered:a", "tiered:b"]
+    assert cache.delete_prefix("tiered:") == 2
+    assert cache.l1.items == {}
+
+
+def test_tiered_cache_warm_up_after_restart():
+
+    cache = TieredCache(InMemoryCache(), FileSystemCache("/tmp_cache"))
+    cache.insert(CacheItem("a", 0))
+
+    # new process, same file system
+    cache = TieredCache(InMemoryCache(), FileSystemCache("/tmp_cache"))
+    assert cache.l1.items == {}
+    assert cache.get_value("a") == 0
+    assert "a" in cache.l1.items
+
+    cache.delete("a")
+
+
+# only sqlite cache
+def test_sqlite_cache_versioned_insert():
+
+    cache = SQLiteCache("/tmp_cache_sqlite/cache.sqlite")
+    cache.delete("a")
+
+    # version 0 means the item must not exist yet
+    c1 = CacheItem("a", 0, version=0)
+    assert cache.insert(c1)
+    assert c1.version == 1
+    assert not cache.insert(CacheItem("a", 1, version=0))
+
+    # two processes read the same item, the first write wins
+    c2 = cache.get_item("a")
+    c3 = cache.get_item("a")
+    assert c2.version == c3.version == 1
+
+    c2.value = 2
+    assert cache.insert(c2)
+    c3.value = 3
+    assert not cache.insert(c3)
+    assert cache.get_value("a") == 2
+    assert cache.get_item("a").version == 2
+
+    # writes without version always succeed
+    assert cache.insert(CacheItem("a", 4))
+    assert cache.get_item("a").version == 3
+
+    # an expired item not swept yet is absent
+    c4 = cache.get_item("a")
+    assert cache.insert(CacheItem("a", 5, ttl=0.1))
+    time.sleep(0.2)
+    assert cache.get_item("a") is None
+    c5 = CacheItem("a", 6, version=0)
+    assert cache.insert(c5)
+    assert c5.version == 5
+    assert cache.get_value("a") == 6
+    # writers holding an older version still fail
+    c4.value = 7
+    assert not cache.insert(c4)
+
+    cache.delete("a")
+
+
+# only sqlite cache
+def test_sqlite_cache_evict_expired():
+
+    cache = SQLiteCache("/tmp_cache_sqlite/cache.sqlite")
+
+    cache.insert(CacheItem("a", 0, ttl=0.1))
+    cache.insert(CacheItem("b", 1, ttl=-1))
+    time.sleep(0.2)
+
+    assert cache.get_item("a") is None
+    assert cache.evict_expired() == 1
+    assert cache.get_value("b") == 1
 
+    cache.delete("b")
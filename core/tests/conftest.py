@@ -17,6 +17,7 @@ from cat.auth.permissions import AuthUserInfo
 from cat.db.database import Database
 import cat.utils as utils
 from cat.memory.vector_memory import VectorMemory
+from cat.memory.vector_backends.numpy_vector_backend import NumpyVectorBackend
 from cat.mad_hatter.plugin import Plugin
 from cat.startup import cheshire_cat_api
 from tests.utils import create_mock_plugin_zip
@@ -29,9 +30,12 @@ FAKE_TIMESTAMP = 1705855981
 
 # substitute classes' methods where necessary for testing purposes
 def mock_classes(monkeypatch):
-    # Use in memory vector db
+    # Use in memory vector db (run the suite with CCAT_VECTOR_MEMORY_BACKEND=numpy to test the NumPy backend)
     def mock_connect_to_vector_memory(self, *args, **kwargs):
-        self.vector_db = QdrantClient(":memory:")
+        if os.getenv("CCAT_VECTOR_MEMORY_BACKEND") == "numpy":
+            self.vector_db = NumpyVectorBackend()
+        else:
+            self.vector_db = QdrantClient(":memory:")
 
     monkeypatch.setattr(
         VectorMemory, "connect_to_vector_memory", mock_connect_to_vector_memory
@@ -90,6 +94,8 @@ def client(monkeypatch) -> Generator[TestClient, Any, None]:
     os.environ["CCAT_DEBUG"] = "false" # do not autoreload
     # in case tests setup a file system cache, use a different file system cache dir
     os.environ["CCAT_CACHE_DIR"] = "/tmp_test"
+    # and a different folder for the ingestion jobs
+    os.environ["CCAT_RABBITHOLE_JOBS_DIR"] = "/tmp_test/ingestion_jobs"
 
     # monkeypatch classes
     mock_classes(monkeypatch)
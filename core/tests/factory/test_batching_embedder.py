@@ -0,0 +1,89 @@
+import threading
+
+from cat.factory.batching_embedder import BatchingEmbedder
+from cat.factory.custom_embedder import DumbEmbedder, unwrap_embedder
+from cat.factory.embedder import EmbedderDumbConfig
+
+
+class CountingEmbedder(DumbEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return super().embed_documents(texts)
+
+
+def test_batching_embedder_coalesces_concurrent_requests():
+
+    embedder = CountingEmbedder()
+    batching_embedder = BatchingEmbedder(embedder, max_batch_size=8, max_wait=0.2)
+    assert unwrap_embedder(batching_embedder) is embedder
+
+    texts = [f"meow {i}" for i in range(8)]
+    results = {}
+
+    def embed(text):
+        results[text] = batching_embedder.embed_query(text)
+
+    threads = [threading.Thread(target=embed, args=(text,)) for text in texts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # results are fanned out to the right requests
+    for text in texts:
+        assert results[text] == DumbEmbedder().embed_query(text)
+    assert sum(embedder.calls) == 8
+    assert len(embedder.calls) < 8
+
+
+def test_batching_embedder_batch_size():
+
+    embedder = CountingEmbedder()
+    batching_embedder = BatchingEmbedder(embedder, max_batch_size=4, max_wait=0.001)
+
+    # large requests are not queued
+    assert len(batching_embedder.embed_documents(["a", "b", "c", "d", "e"])) == 5
+    assert embedder.calls == [5]
+
+    assert batching_embedder.embed_documents(["a", "b"]) == DumbEmbedder().embed_documents(["a", "b"])
+    assert batching_embedder.embed_documents([]) == []
+    assert embedder.calls == [5, 2]
+
+
+def test_batching_embedder_batches_queries_of_factory_embedders():
+
+    # factory embedders are wrapped by the rate limiter
+    embedder = EmbedderDumbConfig.get_embedder_from_config({})
+    batching_embedder = BatchingEmbedder(embedder, max_batch_size=8, max_wait=0.2)
+    assert batching_embedder.batch_queries
+
+    calls = []
+    dumb_embedder = unwrap_embedder(embedder)
+    embed_documents = dumb_embedder.embed_documents
+
+    def counting_embed_documents(texts):
+        calls.append(len(texts))
+        return embed_documents(texts)
+
+    dumb_embedder.embed_documents = counting_embed_documents
+
+    texts = [f"meow {i}" for i in range(8)]
+    results = {}
+
+    def embed(text):
+        results[text] = batching_embedder.embed_query(text)
+
+    threads = [threading.Thread(target=embed, args=(text,)) for text in texts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for text in texts:
+        assert results[text] == DumbEmbedder().embed_query(text)
+    assert sum(calls) == 8
+    assert len(calls) < 8
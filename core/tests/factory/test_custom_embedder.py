@@ -0,0 +1,121 @@
+import re
+import json
+import string
+import asyncio
+from itertools import combinations
+
+import httpx
+from sklearn.feature_extraction.text import CountVectorizer
+
+from cat.factory.custom_embedder import DumbEmbedder, CustomOpenAIEmbeddings, CustomOllamaEmbeddings
+
+
+def test_dumb_embedder_vector_space():
+
+    # original scikit-learn implementation
+    chars = [p.lower() for p in string.printable[10:]]
+    voc = sorted(set(f"{a}{b}" for a, b in combinations(chars, 2)))
+    vectorizer = CountVectorizer(vocabulary=voc, analyzer=lambda s: re.findall("..", s), binary=True)
+
+    texts = [
+        "",
+        "a",
+        "Meow",
+        "Hello World!\n\nThe Cat\n",
+        "a\nbc\r\nde\n",
+        "àè Ünicode 😺 pairs",
+        string.printable * 3,
+    ]
+    expected = vectorizer.transform(texts).astype(float).todense().tolist()
+
+    embedder = DumbEmbedder()
+    assert embedder.embed_documents(texts) == expected
+    assert embedder.embed_query(texts[3]) == expected[3]
+    assert embedder.embed_documents([]) == []
+
+
+def test_dumb_embedder_empty_texts():
+
+    embedder = DumbEmbedder()
+    zeros = [0.0] * len(embedder.vocabulary)
+
+    assert embedder.embed_query("") == zeros
+    assert embedder.embed_documents([""]) == [zeros]
+    assert embedder.embed_documents(["", ""]) == [zeros, zeros]
+    assert embedder.embed_documents([" ", "\n", "  \t "]) == [zeros, zeros, zeros]
+
+
+# fake embedding server: the embedding of a text is [len(text)]
+def openai_handler(request):
+    input = json.loads(request.content)["input"]
+    texts = input if isinstance(input, list) else [input]
+    data = [{"index": i, "embedding": [len(t)]} for i, t in enumerate(texts)]
+    # items may come back in any order
+    return httpx.Response(200, json={"data": list(reversed(data))})
+
+
+def ollama_handler(request):
+    payload = json.loads(request.content)
+    assert payload["model"] == "meow-embed"
+    input = payload["input"]
+    texts = input if isinstance(input, list) else [input]
+    return httpx.Response(200, json={"embeddings": [[len(t)] for t in texts]})
+
+
+def mock_clients(embedder, handler, monkeypatch):
+    requests = []
+
+    def counting_handler(request):
+        requests.append(request)
+        return handler(request)
+
+    transport = httpx.MockTransport(counting_handler)
+    embedder._client = httpx.Client(transport=transport)
+    monkeypatch.setattr(
+        type(embedder), "async_client", property(lambda self: httpx.AsyncClient(transport=transport))
+    )
+    return requests
+
+
+def test_custom_openai_embeddings(monkeypatch):
+
+    embedder = CustomOpenAIEmbeddings("http://localhost:8000")
+    assert embedder.url == "http://localhost:8000/v1/embeddings"
+    requests = mock_clients(embedder, openai_handler, monkeypatch)
+
+    assert embedder.embed_query("meow") == [4]
+    assert embedder.embed_documents(["a", "bb"]) == [[1], [2]]
+    assert len(requests) == 2
+
+    # large inputs are split in batches
+    texts = ["x" * (i % 7) for i in range(embedder.BATCH_SIZE * 2 + 1)]
+    assert embedder.embed_documents(texts) == [[len(t)] for t in texts]
+    assert len(requests) == 5
+
+    assert asyncio.run(embedder.aembed_query("meow")) == [4]
+    assert asyncio.run(embedder.aembed_documents(texts)) == [[len(t)] for t in texts]
+    assert len(requests) == 9
+
+
+def test_custom_ollama_embeddings(monkeypatch):
+
+    embedder = CustomOllamaEmbeddings("http://localhost:11434", "meow-embed")
+    requests = mock_clients(embedder, ollama_handler, monkeypatch)
+
+    assert embedder.embed_query("meow") == [4]
+    assert embedder.embed_documents(["a", "bb"]) == [[1], [2]]
+    assert asyncio.run(embedder.aembed_documents(["a", "bb"])) == [[1], [2]]
+    assert len(requests) == 3
+
+
+def test_http_embeddings_clients_are_reused():
+
+    embedder = CustomOllamaEmbeddings("http://localhost:11434", "meow-embed")
+    assert embedder.client is embedder.client
+    assert embedder.client.timeout.read == 60.0
+
+    async def get_clients():
+        return embedder.async_client, embedder.async_client
+
+    first, second = asyncio.run(get_clients())
+    assert first is second
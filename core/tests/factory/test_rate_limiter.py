@@ -0,0 +1,119 @@
+import time
+import asyncio
+import pytest
+
+from cat.factory.rate_limiter import RateLimiter, RateLimitedEmbedder, get_rate_limiter
+from cat.factory.custom_embedder import DumbEmbedder, unwrap_embedder
+from cat.factory.embedder import EmbedderDumbConfig
+from cat.factory.llm import LLMDefaultConfig
+import cat.factory.rate_limiter as rate_limiter_module
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def test_rate_limiter_requests_per_second():
+
+    limiter = RateLimiter(requests_per_second=20)
+
+    start = time.monotonic()
+    for _ in range(30):
+        limiter.acquire()
+
+    # 20 requests of burst, then 10 more at 20 requests/s
+    assert time.monotonic() - start >= 0.45
+
+
+def test_rate_limiter_tokens_per_minute():
+
+    limiter = RateLimiter(tokens_per_minute=600)
+
+    start = time.monotonic()
+    limiter.acquire(600)
+    limiter.acquire(5)
+
+    # the bucket refills at 10 tokens/s
+    assert time.monotonic() - start >= 0.45
+
+
+def test_rate_limiter_retries_on_429(monkeypatch):
+
+    monkeypatch.setattr(rate_limiter_module.random, "uniform", lambda a, b: 0)
+    limiter = RateLimiter(max_retries=2)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RateLimitError()
+        return "meow"
+
+    assert limiter.call(flaky) == "meow"
+    assert len(calls) == 3
+
+    calls.clear()
+    limiter.max_retries = 1
+    with pytest.raises(RateLimitError):
+        limiter.call(flaky)
+    assert len(calls) == 2
+
+    # other errors are not retried
+    def broken():
+        calls.append(1)
+        raise ValueError()
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        limiter.call(broken)
+    assert len(calls) == 1
+
+
+def test_rate_limited_embedder_async(monkeypatch):
+
+    monkeypatch.setattr(rate_limiter_module.random, "uniform", lambda a, b: 0)
+    calls = []
+
+    class AsyncEmbedder(DumbEmbedder):
+        def embed_documents(self, texts):
+            raise AssertionError("the sync path must not be used")
+
+        async def aembed_documents(self, texts):
+            calls.append(1)
+            if len(calls) < 2:
+                raise RateLimitError()
+            return DumbEmbedder().embed_documents(texts)
+
+    embedder = RateLimitedEmbedder(AsyncEmbedder(), RateLimiter(max_retries=2))
+    assert asyncio.run(embedder.aembed_documents(["meow"])) == [DumbEmbedder().embed_query("meow")]
+    assert len(calls) == 2
+
+
+def test_rate_limiters_by_provider(monkeypatch):
+
+    monkeypatch.setattr(rate_limiter_module, "rate_limiters", {})
+    monkeypatch.setenv("CCAT_RATE_LIMIT_REQUESTS_PER_SECOND", "10")
+    monkeypatch.setenv("CCAT_RATE_LIMITS", '{"EmbedderOpenAIConfig": {"tokens_per_minute": 1000}}')
+
+    limiter = get_rate_limiter("EmbedderOpenAIConfig")
+    assert limiter is get_rate_limiter("EmbedderOpenAIConfig")
+    assert limiter.requests_per_second == 10
+    assert limiter.tokens_per_minute == 1000
+
+    limiter = get_rate_limiter("EmbedderCohereConfig")
+    assert limiter.requests_per_second == 10
+    assert limiter.tokens_per_minute is None
+
+
+def test_factories_are_rate_limited():
+
+    embedder = EmbedderDumbConfig.get_embedder_from_config({})
+    assert type(embedder) is RateLimitedEmbedder
+    assert isinstance(unwrap_embedder(embedder), DumbEmbedder)
+    assert embedder.embed_query("meow") == DumbEmbedder().embed_query("meow")
+
+    llm = LLMDefaultConfig.get_llm_from_config({})
+    assert any(
+        isinstance(handler, rate_limiter_module.RateLimitCallbackHandler)
+        for handler in llm.callbacks
+    )
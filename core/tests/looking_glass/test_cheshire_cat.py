@@ -9,7 +9,7 @@ from cat.mad_hatter.mad_hatter import MadHatter
 from cat.rabbit_hole import RabbitHole
 from cat.memory.long_term_memory import LongTermMemory
 from cat.agents.main_agent import MainAgent
-from cat.factory.custom_embedder import DumbEmbedder
+from cat.factory.custom_embedder import DumbEmbedder, unwrap_embedder
 from cat.factory.custom_llm import LLMDefault
 
 
@@ -49,7 +49,7 @@ def test_default_llm_loaded(cheshire_cat):
 
 
 def test_default_embedder_loaded(cheshire_cat):
-    assert isinstance(cheshire_cat.embedder, DumbEmbedder)
+    assert isinstance(unwrap_embedder(cheshire_cat.embedder), DumbEmbedder)
 
     sentence = "I'm smarter than a random embedder BTW"
     sample_embed = DumbEmbedder().embed_query(sentence)
@@ -82,3 +82,19 @@ def test_procedures_embedded(cheshire_cat):
         expected_embed = cheshire_cat.embedder.embed_query(content)
         assert len(p.vector) == len(expected_embed)  # same embed
         # assert p.vector == expected_embed TODO: Qdrant does unwanted normalization
+
+
+def test_procedures_iterated_without_vectors(cheshire_cat):
+    # pages smaller than the number of points
+    procedures = list(
+        cheshire_cat.memory.vectors.procedural.iter_all_points(page_size=2)
+    )
+    assert len(procedures) == 3
+    assert len(set(p.id for p in procedures)) == 3
+    for p in procedures:
+        assert p.vector is None
+
+    # embedding procedures again does not duplicate them
+    cheshire_cat.embed_procedures()
+    procedures, _ = cheshire_cat.memory.vectors.procedural.get_all_points()
+    assert len(procedures) == 3
@@ -3,8 +3,11 @@ import pytest
 from cat.auth.permissions import AuthUserInfo
 from cat.looking_glass.stray_cat import StrayCat
 from cat.memory.working_memory import WorkingMemory
-from cat.convo.messages import MessageWhy, CatMessage
+from cat.cache.cache_item import CacheItem
+from cat.cache.sqlite_cache import SQLiteCache
+from cat.convo.messages import MessageWhy, CatMessage, UserMessage
 from cat.mad_hatter.decorators.hook import CatHook
+from cat.memory.vector_memory_collection import VectorMemoryCollection
 
 @pytest.fixture(scope="function")
 def stray_cat(client):
@@ -21,6 +24,72 @@ def test_stray_initialization(stray_cat):
     assert isinstance(stray_cat.working_memory, WorkingMemory)
 
 
+def test_stray_update_working_memory_cache_only_if_changed(stray_cat):
+    cache_key = f"{stray_cat.user_id}_working_memory"
+
+    # unchanged working memory is not written back
+    stray_cat.update_working_memory_cache()
+    assert stray_cat.cache.get_item(cache_key) is None
+
+    stray_cat.working_memory.recall_query = "meow"
+    stray_cat.update_working_memory_cache()
+    assert stray_cat.cache.get_value(cache_key).recall_query == "meow"
+
+
+def test_stray_update_working_memory_cache_conflict(client, stray_cat):
+    cache_key = f"{stray_cat.user_id}_working_memory"
+
+    # versioned cache
+    client.app.state.ccat.cache = SQLiteCache("/tmp_test/cache.sqlite")
+    stray_cat.load_working_memory_from_cache()
+    stray_cat.working_memory.recall_query = "meow"
+    stray_cat.update_working_memory_cache()
+
+    # another process changes the working memory meanwhile
+    stray_cat.cache.insert(
+        CacheItem(cache_key, WorkingMemory(recall_query="purr"), -1)
+    )
+
+    stray_cat.working_memory.recall_query = "hiss"
+    stray_cat.working_memory.update_history(UserMessage(user_id="Alice", text="hiss"))
+    stray_cat.update_working_memory_cache()
+
+    # the write is retried on the changed working memory, keeping the session turn
+    cached = stray_cat.cache.get_item(cache_key)
+    assert cached.version == 3
+    assert cached.value.recall_query == "hiss"
+    assert [m.text for m in cached.value.history] == ["hiss"]
+
+
+def test_stray_update_working_memory_cache_concurrent_turns(client):
+    cache_key = "Alice_working_memory"
+    client.app.state.ccat.cache = SQLiteCache("/tmp_test/cache.sqlite")
+    client.app.state.ccat.cache.insert(
+        CacheItem(cache_key, WorkingMemory(history=[UserMessage(user_id="Alice", text="meow")]), -1)
+    )
+
+    # two sessions of the same user load the working memory at the same time
+    user_data = AuthUserInfo(id="Alice", name="Alice")
+    first, second = StrayCat(user_data), StrayCat(user_data)
+
+    for stray_cat, text in ((first, "purr"), (second, "hiss")):
+        stray_cat.working_memory.update_history(UserMessage(user_id="Alice", text=text))
+        stray_cat.working_memory.update_history(CatMessage(user_id="Alice", text=f"{text} back"))
+
+    first.update_working_memory_cache()
+    second.update_working_memory_cache()
+
+    # neither turn is lost
+    history = stray_cat.cache.get_value(cache_key).history
+    assert [m.text for m in history] == ["meow", "purr", "purr back", "hiss", "hiss back"]
+    assert second.working_memory.history == history
+
+    # the merged session keeps saving its next turns
+    second.working_memory.update_history(UserMessage(user_id="Alice", text="meow again"))
+    second.update_working_memory_cache()
+    assert stray_cat.cache.get_value(cache_key).history[-1].text == "meow again"
+
+
 def test_stray_nlp(stray_cat):
     res = stray_cat.llm("hey")
     assert "You did not configure" in res
@@ -84,6 +153,55 @@ def test_recall_to_working_memory(stray_cat):
     assert stray_cat.working_memory.recall_query == msg_text
     assert len(stray_cat.working_memory.episodic_memories) == 1
     assert stray_cat.working_memory.episodic_memories[0][0].page_content == msg_text
+    # vectors are not recalled in conversation
+    assert stray_cat.working_memory.episodic_memories[0][2] is None
+
+
+def test_recall_with_vectors_and_payload_keys(stray_cat):
+    content = "Where do I go?"
+    embedding = stray_cat.embedder.embed_query(content)
+    declarative = stray_cat.memory.vectors.declarative
+    declarative.add_point(content, embedding, {"source": "test", "when": 1.0, "title": "meow"})
+
+    # full memories
+    memories = declarative.recall_memories_from_embedding(embedding)
+    doc, score, vector, id = memories[0]
+    assert len(vector) == len(embedding)
+    assert doc.metadata == {"source": "test", "when": 1.0, "title": "meow"}
+
+    # lean memories
+    memories = declarative.recall_memories_from_embedding(
+        embedding, with_vectors=False, payload_keys=["source"]
+    )
+    doc, score, vector, id = memories[0]
+    assert vector is None
+    assert doc.page_content == content
+    assert doc.metadata == {"source": "test"}
+
+
+def test_recall_plugin_collections_concurrently(stray_cat, monkeypatch):
+    # searches are concurrent with a remote vector db
+    monkeypatch.setattr(VectorMemoryCollection, "db_is_remote", lambda self: True)
+
+    # collection added by a plugin
+    vectors = stray_cat.memory.vectors
+    collection = VectorMemoryCollection(
+        client=vectors.vector_db,
+        collection_name="custom",
+        embedder_name=vectors.declarative.embedder_name,
+        embedder_size=vectors.declarative.embedder_size,
+    )
+    vectors.collections["custom"] = collection
+    content = "The cat is in the custom collection"
+    collection.add_point(content, stray_cat.embedder.embed_query(content), {"source": "test"})
+
+    stray_cat.recall_relevant_memories_to_working_memory(content)
+
+    assert stray_cat.working_memory.custom_memories[0][0].page_content == content
+    assert stray_cat.working_memory.declarative_memories == []
+    assert len(stray_cat.working_memory.procedural_memories) == 0
+
+    del vectors.collections["custom"]
 
 
 # TODO: should we gather all tests regarding hooks in a folder?
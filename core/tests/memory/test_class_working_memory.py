@@ -88,4 +88,26 @@ def test_working_memory_as_dictionary_object():
     assert wm["b"] == "b"
     # assert wm.c is None # too dangerous
 
+
+def test_working_memory_version():
+
+    wm = WorkingMemory()
+    assert wm.version == 0
+
+    # reading does not change the version
+    wm.history
+    assert wm.version == 0
+
+    wm.recall_query = "meow"
+    assert wm.version == 1
+
+    wm.update_history(UserMessage(user_id="123", who="Human", text="Hi"))
+    assert wm.version == 2
+
+    # in place changes must be flagged explicitly
+    wm.history.append(UserMessage(user_id="123", who="Human", text="Hi again"))
+    assert wm.version == 2
+    wm.mark_dirty()
+    assert wm.version == 3
+
 # TODOV2: add tests for multimodal messages!
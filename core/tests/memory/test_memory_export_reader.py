@@ -0,0 +1,68 @@
+import io
+import gzip
+import json
+import pytest
+
+from cat.memory.memory_export_reader import MemoryExportReader
+
+
+def get_points(n):
+    return [
+        {
+            "page_content": f"memory è {i}",
+            "metadata": {"source": "user", "when": 1.5 + i},
+            "id": f"id_{i}",
+            "vector": [0.1 * i, -12345.678, 1e-7],
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_read_json_export(chunk_size):
+
+    points = get_points(20)
+    export = {
+        "embedder": "DumbEmbedder",
+        "collections": {"episodic": get_points(3), "declarative": points, "procedural": []},
+        "other": {"nested": [1, 2, {"a": "]"}]},
+    }
+    file = io.BytesIO(json.dumps(export, indent=2).encode())
+
+    reader = MemoryExportReader(file, chunk_size=chunk_size)
+    assert list(reader) == points
+    assert reader.embedder == "DumbEmbedder"
+
+
+def test_read_ndjson_export():
+
+    points = get_points(5)
+    lines = [{"embedder": "DumbEmbedder"}] + [
+        # format of the streaming export
+        {
+            "id": p["id"],
+            "payload": {"page_content": p["page_content"], "metadata": p["metadata"]},
+            "vector": p["vector"],
+        }
+        for p in points
+    ]
+    content = "\n".join(json.dumps(line) for line in lines).encode()
+
+    reader = MemoryExportReader.from_file_name(io.BytesIO(gzip.compress(content)), "memories.ndjson.gz")
+    assert list(reader) == points
+    assert reader.embedder == "DumbEmbedder"
+
+
+def test_read_invalid_export():
+
+    # the embedder must be known before reading memories
+    file = io.BytesIO(json.dumps({"collections": {"declarative": get_points(1)}}).encode())
+    with pytest.raises(ValueError):
+        list(MemoryExportReader(file))
+
+    with pytest.raises(ValueError):
+        list(MemoryExportReader(io.BytesIO(b'["not", "a", "memory", "export"]')))
+
+    file = io.BytesIO("\n".join(json.dumps(p) for p in get_points(2)).encode())
+    with pytest.raises(ValueError, match="The embedder must be declared"):
+        list(MemoryExportReader(file, ndjson=True))
@@ -0,0 +1,193 @@
+import uuid
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PointStruct
+
+from cat.memory.vector_memory_collection import VectorMemoryCollection
+from cat.memory.vector_backends.numpy_vector_backend import NumpyVectorBackend, NumpyCollection
+
+
+def get_points(n, vector_size=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        PointStruct(
+            id=uuid.UUID(int=i + 1).hex,
+            vector=rng.standard_normal(vector_size).tolist(),
+            payload={
+                "page_content": f"memory {i}",
+                "metadata": {"source": f"user_{i % 3}", "tags": ["cat", f"tag_{i % 2}"], "page": {"n": i}},
+            },
+        )
+        for i in range(n)
+    ]
+
+
+def test_numpy_backend_search():
+
+    backend = NumpyVectorBackend()
+    backend.create_collection("test", 8)
+    points = get_points(30)
+    assert backend.upsert("test", points)
+    assert backend.count_points("test") == 30
+
+    # exact cosine similarity
+    query = points[0].vector
+    results = backend.search("test", query, k=5)
+    assert results[0].id == str(uuid.UUID(points[0].id))
+    assert abs(results[0].score - 1) < 1e-6
+    assert [r.score for r in results] == sorted([r.score for r in results], reverse=True)
+    assert np.allclose(results[0].vector, np.asarray(query) / np.linalg.norm(query), atol=1e-6)
+
+    # filters on indexed values, list elements and nested keys
+    results = backend.search("test", query, filter={"source": "user_1"}, k=100)
+    assert {r.payload["metadata"]["source"] for r in results} == {"user_1"}
+    assert len(results) == 10
+    results = backend.search("test", query, filter={"source": "user_1", "tags": ["tag_0"]}, k=100)
+    assert {r.payload["metadata"]["page"]["n"] for r in results} == {4, 10, 16, 22, 28}
+    results = backend.search("test", query, filter={"page": {"n": 7}}, k=100)
+    assert [r.payload["page_content"] for r in results] == ["memory 7"]
+    assert backend.search("test", query, filter={"source": "nobody"}) == []
+
+    # threshold and projection
+    results = backend.search("test", query, k=100, threshold=0.5, with_vectors=False,
+                             with_payload=["page_content", "metadata.source"])
+    assert all(r.score >= 0.5 for r in results)
+    assert results[0].vector is None
+    assert results[0].payload == {"page_content": "memory 0", "metadata": {"source": "user_0"}}
+
+
+def test_numpy_backend_write_delete_scroll():
+
+    backend = NumpyVectorBackend()
+    backend.create_collection("test", 8)
+    points = get_points(10)
+    backend.upsert("test", points)
+
+    # ids are returned in canonical form, and can be retrieved in any form
+    records = backend.retrieve("test", [points[1].id, str(uuid.UUID(points[2].id)), uuid.uuid4().hex])
+    assert [r.id for r in records] == [str(uuid.UUID(p.id)) for p in points[1:3]]
+
+    # upsert replaces points (and their metadata index)
+    replaced = points[1].model_copy(update={"payload": {"page_content": "new", "metadata": {"source": "new"}}})
+    backend.upsert("test", [replaced])
+    assert backend.count_points("test") == 10
+    assert backend.search("test", points[1].vector, filter={"source": "user_1"}, k=100)[0].id != records[0].id
+    assert backend.search("test", points[1].vector, filter={"source": "new"})[0].id == records[0].id
+
+    assert backend.delete_points("test", [points[0].id]) == 1
+    assert backend.delete_points_by_filter("test", {"source": "user_2"}) == 3
+    assert backend.count_points("test") == 6
+
+    # deleted rows are reused
+    backend.upsert("test", [PointStruct(id=uuid.uuid4().hex, vector=[1.0] * 8, payload={})])
+    assert backend.collections["test"].size == 10
+
+    # pages cover all the points once
+    ids, offset = [], None
+    while True:
+        page, offset = backend.scroll("test", limit=3, offset=offset, with_vectors=False)
+        ids.extend(r.id for r in page)
+        if offset is None:
+            break
+    assert len(ids) == len(set(ids)) == 7
+
+    # also when filtered
+    sources, offset = [], None
+    while True:
+        page, offset = backend.scroll("test", limit=1, offset=offset, filter={"source": "user_1"})
+        sources.extend(r.payload["metadata"]["source"] for r in page)
+        if offset is None:
+            break
+    assert sources == ["user_1"] * 2
+
+
+def test_numpy_backend_scroll_from_deleted_offset():
+
+    backend = NumpyVectorBackend()
+    backend.create_collection("test", 8)
+    points = get_points(10)
+    backend.upsert("test", points)
+    ids = [str(uuid.UUID(p.id)) for p in points]
+
+    # points are scrolled by id
+    page, offset = backend.scroll("test", limit=4, with_vectors=False)
+    assert [r.id for r in page] == ids[:4]
+    assert offset == ids[4]
+
+    # the point the next page starts from is deleted, and its row reused by a point with a later id
+    backend.delete_points("test", [ids[4], ids[5]])
+    new_id = str(uuid.UUID(int=100))
+    backend.upsert("test", [PointStruct(id=new_id, vector=[1.0] * 8, payload={})])
+
+    # the page starts from the next point
+    page, offset = backend.scroll("test", limit=4, offset=offset, with_vectors=False)
+    assert [r.id for r in page] == ids[6:10]
+    assert offset == new_id
+    page, offset = backend.scroll("test", limit=4, offset=offset, with_vectors=False)
+    assert [r.id for r in page] == [new_id]
+    assert offset is None
+
+    # also when filtered (user_1 points are 1, 4 and 7)
+    page, offset = backend.scroll("test", limit=1, offset=ids[4], filter={"source": "user_1"})
+    assert [r.id for r in page] == [ids[7]]
+    assert offset is None
+
+    # integer ids come before UUIDs
+    backend.upsert("test", [PointStruct(id=5, vector=[1.0] * 8, payload={})])
+    page, _ = backend.scroll("test", limit=2, with_vectors=False)
+    assert [r.id for r in page] == [5, ids[0]]
+
+
+def test_numpy_backend_persistence(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(NumpyCollection, "INITIAL_CAPACITY", 4)
+    backend = NumpyVectorBackend(str(tmp_path))
+    backend.create_collection("test", 8)
+    backend.create_alias("test", "embedder_test")
+    points = get_points(20)
+    backend.upsert("test", points)
+    backend.delete_points("test", [points[3].id])
+
+    # reload from disk
+    backend = NumpyVectorBackend(str(tmp_path))
+    assert backend.get_collection_names() == ["test"]
+    assert backend.get_aliases("test") == ["embedder_test"]
+    assert backend.get_vector_size("test") == 8
+    assert backend.count_points("test") == 19
+    results = backend.search("test", points[10].vector, k=1)
+    assert results[0].payload["page_content"] == "memory 10"
+
+    assert backend.delete_collection("test")
+    assert NumpyVectorBackend(str(tmp_path)).get_collection_names() == []
+
+
+def test_numpy_backend_same_results_as_qdrant():
+
+    collections = [
+        VectorMemoryCollection(
+            client=client,
+            collection_name="declarative",
+            embedder_name="test_embedder",
+            embedder_size=8,
+        )
+        for client in [QdrantClient(":memory:"), NumpyVectorBackend()]
+    ]
+
+    points = get_points(50)
+    for collection in collections:
+        collection.add_points(
+            [p.payload["page_content"] for p in points],
+            [p.vector for p in points],
+            metadatas=[p.payload["metadata"] for p in points],
+            ids=[p.id for p in points],
+        )
+
+    for query in get_points(5, seed=1):
+        qdrant_results, numpy_results = [
+            c.recall_memories_from_embedding(query.vector, metadata={"source": "user_2"}, k=4)
+            for c in collections
+        ]
+        # ids are canonical UUIDs, as with the Qdrant server (the local Qdrant keeps them as given)
+        assert [m[3] for m in numpy_results] == [str(uuid.UUID(m[3])) for m in qdrant_results]
+        assert np.allclose([m[1] for m in numpy_results], [m[1] for m in qdrant_results], atol=1e-5)
+        assert [m[0].metadata for m in numpy_results] == [m[0].metadata for m in qdrant_results]
@@ -0,0 +1,165 @@
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PayloadSchemaType, PayloadIndexInfo
+
+from cat.memory.vector_memory_collection import VectorMemoryCollection
+from cat.memory.vector_backends.qdrant_vector_backend import QdrantVectorBackend
+
+
+def create_collection(client, monkeypatch):
+    # payload indexes are only created on a remote Qdrant
+    monkeypatch.setattr(QdrantVectorBackend, "is_remote", lambda self: True)
+
+    created_indexes = {}
+
+    def create_payload_index(collection_name, field_name, field_schema):
+        created_indexes[field_name] = field_schema
+
+    monkeypatch.setattr(client, "create_payload_index", create_payload_index)
+
+    VectorMemoryCollection(
+        client=client,
+        collection_name="test",
+        embedder_name="test_embedder",
+        embedder_size=8,
+    )
+    return created_indexes
+
+
+def test_payload_indexes(monkeypatch):
+
+    created_indexes = create_collection(QdrantClient(":memory:"), monkeypatch)
+
+    assert created_indexes == {
+        "metadata.source": PayloadSchemaType.KEYWORD,
+        "metadata.when": PayloadSchemaType.FLOAT,
+    }
+
+
+def test_extra_payload_indexes(monkeypatch):
+
+    monkeypatch.setenv("CCAT_QDRANT_PAYLOAD_INDEXES", "title, page:integer")
+    client = QdrantClient(":memory:")
+    created_indexes = create_collection(client, monkeypatch)
+
+    assert created_indexes["metadata.title"] == PayloadSchemaType.KEYWORD
+    assert created_indexes["metadata.page"] == PayloadSchemaType.INTEGER
+
+    # indexes are created on existing collections too
+    created_indexes = create_collection(client, monkeypatch)
+    assert len(created_indexes) == 4
+
+
+def test_tenant_partitioning(monkeypatch):
+
+    monkeypatch.setattr(QdrantVectorBackend, "is_remote", lambda self: True)
+    client = QdrantClient(":memory:")
+    VectorMemoryCollection(
+        client=client,
+        collection_name="episodic",
+        embedder_name="test_embedder",
+        embedder_size=8,
+    )
+
+    # an existing collection with a plain source index and a global HNSW graph
+    collection_info = client.get_collection("episodic")
+    collection_info.payload_schema = {
+        "metadata.source": PayloadIndexInfo(data_type=PayloadSchemaType.KEYWORD, points=0),
+        "metadata.when": PayloadIndexInfo(data_type=PayloadSchemaType.FLOAT, points=0),
+    }
+    monkeypatch.setattr(client, "get_collection", lambda collection_name: collection_info)
+
+    calls = []
+    for method in ["update_collection", "delete_payload_index", "create_payload_index"]:
+        monkeypatch.setattr(
+            client, method, lambda method=method, **kwargs: calls.append((method, kwargs))
+        )
+
+    # is migrated in place
+    VectorMemoryCollection(
+        client=client,
+        collection_name="episodic",
+        embedder_name="test_embedder",
+        embedder_size=8,
+        tenant_field="metadata.source",
+    )
+
+    assert [method for method, _ in calls] == [
+        "update_collection",
+        "delete_payload_index",
+        "create_payload_index",
+    ]
+    hnsw_config = calls[0][1]["hnsw_config"]
+    assert hnsw_config.m == 0
+    assert hnsw_config.payload_m == 16
+    assert calls[2][1]["field_name"] == "metadata.source"
+    assert calls[2][1]["field_schema"].is_tenant
+
+    # nothing to do once migrated
+    collection_info.config.hnsw_config = collection_info.config.hnsw_config.model_copy(
+        update={"m": 0, "payload_m": 16}
+    )
+    collection_info.payload_schema["metadata.source"] = PayloadIndexInfo(
+        data_type=PayloadSchemaType.KEYWORD, params=calls[2][1]["field_schema"], points=0
+    )
+    calls.clear()
+    VectorMemoryCollection(
+        client=client,
+        collection_name="episodic",
+        embedder_name="test_embedder",
+        embedder_size=8,
+        tenant_field="metadata.source",
+    )
+    assert calls == []
+
+
+def test_recall_cache(monkeypatch):
+
+    monkeypatch.setenv("CCAT_RECALL_CACHE_MAX_ITEMS", "1000")
+    client = QdrantClient(":memory:")
+    collection = VectorMemoryCollection(
+        client=client,
+        collection_name="declarative",
+        embedder_name="test_embedder",
+        embedder_size=8,
+    )
+    collection.add_point("meow", [1.0] * 8, {"source": "test"})
+
+    searches = []
+    search = client.search
+    monkeypatch.setattr(
+        client, "search", lambda **kwargs: searches.append(kwargs) or search(**kwargs)
+    )
+
+    # repeated searches hit the cache
+    memories = collection.recall_memories_from_embedding([1.0] * 8, k=3)
+    assert collection.recall_memories_from_embedding([1.0] * 8, k=3) == memories
+    assert len(searches) == 1
+
+    # other searches do not
+    collection.recall_memories_from_embedding([1.0] * 8, k=4)
+    collection.recall_memories_from_embedding([1.0] * 8, k=3, metadata={"source": "test"})
+    collection.recall_memories_from_embedding([1.0] * 7 + [0.5], k=3)
+    assert len(searches) == 4
+
+    # writes invalidate the cache
+    point = collection.add_point("purr", [1.0] * 8, {"source": "test"})
+    assert len(collection.recall_memories_from_embedding([1.0] * 8, k=3)) == 2
+    assert len(searches) == 5
+
+    collection.delete_points([point.id])
+    assert len(collection.recall_memories_from_embedding([1.0] * 8, k=3)) == 1
+    collection.delete_points_by_metadata_filter({"source": "test"})
+    assert collection.recall_memories_from_embedding([1.0] * 8, k=3) == []
+    assert len(searches) == 7
+
+
+def test_recall_cache_disabled_by_default():
+
+    collection = VectorMemoryCollection(
+        client=QdrantClient(":memory:"),
+        collection_name="declarative",
+        embedder_name="test_embedder",
+        embedder_size=8,
+    )
+    assert collection.recall_cache is None
+    assert collection.recall_memories_from_embedding([1.0] * 8) == []
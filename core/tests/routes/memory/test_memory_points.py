@@ -1,5 +1,12 @@
+import gzip
+import json
 import pytest
-from tests.utils import send_websocket_message, get_declarative_memory_contents
+from tests.utils import (
+    send_websocket_message,
+    get_declarative_memory_contents,
+    get_collections_names_and_point_count,
+    wait_for_ingestion_jobs,
+)
 from tests.conftest import FAKE_TIMESTAMP
 
 def test_point_deleted(client):
@@ -58,7 +65,8 @@ def test_points_deleted_by_metadata(client):
         response = client.post("/rabbithole/", files=files)
     # check response
     assert response.status_code == 200
-    # check memory contents
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == expected_chunks
 
@@ -69,7 +77,8 @@ def test_points_deleted_by_metadata(client):
         response = client.post("/rabbithole/", files=files)
     # check response
     assert response.status_code == 200
-    # check memory contents
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == expected_chunks * 2
 
@@ -369,4 +378,73 @@ def test_edit_memory_point(client, patch_time_now, collection):
     assert len(json["vectors"]["collections"][collection]) == 1
     memory = json["vectors"]["collections"][collection][0]
     assert memory["page_content"] == content
-    assert memory["metadata"] == expected_metadata
\ No newline at end of file
+    assert memory["metadata"] == expected_metadata
+
+def test_export_collection_points(client, patch_time_now):
+    # create 25 points
+    n_points = 25
+    for i in range(n_points):
+        res = client.post(
+            "/memory/collections/declarative/points", json={"content": f"MIAO {i}!"}
+        )
+        assert res.status_code == 200
+
+    # export, a small page size to stream several pages
+    res = client.get("/memory/collections/declarative/points/export?page_size=10")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    header, *points = [json.loads(line) for line in res.text.splitlines()]
+    assert header == {"embedder": "DumbEmbedder"}
+    assert len(points) == n_points
+    assert sorted(p["payload"]["page_content"] for p in points) == sorted(
+        f"MIAO {i}!" for i in range(n_points)
+    )
+    assert all(isinstance(p["vector"][0], float) for p in points)
+
+    # compressed and without vectors
+    res = client.get(
+        "/memory/collections/declarative/points/export?compress=true&with_vectors=false&page_size=10"
+    )
+    assert res.status_code == 200
+    assert res.headers["content-disposition"] == 'attachment; filename="declarative.ndjson.gz"'
+    _, *compressed_points = [json.loads(line) for line in gzip.decompress(res.content).splitlines()]
+    assert [p["id"] for p in compressed_points] == [p["id"] for p in points]
+    assert all("vector" not in p for p in compressed_points)
+
+    # resume from a point, the embedder is declared only once
+    res = client.get(
+        f"/memory/collections/declarative/points/export?offset={points[20]['id']}&page_size=10"
+    )
+    assert [json.loads(line)["id"] for line in res.text.splitlines()] == [p["id"] for p in points[20:]]
+
+
+def test_export_and_upload_collection_points(client):
+    for i in range(3):
+        res = client.post(
+            "/memory/collections/declarative/points", json={"content": f"MIAO {i}!"}
+        )
+        assert res.status_code == 200
+
+    export = client.get("/memory/collections/declarative/points/export").content
+    client.delete("/memory/collections/declarative")
+    assert get_collections_names_and_point_count(client)["declarative"] == 0
+
+    # the export declares its embedder, the upload checks it
+    files = {"file": ("declarative.ndjson", export, "application/x-ndjson")}
+    assert client.post("/rabbithole/memory/", files=files).status_code == 200
+    assert wait_for_ingestion_jobs(client)[0]["status"] == "done"
+    assert get_collections_names_and_point_count(client)["declarative"] == 3
+
+    # exports without the embedder are rejected
+    files = {"file": ("declarative.ndjson", export.split(b"\n", 1)[1], "application/x-ndjson")}
+    client.post("/rabbithole/memory/", files=files)
+    job = wait_for_ingestion_jobs(client)[0]
+    assert job["status"] == "failed"
+    assert "The embedder must be declared" in job["error"]
+
+
+def test_export_collection_points_not_allowed(client):
+    res = client.get("/memory/collections/procedural/points/export")
+    assert res.status_code == 400
+    res = client.get("/memory/collections/wrongcollection/points/export")
+    assert res.status_code == 400
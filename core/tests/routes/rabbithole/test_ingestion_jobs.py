@@ -0,0 +1,177 @@
+import os
+import time
+import threading
+from starlette.datastructures import UploadFile
+
+from cat.looking_glass.cheshire_cat import CheshireCat
+from cat.factory.custom_embedder import DumbEmbedder
+from cat.ingestion_jobs import IngestionJobManager
+from tests.utils import get_declarative_memory_contents, wait_for_ingestion_jobs
+
+
+def upload_sample(client, file_name="sample.pdf"):
+    with open("tests/mocks/sample.pdf", "rb") as f:
+        files = {"file": (file_name, f, "application/pdf")}
+        response = client.post("/rabbithole/", files=files)
+    assert response.status_code == 200
+    return response.json()["job_id"]
+
+
+def wait_for_status(client, job_id, status, timeout=10):
+    deadline = time.time() + timeout
+    while True:
+        job = client.get(f"/rabbithole/jobs/{job_id}").json()
+        if job["status"] == status:
+            return job
+        assert time.time() < deadline, f"Job is {job['status']}, not {status}"
+        time.sleep(0.05)
+
+
+def test_ingestion_job_progress(client):
+
+    job_id = upload_sample(client)
+    jobs = wait_for_ingestion_jobs(client)
+    assert [job["id"] for job in jobs] == [job_id]
+
+    response = client.get(f"/rabbithole/jobs/{job_id}")
+    assert response.status_code == 200
+    job = response.json()
+    assert job["kind"] == "file"
+    assert job["source"] == "sample.pdf"
+    assert job["status"] == "done"
+    assert job["user_id"] == "user"
+    assert job["error"] is None
+    assert job["progress"] == {
+        "chunks_parsed": 4,
+        "chunks_to_store": 4,
+        "chunks_embedded": 4,
+        "chunks_stored": 4,
+    }
+    assert len(get_declarative_memory_contents(client)) == 4
+
+    # the uploaded file is deleted once ingested
+    assert not os.path.exists(f"/tmp_test/ingestion_jobs/{job_id}")
+
+    # filter by status
+    assert client.get("/rabbithole/jobs", params={"status": "done"}).json()["jobs"] == [job]
+    assert client.get("/rabbithole/jobs", params={"status": "failed"}).json()["jobs"] == []
+    assert client.get("/rabbithole/jobs", params={"status": "meow"}).status_code == 400
+
+
+def test_ingestion_job_file_names(client, stray, tmp_path):
+
+    jobs = IngestionJobManager(CheshireCat().rabbit_hole, str(tmp_path))
+    jobs._enqueue = lambda job_id: None
+
+    # file names are only sources, they are not used as paths
+    for file_name in ["..", ".", "../sample.txt"]:
+        with open("tests/mocks/sample.txt", "rb") as f:
+            job = jobs.submit(stray, "file", file_name, file=UploadFile(file=f, filename=file_name))
+        assert job["source"] == file_name
+        assert os.listdir(tmp_path / job["id"]) == ["upload"]
+
+
+def test_ingestion_job_not_found(client):
+    assert client.get("/rabbithole/jobs/meow").status_code == 404
+    assert client.post("/rabbithole/jobs/meow/cancel").status_code == 404
+
+
+def test_ingestion_jobs_of_other_users(secure_client):
+
+    admin_headers = {"Authorization": "Bearer meow_http", "user_id": "admin"}
+    headers = {}
+    for username in ["alice", "bob"]:
+        response = secure_client.post(
+            "/users",
+            json={"username": username, "password": "meow_meow", "permissions": {"UPLOAD": ["WRITE", "READ"]}},
+            headers=admin_headers,
+        )
+        assert response.status_code == 200
+        response = secure_client.post("/auth/token", json={"username": username, "password": "meow_meow"})
+        headers[username] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    with open("tests/mocks/sample.txt", "rb") as f:
+        files = {"file": ("sample.txt", f, "text/plain")}
+        response = secure_client.post("/rabbithole/", files=files, headers=headers["alice"])
+    job_id = response.json()["job_id"]
+
+    # users only see and cancel their own jobs
+    jobs = secure_client.get("/rabbithole/jobs", headers=headers["alice"]).json()["jobs"]
+    assert [job["id"] for job in jobs] == [job_id]
+    assert jobs[0]["user_id"] == "alice"
+    assert secure_client.get("/rabbithole/jobs", headers=headers["bob"]).json()["jobs"] == []
+    assert secure_client.get(f"/rabbithole/jobs/{job_id}", headers=headers["bob"]).status_code == 404
+    assert secure_client.post(f"/rabbithole/jobs/{job_id}/cancel", headers=headers["bob"]).status_code == 404
+
+    # admins see the jobs of everybody
+    jobs = secure_client.get("/rabbithole/jobs", headers=admin_headers).json()["jobs"]
+    assert [job["id"] for job in jobs] == [job_id]
+    assert secure_client.get(f"/rabbithole/jobs/{job_id}", headers=admin_headers).status_code == 200
+
+
+def test_cancel_ingestion_jobs(client, monkeypatch):
+
+    # embedding waits until released
+    release = threading.Event()
+    embed_documents = DumbEmbedder.embed_documents
+    def blocked_embed_documents(self, texts):
+        assert release.wait(timeout=10)
+        return embed_documents(self, texts)
+    monkeypatch.setattr(DumbEmbedder, "embed_documents", blocked_embed_documents)
+
+    # the two job workers are busy, the third job waits in the queue
+    running_ids = [upload_sample(client, f"sample_{i}.pdf") for i in range(2)]
+    queued_id = upload_sample(client, "sample_2.pdf")
+    for job_id in running_ids:
+        wait_for_status(client, job_id, "running")
+    assert client.get(f"/rabbithole/jobs/{queued_id}").json()["status"] == "queued"
+
+    # a queued job is cancelled right away
+    response = client.post(f"/rabbithole/jobs/{queued_id}/cancel")
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+
+    # a running job stops after the chunks being processed
+    response = client.post(f"/rabbithole/jobs/{running_ids[0]}/cancel")
+    assert response.status_code == 200
+    release.set()
+
+    cancelled = wait_for_status(client, running_ids[0], "cancelled")
+    assert cancelled["progress"]["chunks_stored"] == 0
+    done = wait_for_status(client, running_ids[1], "done")
+    assert done["progress"]["chunks_stored"] == 4
+
+    wait_for_ingestion_jobs(client)
+    assert client.get(f"/rabbithole/jobs/{queued_id}").json()["status"] == "cancelled"
+    sources = {m["metadata"]["source"] for m in get_declarative_memory_contents(client)}
+    assert sources == {"sample_1.pdf"}
+
+
+def test_ingestion_jobs_resume_after_restart(client, stray, tmp_path):
+
+    rabbit_hole = CheshireCat().rabbit_hole
+
+    # the Cat stops while the job is running
+    jobs = IngestionJobManager(rabbit_hole, str(tmp_path))
+    jobs._enqueue = lambda job_id: None
+    with open("tests/mocks/sample.txt", "rb") as f:
+        job = jobs.submit(
+            stray, "file", "sample.txt", file=UploadFile(file=f, filename="sample.txt"),
+            options={"metadata": {"author": "Lewis Carroll"}},
+        )
+    assert jobs._claim(job["id"]) is not None
+    assert jobs.get_job(job["id"])["status"] == "running"
+
+    # and the job is run again when it restarts
+    jobs = IngestionJobManager(rabbit_hole, str(tmp_path))
+    jobs.resume()
+    deadline = time.time() + 10
+    while jobs.get_job(job["id"])["status"] != "done":
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+    assert jobs.get_job(job["id"])["user_id"] == stray.user_id
+    memories = get_declarative_memory_contents(client)
+    assert len(memories) == 3
+    assert {m["metadata"]["author"] for m in memories} == {"Lewis Carroll"}
+    assert not os.path.exists(tmp_path / job["id"])
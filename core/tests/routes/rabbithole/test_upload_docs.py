@@ -1,6 +1,10 @@
 
 import json
-from tests.utils import get_declarative_memory_contents
+from langchain_community.document_loaders.parsers.generic import MimeTypeBasedParser
+
+from cat.factory.custom_embedder import DumbEmbedder
+from cat.memory.vector_memory_collection import VectorMemoryCollection
+from tests.utils import get_declarative_memory_contents, wait_for_ingestion_jobs
 
 
 def test_rabbithole_upload_txt(client):
@@ -19,7 +23,8 @@ def test_rabbithole_upload_txt(client):
     assert json["content_type"] == content_type
     assert "File is being ingested" in json["info"]
 
-    # check memory contents
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
     # check declarative memory is empty
     declarative_memories = get_declarative_memory_contents(client)
     assert (
@@ -43,12 +48,42 @@ def test_rabbithole_upload_pdf(client):
     assert json["content_type"] == content_type
     assert "File is being ingested" in json["info"]
 
-    # check memory contents
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
     # check declarative memory is empty
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == 4
 
 
+def test_rabbithole_upload_parsed_from_disk(client, monkeypatch):
+
+    # the parser receives the uploaded file by path, its content is never loaded in memory
+    parsed_blobs = []
+    parse = MimeTypeBasedParser.parse
+    def recording_parse(self, blob):
+        parsed_blobs.append(blob)
+        return parse(self, blob)
+    monkeypatch.setattr(MimeTypeBasedParser, "parse", recording_parse)
+
+    with open("tests/mocks/sample.pdf", "rb") as f:
+        files = {"file": ("sample.pdf", f, "application/pdf")}
+        response = client.post("/rabbithole/", files=files)
+    assert response.status_code == 200
+    wait_for_ingestion_jobs(client)
+
+    assert len(parsed_blobs) == 1
+    blob = parsed_blobs[0]
+    assert blob.data is None
+    assert blob.path.startswith("/tmp_test/ingestion_jobs/")
+    assert blob.source == "sample.pdf"
+    assert blob.mimetype == "application/pdf"
+
+    # chunks keep the name of the uploaded file as source
+    declarative_memories = get_declarative_memory_contents(client)
+    assert len(declarative_memories) == 4
+    assert {m["metadata"]["source"] for m in declarative_memories} == {"sample.pdf"}
+
+
 def test_rabbithole_upload_batch_one_file(client):
     content_type = "application/pdf"
     file_name = "sample.pdf"
@@ -67,7 +102,8 @@ def test_rabbithole_upload_batch_one_file(client):
     assert json[file_name]["content_type"] == content_type
     assert "File is being ingested" in json[file_name]["info"]
 
-    # check memory contents
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
     # check declarative memory is empty
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == 4
@@ -92,12 +128,43 @@ def test_rabbithole_upload_batch_multiple_files(client):
         assert json[file_name]["content_type"] == files_to_upload[file_name]
         assert "File is being ingested" in json[file_name]["info"]
 
-    # check memory contents
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
     # check declarative memory is empty
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == 7
 
 
+def test_rabbithole_upload_in_batches(client, monkeypatch):
+    # batches smaller than the number of chunks, and than the number of points per upsert
+    monkeypatch.setenv("CCAT_EMBEDDER_BATCH_SIZE", "3")
+    monkeypatch.setenv("CCAT_QDRANT_BATCH_SIZE", "2")
+
+    content_type = "application/pdf"
+    file_name = "sample.pdf"
+    file_path = f"tests/mocks/{file_name}"
+    with open(file_path, "rb") as f:
+        files = {"file": (file_name, f, content_type)}
+
+        payload = {
+            "chunk_size": 128,
+            "chunk_overlap": 32,
+        }
+
+        response = client.post("/rabbithole/", files=files, data=payload)
+
+    # check response
+    assert response.status_code == 200
+
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
+    declarative_memories = get_declarative_memory_contents(client)
+    assert len(declarative_memories) == 7
+    for dm in declarative_memories:
+        assert dm["metadata"]["source"] == file_name
+        assert "when" in dm["metadata"]
+
+
 def test_rabbihole_chunking(client):
     content_type = "application/pdf"
     file_name = "sample.pdf"
@@ -115,7 +182,8 @@ def test_rabbihole_chunking(client):
     # check response
     assert response.status_code == 200
 
-    # check memory contents
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == 7
 
@@ -142,7 +210,8 @@ def test_rabbithole_upload_doc_with_metadata(client):
     # check response
     assert response.status_code == 200
 
-    # check memory contents
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == 4
     for dm in declarative_memories:
@@ -186,7 +255,8 @@ def test_rabbithole_upload_docs_batch_with_metadata(client):
     # check response
     assert response.status_code == 200
 
-    # check memory contents
+    # check memory contents, once ingested
+    wait_for_ingestion_jobs(client)
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == 7
     for dm in declarative_memories:
@@ -195,4 +265,81 @@ def test_rabbithole_upload_docs_batch_with_metadata(client):
         print(dm["metadata"])
         # compare with the metadata of the file
         for k, v in metadata[dm["metadata"]["source"]].items():
-            assert dm["metadata"][k] == v
\ No newline at end of file
+            assert dm["metadata"][k] == v
+
+def test_rabbithole_reingest_only_changed_chunks(client, monkeypatch):
+
+    # count the chunks sent to the embedder
+    embedded_texts = []
+    embed_documents = DumbEmbedder.embed_documents
+    def counting_embed_documents(self, texts):
+        embedded_texts.extend(texts)
+        return embed_documents(self, texts)
+    monkeypatch.setattr(DumbEmbedder, "embed_documents", counting_embed_documents)
+
+    paragraphs = [f"Paragraph {i}: the Cat grins at Alice from the branch number {i}." for i in range(6)]
+    def upload(paragraphs):
+        embedded_texts.clear()
+        files = {"file": ("wonderland.txt", "\n\n".join(paragraphs).encode(), "text/plain")}
+        payload = {"chunk_size": 20, "chunk_overlap": 0}
+        response = client.post("/rabbithole/", files=files, data=payload)
+        assert response.status_code == 200
+        wait_for_ingestion_jobs(client)
+        ingested = list(embedded_texts)
+        memories = get_declarative_memory_contents(client)
+        return {m["page_content"]: m["id"] for m in memories}, ingested
+
+    memories, ingested = upload(paragraphs)
+    assert sorted(memories) == paragraphs
+    assert len(ingested) == 6
+
+    # the same document is skipped entirely
+    assert upload(paragraphs) == (memories, [])
+
+    # only new chunks are embedded, the removed ones are deleted, the others are untouched
+    changed = paragraphs[:2] + ["A brand new paragraph about the Queen of Hearts and her croquet."] + paragraphs[4:]
+    new_memories, ingested = upload(changed)
+    assert sorted(new_memories) == sorted(changed)
+    assert ingested == [changed[2]]
+    for paragraph in paragraphs[:2] + paragraphs[4:]:
+        assert new_memories[paragraph] == memories[paragraph]
+
+    # and the changed document is now up to date
+    assert upload(changed) == (new_memories, [])
+
+
+def test_rabbithole_reingest_after_interrupted_ingestion(client, monkeypatch):
+
+    def upload(paragraphs):
+        files = {"file": ("wonderland.txt", "\n\n".join(paragraphs).encode(), "text/plain")}
+        payload = {"chunk_size": 20, "chunk_overlap": 0}
+        response = client.post("/rabbithole/", files=files, data=payload)
+        assert response.status_code == 200
+        return wait_for_ingestion_jobs(client)[0]
+
+    paragraphs = [f"Paragraph {i}: the Cat grins at Alice from the branch number {i}." for i in range(10)]
+    assert upload(paragraphs)["status"] == "done"
+
+    # the new version keeps 8 chunks and adds 4, ingestion fails after storing 2 of them
+    changed = paragraphs[:8] + [f"New paragraph {i}: the Queen of Hearts plays croquet with flamingo {i}." for i in range(4)]
+    monkeypatch.setenv("CCAT_EMBEDDER_BATCH_SIZE", "1")
+    stored_batches = []
+    add_points = VectorMemoryCollection.add_points
+    def failing_add_points(self, *args, **kwargs):
+        stored_batches.append(args)
+        if len(stored_batches) > 2:
+            raise ValueError("Vector memory unavailable")
+        return add_points(self, *args, **kwargs)
+    monkeypatch.setattr(VectorMemoryCollection, "add_points", failing_add_points)
+    assert upload(changed)["status"] == "failed"
+    monkeypatch.setattr(VectorMemoryCollection, "add_points", add_points)
+    # as many points as the chunks of the new version, but not the same ones
+    assert len(get_declarative_memory_contents(client)) == 12
+
+    # uploading it again completes it
+    assert upload(changed)["progress"]["chunks_stored"] == 2
+    memories = get_declarative_memory_contents(client)
+    assert sorted(m["page_content"] for m in memories) == sorted(changed)
+
+    # and then it is skipped
+    assert upload(changed)["progress"]["chunks_stored"] == 0
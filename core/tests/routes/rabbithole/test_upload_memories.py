@@ -1,11 +1,14 @@
 import json
+import gzip
 import time
 import uuid
 import random
-import pytest
 
+from cat.looking_glass.cheshire_cat import CheshireCat
+from cat.memory.vector_memory_collection import VectorMemoryCollection
 from tests.utils import (
     get_collections_names_and_point_count,
+    wait_for_ingestion_jobs,
 )
 
 
@@ -26,6 +29,7 @@ def test_upload_memory(client):
     assert "Memory is being ingested" in json["info"]
 
     # new declarative memory was saved
+    wait_for_ingestion_jobs(client)
     collections_n_points = get_collections_names_and_point_count(client)
     assert (
         collections_n_points["declarative"] == 1
@@ -56,19 +60,21 @@ def test_upload_memory_check_embedder(client):
     another_embedder = "AnotherEmbedder"
     fake_memory = get_fake_memory_export(embedder_name=another_embedder)
 
-    with pytest.raises(Exception) as e:
-        response = client.post(
-            "/rabbithole/memory/",
-            files={
-                "file": ("test_file.json", json.dumps(fake_memory), "application/json")
-            },
-        )
-        assert response.status_code == 200
+    response = client.post(
+        "/rabbithole/memory/",
+        files={
+            "file": ("test_file.json", json.dumps(fake_memory), "application/json")
+        },
+    )
+    assert response.status_code == 200
 
     # ...but found a different embedder
+    job = wait_for_ingestion_jobs(client)[0]
+    assert job["id"] == response.json()["job_id"]
+    assert job["status"] == "failed"
     assert (
         f"Embedder mismatch: file embedder {another_embedder} is different from DumbEmbedder"
-        in str(e.value)
+        in job["error"]
     )
     # and did not update collection
     collections_n_points = get_collections_names_and_point_count(client)
@@ -80,22 +86,69 @@ def test_upload_memory_check_dimensionality(client):
     wrong_dim = 9
     fake_memory = get_fake_memory_export(dim=wrong_dim)
 
-    with pytest.raises(Exception) as e:
-        response = client.post(
-            "/rabbithole/memory/",
-            files={
-                "file": ("test_file.json", json.dumps(fake_memory), "application/json")
-            },
-        )
-        assert response.status_code == 200
+    response = client.post(
+        "/rabbithole/memory/",
+        files={
+            "file": ("test_file.json", json.dumps(fake_memory), "application/json")
+        },
+    )
+    assert response.status_code == 200
 
     # ...but found a different embedder
-    assert "Embedding size mismatch" in str(e.value)
+    job = wait_for_ingestion_jobs(client)[0]
+    assert job["status"] == "failed"
+    assert "Embedding size mismatch" in job["error"]
     # and did not update collection
     collections_n_points = get_collections_names_and_point_count(client)
     assert collections_n_points["declarative"] == 0
 
 
+def test_upload_memory_in_batches_and_resume(client, monkeypatch):
+    # an export of 10 memories, stored in batches of 4
+    monkeypatch.setenv("CCAT_QDRANT_BATCH_SIZE", "4")
+    memories = []
+    for i in range(10):
+        memory = get_fake_memory_export()["collections"]["declarative"][0]
+        memory["page_content"] = f"test_memory_{i}"
+        memories.append(memory)
+    lines = [{"embedder": "DumbEmbedder"}] + memories
+    file_content = gzip.compress("\n".join(json.dumps(line) for line in lines).encode())
+
+    # the second batch fails
+    stored_batches = []
+    add_points = VectorMemoryCollection.add_points
+
+    def flaky_add_points(self, contents, *args, **kwargs):
+        if len(stored_batches) == 1 and contents[0] == "test_memory_4":
+            stored_batches.append(None)
+            raise Exception("Vector memory not available")
+        stored_batches.append(contents)
+        return add_points(self, contents, *args, **kwargs)
+
+    monkeypatch.setattr(VectorMemoryCollection, "add_points", flaky_add_points)
+
+    files = {"file": ("memories.ndjson.gz", file_content, "application/gzip")}
+    client.post("/rabbithole/memory/", files=files)
+    job = wait_for_ingestion_jobs(client)[0]
+    assert job["status"] == "failed"
+    assert "Vector memory not available" in job["error"]
+    assert job["progress"]["chunks_stored"] == 4
+    assert get_collections_names_and_point_count(client)["declarative"] == 4
+
+    # the checkpoint is not kept in the cache, it survives restarts
+    CheshireCat().cache.delete_prefix("")
+
+    # uploading the same file resumes from the failed batch
+    response = client.post("/rabbithole/memory/", files=files)
+    assert response.status_code == 200
+    assert wait_for_ingestion_jobs(client)[0]["status"] == "done"
+    assert stored_batches[2:] == [
+        [f"test_memory_{i}" for i in range(4, 8)],
+        ["test_memory_8", "test_memory_9"],
+    ]
+    assert get_collections_names_and_point_count(client)["declarative"] == 10
+
+
 def get_fake_memory_export(embedder_name="DumbEmbedder", dim=2367):
     return {
         "embedder": embedder_name,
@@ -1,4 +1,4 @@
-from tests.utils import get_declarative_memory_contents
+from tests.utils import get_declarative_memory_contents, wait_for_ingestion_jobs
 
 
 def test_rabbithole_upload_invalid_url(client):
@@ -26,6 +26,7 @@ def test_rabbithole_upload_url(client):
     assert json["url"] == payload["url"]
 
     # check declarative memories have been stored
+    wait_for_ingestion_jobs(client)
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == 1
 
@@ -48,6 +49,7 @@ def test_rabbithole_upload_url_with_metadata(client):
     assert json["url"] == payload["url"]
 
     # check declarative memories have been stored
+    wait_for_ingestion_jobs(client)
     declarative_memories = get_declarative_memory_contents(client)
     assert len(declarative_memories) == 1
     assert "when" in declarative_memories[0]["metadata"]
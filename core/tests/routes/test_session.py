@@ -5,6 +5,8 @@ from cat.memory.working_memory import WorkingMemory
 from cat.cache.cache_manager import CacheManager
 from cat.cache.in_memory_cache import InMemoryCache
 from cat.cache.file_system_cache import FileSystemCache
+from cat.cache.tiered_cache import TieredCache
+from cat.cache.sqlite_cache import SQLiteCache
 
 from tests.utils import send_websocket_message
 
@@ -79,7 +81,7 @@ def test_session_update(client, protocol):
                 assert "You did not configure" in c.text
 
 
-@pytest.mark.parametrize("cache_type", ["in_memory", "file_system"])
+@pytest.mark.parametrize("cache_type", ["in_memory", "file_system", "tiered", "sqlite"])
 def test_session_sync_between_protocols(client, cache_type):
 
     # change cache type (depends on env variables)
@@ -90,6 +92,10 @@ def test_session_sync_between_protocols(client, cache_type):
         assert isinstance(client.app.state.ccat.cache, FileSystemCache)
     elif cache_type == "in_memory":
         assert isinstance(client.app.state.ccat.cache, InMemoryCache)
+    elif cache_type == "tiered":
+        assert isinstance(client.app.state.ccat.cache, TieredCache)
+    elif cache_type == "sqlite":
+        assert isinstance(client.app.state.ccat.cache, SQLiteCache)
     else:
         assert False
 
@@ -24,6 +24,8 @@ def test_get_env(client):
             assert get_env(k) == "false" # we test installation with autoreload off
         elif k == "CCAT_CACHE_DIR":
             assert get_env(k) == "/tmp_test" # we test installation with a different cache dir
+        elif k == "CCAT_RABBITHOLE_JOBS_DIR":
+            assert get_env(k) == "/tmp_test/ingestion_jobs"
         else:
             # default values          
             assert get_env(k) == v
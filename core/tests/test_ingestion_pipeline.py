@@ -0,0 +1,161 @@
+import os
+import time
+import threading
+import pytest
+
+from cat.ingestion_pipeline import IngestionJob, IngestionPipeline
+
+
+def split(job, _):
+    for word in job.docs:
+        yield word
+
+
+def upper(job, word):
+    yield word.upper()
+
+
+def get_pipeline(store, **kwargs):
+    finished = []
+    pipeline = IngestionPipeline(
+        stages=[(split, 1), (upper, 2), (store, 1)],
+        finish=finished.append,
+        **kwargs,
+    )
+    return pipeline, finished
+
+
+def test_pipeline_runs_all_stages():
+
+    def store(job, word):
+        with job.lock:
+            job.stored_points.append(word)
+
+    pipeline, finished = get_pipeline(store, queue_size=1)
+    jobs = [
+        pipeline.submit(IngestionJob(None, f"source_{i}", docs=["cheshire", "cat", str(i)]))
+        for i in range(10)
+    ]
+    for i, job in enumerate(jobs):
+        job.wait()
+        assert sorted(job.stored_points) == sorted(["CHESHIRE", "CAT", str(i)])
+    assert sorted(finished, key=jobs.index) == jobs
+
+    # jobs without items are finished too
+    assert pipeline.run(IngestionJob(None, "empty", docs=[])).stored_points == []
+
+
+def test_pipeline_stages_overlap():
+
+    first_stored = threading.Event()
+
+    def slow_split(job, _):
+        yield "first"
+        # the next stages process the first item while this stage is still running
+        assert first_stored.wait(timeout=5)
+        yield "second"
+
+    def store(job, word):
+        job.stored_points.append(word)
+        first_stored.set()
+
+    pipeline = IngestionPipeline(
+        stages=[(slow_split, 1), (upper, 1), (store, 1)], finish=lambda job: None
+    )
+    job = pipeline.run(IngestionJob(None, "source", docs=[]))
+    assert job.stored_points == ["FIRST", "SECOND"]
+
+
+def test_pipeline_errors():
+
+    def store(job, word):
+        if word == "BAD":
+            raise ValueError("bad word")
+        job.stored_points.append(word)
+
+    pipeline, finished = get_pipeline(store)
+    with pytest.raises(ValueError, match="bad word"):
+        pipeline.run(IngestionJob(None, "source", docs=["bad", "good"]))
+    assert finished == []
+
+    # the pipeline keeps working
+    job = pipeline.run(IngestionJob(None, "source", docs=["good"]))
+    assert job.stored_points == ["GOOD"]
+    assert finished == [job]
+
+
+def test_pipeline_nested_jobs():
+
+    # e.g. a hook storing other documents while a document is stored
+    def store(job, word):
+        if word == "NESTED":
+            nested = pipeline.run(IngestionJob(None, "nested", docs=["inner"]))
+            job.stored_points.extend(nested.stored_points)
+        job.stored_points.append(word)
+
+    pipeline, finished = get_pipeline(store)
+    job = pipeline.run(IngestionJob(None, "source", docs=["nested"]))
+    assert job.stored_points == ["INNER", "NESTED"]
+
+
+def test_pipeline_same_source_in_order():
+
+    stored = []
+
+    def store(job, word):
+        # the first job is slower than the second
+        if word == "FIRST":
+            time.sleep(0.2)
+        stored.append(word)
+
+    pipeline = IngestionPipeline(
+        stages=[(split, 2), (upper, 2), (store, 2)], finish=lambda job: None
+    )
+    jobs = [
+        pipeline.submit(IngestionJob(None, "source", docs=["first"])),
+        pipeline.submit(IngestionJob(None, "source", docs=["second"])),
+    ]
+    for job in jobs:
+        job.wait()
+    assert stored == ["FIRST", "SECOND"]
+
+
+def test_pipeline_same_source_does_not_hold_workers():
+
+    release = threading.Event()
+
+    def blocking_split(job, _):
+        if job.docs == ["first"]:
+            assert release.wait(timeout=5)
+        yield from job.docs
+
+    def store(job, word):
+        job.stored_points.append(word)
+
+    pipeline = IngestionPipeline(
+        stages=[(blocking_split, 2), (store, 1)], finish=lambda job: None
+    )
+    first = pipeline.submit(IngestionJob(None, "source", docs=["first"]))
+    second = pipeline.submit(IngestionJob(None, "source", docs=["second"]))
+
+    # the second job waits for the first one without taking the other worker
+    other = pipeline.submit(IngestionJob(None, "other", docs=["other"]))
+    assert other.done.wait(timeout=5)
+    assert not second.done.is_set()
+
+    release.set()
+    assert first.wait().stored_points == ["first"]
+    assert second.wait().stored_points == ["second"]
+
+
+def test_pipeline_run_in_process():
+
+    pipeline = IngestionPipeline(stages=[], finish=lambda job: None, processes=1)
+    assert pipeline.run_in_process(os.getpid) != os.getpid()
+    assert pipeline.run_in_process(pow, 2, 10) == 1024
+
+    # functions that cannot be sent to another process run in the current one
+    assert pipeline.run_in_process(lambda: os.getpid()) == os.getpid()
+
+    pipeline = IngestionPipeline(stages=[], finish=lambda job: None)
+    assert pipeline.run_in_process(os.getpid) == os.getpid()
@@ -1,3 +1,4 @@
+import time
 import shutil
 from urllib.parse import urlencode
 
@@ -75,6 +76,19 @@ def get_declarative_memory_contents(client):
     return declarative_memories
 
 
+# wait for the ingestion jobs queued via `/rabbithole/` endpoints to be done (or failed, or cancelled)
+def wait_for_ingestion_jobs(client, timeout=10):
+    deadline = time.time() + timeout
+    while True:
+        response = client.get("/rabbithole/jobs")
+        assert response.status_code == 200
+        jobs = response.json()["jobs"]
+        if all(job["status"] not in ("queued", "running") for job in jobs):
+            return jobs
+        assert time.time() < deadline, "Ingestion jobs not finished in time"
+        time.sleep(0.05)
+
+
 # utility to get collections and point count from `GET /memory/collections` in a simpler format
 def get_collections_names_and_point_count(client):
     response = client.get("/memory/collections")